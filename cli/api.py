@@ -3,9 +3,15 @@ import logging
 import pathlib
 import click
 import itertools
+import time
 import us
+import pydantic
 from api.can_api_definition import RegionSummaryWithTimeseries
 from api.can_api_definition import AggregateRegionSummaryWithTimeseries
+from api.can_api_definition import AggregateRegionSummary
+from api.can_api_definition import RegionSummary
+from libs import base_model
+from libs import output_sink
 from libs.pipelines import api_pipeline
 from libs.datasets.dataset_utils import AggregationLevel
 from libs.datasets import combined_datasets
@@ -60,10 +66,16 @@ def update_schemas(output_dir):
     help="Output directory for state summaries.",
     type=pathlib.Path,
 )
+@click.option(
+    "--region-archive",
+    default=None,
+    help="Write per region outputs to this tar or zip archive instead of the output directory.",
+    type=pathlib.Path,
+)
 @click.option("--aggregation-level", "-l", type=AggregationLevel)
 @click.option("--state")
 @click.option("--fips")
-def generate_api(input_dir, output, summary_output, aggregation_level, state, fips):
+def generate_api(input_dir, output, summary_output, region_archive, aggregation_level, state, fips):
     """The entry function for invocation"""
 
     active_states = [state.abbr for state in us.STATES]
@@ -74,19 +86,19 @@ def generate_api(input_dir, output, summary_output, aggregation_level, state, fi
         aggregation_level, state=state, fips=fips, states=active_states
     )
 
-    for intervention in list(Intervention):
-        _logger.info(f"Running intervention {intervention.name}")
-        all_timeseries = api_pipeline.run_on_all_fips_for_intervention(
-            us_latest, us_timeseries, intervention, input_dir
+    interventions = list(Intervention)
+    _logger.info(f"Running interventions {', '.join(i.name for i in interventions)}")
+    all_region_results = api_pipeline.iter_timeseries_for_interventions(
+        us_latest, us_timeseries, interventions, input_dir
+    )
+    if region_archive:
+        region_sink = output_sink.ArchiveSink(region_archive)
+    else:
+        region_sink = output_sink.DirectorySink(output)
+    with region_sink:
+        api_pipeline.deploy_all_interventions(
+            all_region_results, summary_output, output, region_sink=region_sink
         )
-        county_timeseries = [
-            output for output in all_timeseries if output.aggregate_level is AggregationLevel.COUNTY
-        ]
-        api_pipeline.deploy_single_level(intervention, county_timeseries, summary_output, output)
-        state_timeseries = [
-            output for output in all_timeseries if output.aggregate_level is AggregationLevel.STATE
-        ]
-        api_pipeline.deploy_single_level(intervention, state_timeseries, summary_output, output)
 
 
 @main.command("generate-top-counties")
@@ -135,3 +147,46 @@ def generate_top_counties(disable_validation, input_dir, output, state, fips):
     # top_counties_pipeline.deploy_results(county_results_api, "counties_top_100", output)
 
     # _logger.info("finished top counties job")
+
+
+def _api_model_class(path: pathlib.Path):
+    is_bulk = path.name.startswith(("counties", "states"))
+    if path.name.endswith(".timeseries.json"):
+        return AggregateRegionSummaryWithTimeseries if is_bulk else RegionSummaryWithTimeseries
+    return AggregateRegionSummary if is_bulk else RegionSummary
+
+
+@main.command("benchmark-json")
+@click.option(
+    "--input-dir",
+    "-i",
+    required=True,
+    help="Directory of API outputs, such as the output of generate-api for all of the US",
+    type=pathlib.Path,
+)
+def benchmark_json(input_dir):
+    """Times serializing the API outputs in a directory with each json backend."""
+    models = []
+    skipped = 0
+    for path in sorted(input_dir.glob("**/*.json")):
+        try:
+            models.append(_api_model_class(path).parse_file(path))
+        except pydantic.ValidationError:
+            # Not an API output, or one that does not validate when read back.
+            skipped += 1
+    click.echo(f"Loaded {len(models)} API outputs from {input_dir}, skipped {skipped} files")
+
+    expected = None
+    try:
+        for backend in [None] + list(base_model.JSON_BACKENDS):
+            base_model.set_json_backend(backend)
+            start = time.time()
+            outputs = [model.json() for model in models]
+            elapsed = time.time() - start
+            if expected is None:
+                expected = outputs
+            name = backend or "pydantic"
+            matches = "matches" if outputs == expected else "DOES NOT MATCH"
+            click.echo(f"{name}: {elapsed:.2f}s, output {matches} pydantic")
+    finally:
+        base_model.set_json_backend(base_model.DEFAULT_JSON_BACKEND)
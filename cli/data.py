@@ -13,6 +13,9 @@ from libs.datasets.dataset_utils import AggregationLevel
 
 PROD_BUCKET = "data.covidactnow.org"
 
+# Data sources converted to combined dataset rows, reused by `update --incremental`.
+SOURCE_CACHE_DIRECTORY = dataset_utils.DATA_DIRECTORY / "source_cache"
+
 _logger = logging.getLogger(__name__)
 
 
@@ -31,12 +34,18 @@ def _save_field_summary(timeseries_dataset: TimeseriesDataset, output_path: path
 
 @main.command()
 @click.option("--summary-filename", default="timeseries_summary.csv")
-def update(summary_filename):
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Reuse data sources cached by previous updates when their files and code are unchanged.",
+)
+def update(summary_filename, incremental):
     """Updates latest and timeseries datasets to the current checked out covid data public commit"""
     path_prefix = dataset_utils.DATA_DIRECTORY.relative_to(dataset_utils.REPO_ROOT)
 
-    latest_dataset = combined_datasets.build_us_latest_with_all_fields()
-    timeseries_dataset = combined_datasets.build_us_timeseries_with_all_fields()
+    cache_dir = SOURCE_CACHE_DIRECTORY if incremental else None
+    latest_dataset = combined_datasets.build_us_latest_with_all_fields(cache_dir=cache_dir)
+    timeseries_dataset = combined_datasets.build_us_timeseries_with_all_fields(cache_dir=cache_dir)
     _, timeseries_pointer = combined_dataset_utils.update_data_public_head(
         path_prefix, latest_dataset, timeseries_dataset
     )
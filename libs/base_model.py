@@ -1,13 +1,82 @@
+from typing import Any, Callable, Dict
+import datetime
+import enum
+
 import pydantic
 import simplejson
 
+ROOT_KEY = "__root__"
+
+# Types output as is by `_to_json_compatible`.
+_JSON_PRIMITIVE_TYPES = frozenset([str, int, float, bool, type(None)])
+
 
 def _nan_safe_json_dumps(*args, **kwargs):
     return simplejson.dumps(*args, **kwargs, ignore_nan=True)
 
 
+# Functions encoding the output of `_to_json_compatible`, called with the data and the pydantic
+# encoder of the model for values of other types. Each backend must output the same bytes as
+# `pydantic.BaseModel.json` with `_nan_safe_json_dumps`.
+JSON_BACKENDS: Dict[str, Callable[[Any, Callable[[Any], Any]], str]] = {
+    "simplejson": lambda data, default: _nan_safe_json_dumps(data, default=default),
+}
+
+DEFAULT_JSON_BACKEND = "simplejson"
+
+# Name of the backend used by `APIBaseModel.json`. None uses the pydantic implementation.
+_json_backend = DEFAULT_JSON_BACKEND
+
+
+def set_json_backend(name: str = None):
+    """Sets the backend used to serialize API models.
+
+    Args:
+        name: Name of a backend in JSON_BACKENDS, or None to use the pydantic implementation.
+    """
+    global _json_backend
+    if name is not None and name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown json backend {name}, expected one of {list(JSON_BACKENDS)}")
+    _json_backend = name
+
+
+def _to_json_compatible(value):
+    """Converts models to dicts like `BaseModel.dict`, and dates and enums as encoded by pydantic.
+
+    Values of any other type are returned unchanged and left to the encoder.
+    """
+    value_type = type(value)
+    if value_type in _JSON_PRIMITIVE_TYPES:
+        return value
+    if value_type is list or value_type is tuple:
+        return [_to_json_compatible(item) for item in value]
+    if value_type is datetime.date or value_type is datetime.datetime:
+        return value.isoformat()
+    if isinstance(value, pydantic.BaseModel):
+        data = {key: _to_json_compatible(item) for key, item in value.__dict__.items()}
+        # As in `BaseModel.dict`, models with a custom root are replaced by their root.
+        return data[ROOT_KEY] if ROOT_KEY in data else data
+    if value_type is dict:
+        return {key: _to_json_compatible(item) for key, item in value.items()}
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
 class APIBaseModel(pydantic.BaseModel):
     """Base model for API output."""
 
     class Config:
         json_dumps = _nan_safe_json_dumps
+
+    def json(self, **kwargs) -> str:
+        """Serializes the model to JSON.
+
+        Without arguments, the model is serialized with the selected backend, which skips the
+        dicts copied by `BaseModel.dict` and the encoder calls for dates and enums.
+        """
+        if kwargs or not _json_backend or self.__config__.json_encoders:
+            return super().json(**kwargs)
+
+        dumps = JSON_BACKENDS[_json_backend]
+        return dumps(_to_json_compatible(self), self.__json_encoder__)
@@ -68,29 +68,127 @@ def flatten_dict(data: dict, level_separator: str = ".") -> dict:
     return flattened
 
 
+def _temp_path(output_path: pathlib.Path) -> pathlib.Path:
+    """Returns the path an output is written to before replacing `output_path`."""
+    return output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+
+
+class NestedCsvWriter:
+    """Writes rows to a nested csv as they are added, without holding them in memory.
+
+    As in `write_nested_csv`, the header is taken from the first row. Rows are written to a
+    temporary file, created when the first row is written, that replaces `output_path` on
+    `close`. Leaving the context manager with an exception keeps the previous file.
+
+    Args:
+        output_path: Path of the csv.
+    """
+
+    def __init__(self, output_path: pathlib.Path):
+        self.output_path = output_path
+        self.row_count = 0
+        self._header = None
+        self._file = None
+        self._writer = None
+        self._temp_path = _temp_path(output_path)
+
+    def write_row(self, row: dict):
+        flattened_row = flatten_dict(row)
+        if not self._writer:
+            self._header = flattened_row.keys()
+            _logger.info(f"Writing to {self.output_path}")
+            self._file = self._temp_path.open("w")
+            self._writer = csv.DictWriter(self._file, self._header)
+            self._writer.writeheader()
+
+        # if a nested key is optional (i.e. {a: Optional[dict]}) and there is no
+        # value for a, (i.e. {a: None}), don't write a, as it's not in the header.
+        flattened_row = {k: v for k, v in flattened_row.items() if k in self._header}
+        self._writer.writerow(flattened_row)
+        self.row_count += 1
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._file.close()
+            os.replace(self._temp_path, self.output_path)
+
+    def discard(self):
+        """Removes the rows written so far, keeping the previous file."""
+        if self._file and not self._file.closed:
+            self._file.close()
+            self._temp_path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type:
+            self.discard()
+        else:
+            self.close()
+
+
+class JsonArrayWriter:
+    """Writes a json list one serialized item at a time.
+
+    The output matches serializing the whole list with `json.dumps` default separators. Items
+    are written to a temporary file that replaces `output_path` on `close`. Leaving the context
+    manager with an exception keeps the previous file.
+
+    Args:
+        output_path: Path of the json file.
+    """
+
+    def __init__(self, output_path: pathlib.Path):
+        self.output_path = output_path
+        self.item_count = 0
+        self._temp_path = _temp_path(output_path)
+        self._file = self._temp_path.open("w")
+        self._file.write("[")
+
+    def write_item(self, item_json: str):
+        if self.item_count:
+            self._file.write(", ")
+        self._file.write(item_json)
+        self.item_count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write("]")
+        self._file.close()
+        os.replace(self._temp_path, self.output_path)
+
+    def discard(self):
+        """Removes the items written so far, keeping the previous file."""
+        if self._file.closed:
+            return
+        self._file.close()
+        self._temp_path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type:
+            self.discard()
+        else:
+            self.close()
+
+
 def write_nested_csv(data: List[dict], output_path: pathlib.Path):
     """Writes list of data as a nested csv.
 
     Args:
         data: list of data to write.
-        key: Stem of file to write
-        output_dir: Output directory to write to.
+        output_path: Path of the csv.
     """
     if not data:
         raise ValueError("Cannot upload a 0 length list.")
-    header = flatten_dict(data[0]).keys()
-
-    _logger.info(f"Writing to {output_path}")
-    with output_path.open("w") as csvfile:
-        writer = csv.DictWriter(csvfile, header)
-        writer.writeheader()
 
+    with NestedCsvWriter(output_path) as writer:
         for row in data:
-            flattened_row = flatten_dict(row)
-            # if a nested key is optional (i.e. {a: Optional[dict]}) and there is no
-            # value for a, (i.e. {a: None}), don't write a, as it's not in the header.
-            flattened_row = {k: v for k, v in flattened_row.items() if k in header}
-            writer.writerow(flattened_row)
+            writer.write_row(row)
 
 
 def upload_json(key_name, json: str, output_dir: str):
@@ -1,8 +1,10 @@
 from enum import Enum
 from itertools import chain
-from typing import Dict, Type, List, NewType, Mapping, MutableMapping, Tuple
+from typing import Dict, Type, List, NewType, Mapping, MutableMapping, Tuple, Optional
 import functools
+import hashlib
 import pathlib
+import numpy as np
 import pandas as pd
 import structlog
 from structlog.threadlocal import tmp_bind
@@ -111,15 +113,25 @@ US_STATES_FILTER = dataset_filter.DatasetFilter(
 )
 
 
-def build_us_timeseries_with_all_fields() -> TimeseriesDataset:
+def build_us_timeseries_with_all_fields(
+    cache_dir: Optional[pathlib.Path] = None,
+) -> TimeseriesDataset:
     return _build_combined_dataset_from_sources(
-        TimeseriesDataset, ALL_TIMESERIES_FEATURE_DEFINITION, filter=US_STATES_FILTER,
+        TimeseriesDataset,
+        ALL_TIMESERIES_FEATURE_DEFINITION,
+        filter=US_STATES_FILTER,
+        cache_dir=cache_dir,
     )
 
 
-def build_us_latest_with_all_fields() -> LatestValuesDataset:
+def build_us_latest_with_all_fields(
+    cache_dir: Optional[pathlib.Path] = None,
+) -> LatestValuesDataset:
     return _build_combined_dataset_from_sources(
-        LatestValuesDataset, ALL_FIELDS_FEATURE_DEFINITION, filter=US_STATES_FILTER,
+        LatestValuesDataset,
+        ALL_FIELDS_FEATURE_DEFINITION,
+        filter=US_STATES_FILTER,
+        cache_dir=cache_dir,
     )
 
 
@@ -226,6 +238,7 @@ def _build_combined_dataset_from_sources(
     target_dataset_cls: Type[dataset_base.DatasetBase],
     feature_definition_config: FeatureDataSourceMap,
     filter: dataset_filter.DatasetFilter,
+    cache_dir: Optional[pathlib.Path] = None,
 ):
     """Builds a combined dataset from a feature definition.
 
@@ -235,30 +248,16 @@ def _build_combined_dataset_from_sources(
             data sources that will be used to pull values from.
         filters: A list of dataset filters applied to the datasets before
             assembling features.
+        cache_dir: If set, each data source converted to `target_dataset_cls` is cached in this
+            directory and only rebuilt when its files or the code building it change.
     """
-    loaded_data_sources = {
-        data_source_cls: data_source_cls.local()
+    datasets: MutableMapping[str, pd.DataFrame] = {
+        data_source_cls.SOURCE_NAME: _load_source_dataframe(
+            target_dataset_cls, data_source_cls, filter, cache_dir
+        )
         for data_source_cls in set(chain.from_iterable(feature_definition_config.values()))
     }
 
-    # Convert data sources to instances of `target_data_cls` and apply filter
-    intermediate_datasets = {
-        data_source_cls.SOURCE_NAME: filter.apply(target_dataset_cls.build_from_data_source(source))
-        for data_source_cls, source in loaded_data_sources.items()
-    }
-
-    datasets: MutableMapping[str, pd.DataFrame] = {}
-    for name, dataset_obj in intermediate_datasets.items():
-        data_with_index = dataset_obj.data.set_index(target_dataset_cls.COMMON_INDEX_FIELDS)
-        if data_with_index.index.duplicated(keep=False).any():
-            raise ValueError(f"Duplicate in {name}")
-        datasets[name] = data_with_index
-        # If any duplicates slip in the following code may help you debug them:
-        # https://stackoverflow.com/a/34297689
-        # datasets[name] = data_with_index.loc[~data_with_index.duplicated(keep="first"), :]
-        # datasets[key] = dataset_obj.data.groupby(target_dataset_cls.COMMON_INDEX_FIELDS).first() fails
-        # due to <NA>s: cannot convert to 'float64'-dtype NumPy array with missing values. Specify an appropriate 'na_value' for this dtype.
-
     feature_definition = {
         field_name: [cls.SOURCE_NAME for cls in classes]
         for field_name, classes in feature_definition_config.items()
@@ -269,6 +268,80 @@ def _build_combined_dataset_from_sources(
     return target_dataset_cls(data.reset_index(), provenance=_to_timeseries_rows(provenance, _log))
 
 
+def _load_source_dataframe(
+    target_dataset_cls: Type[dataset_base.DatasetBase],
+    data_source_cls: Type[data_source.DataSource],
+    filter: dataset_filter.DatasetFilter,
+    cache_dir: Optional[pathlib.Path],
+) -> pd.DataFrame:
+    """Loads a data source as `target_dataset_cls`, filtered and indexed by its common index.
+
+    When `cache_dir` is set and the files of the source are known the result is cached there,
+    keyed by a fingerprint of its inputs.
+    """
+    name = data_source_cls.SOURCE_NAME
+    cache_path = None
+    if cache_dir:
+        fingerprint = _source_fingerprint(target_dataset_cls, data_source_cls, filter)
+        if fingerprint:
+            cache_prefix = f"{target_dataset_cls.__name__}-{name}-"
+            cache_path = cache_dir / f"{cache_prefix}{fingerprint}.pkl"
+            if cache_path.exists():
+                _log.info("Using cached data source", source=name, path=str(cache_path))
+                return pd.read_pickle(cache_path)
+
+    dataset_obj = filter.apply(target_dataset_cls.build_from_data_source(data_source_cls.local()))
+    data_with_index = dataset_obj.data.set_index(target_dataset_cls.COMMON_INDEX_FIELDS)
+    if data_with_index.index.duplicated(keep=False).any():
+        raise ValueError(f"Duplicate in {name}")
+    # If any duplicates slip in the following code may help you debug them:
+    # https://stackoverflow.com/a/34297689
+    # data_with_index = data_with_index.loc[~data_with_index.duplicated(keep="first"), :]
+    # data_with_index = dataset_obj.data.groupby(target_dataset_cls.COMMON_INDEX_FIELDS).first() fails
+    # due to <NA>s: cannot convert to 'float64'-dtype NumPy array with missing values. Specify an appropriate 'na_value' for this dtype.
+
+    if cache_path:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale_path in cache_dir.glob(f"{cache_prefix}*.pkl"):
+            stale_path.unlink()
+        data_with_index.to_pickle(cache_path)
+    return data_with_index
+
+
+@functools.lru_cache(None)
+def _code_fingerprint() -> str:
+    """Returns a hash of the code and bundled data under libs/ that is used to build datasets."""
+    libs_root = dataset_utils.REPO_ROOT / "libs"
+    sha = hashlib.sha256()
+    for path in sorted(chain(libs_root.rglob("*.py"), libs_root.rglob("*.csv"))):
+        sha.update(str(path.relative_to(libs_root)).encode())
+        sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+def _source_fingerprint(
+    target_dataset_cls: Type[dataset_base.DatasetBase],
+    data_source_cls: Type[data_source.DataSource],
+    filter: dataset_filter.DatasetFilter,
+) -> Optional[str]:
+    """Returns a hash of everything used to build a data source as `target_dataset_cls`.
+
+    Returns None when the files read by the data source are not known or missing.
+    """
+    paths = data_source_cls.local_paths()
+    if not paths or not all(path.exists() for path in paths):
+        return None
+
+    sha = hashlib.sha256()
+    for part in [target_dataset_cls.__name__, data_source_cls.__name__, repr(filter)]:
+        sha.update(part.encode())
+    sha.update(_code_fingerprint().encode())
+    for path in paths:
+        sha.update(path.name.encode())
+        sha.update(dataset_pointer.content_hash(path).encode())
+    return sha.hexdigest()[:16]
+
+
 class Override(Enum):
     """How data sources override each other when combined."""
 
@@ -291,24 +364,21 @@ def _build_data_and_provenance(
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     fips_indexed = dataset_utils.fips_index_geo_data(pd.concat(datasource_dataframes.values()))
 
-    # Inspired by pd.Series.combine_first(). Create a new index which is a union of all the input dataframe
-    # index.
     dataframes = list(datasource_dataframes.values())
-    new_index = dataframes[0].index
     index_names = dataframes[0].index.names
     for df in dataframes[1:]:
         assert index_names == df.index.names
-        new_index = new_index.union(df.index)
-    # The following is a failed attempt at a performance optimization. The merge operation spends most of its
-    # time boxing datetime values, something that in theory doesn't need to happen for an DatetimeIndex but
-    # I've been unable to make that happen when the datetimes are part of a MultiIndex.
-    # if index_names == ["fips", "date"]:
-    #     arrays = [new_index.get_level_values(0), pd.to_datetime(new_index.get_level_values(1))]
-    #     new_index = MultiIndex.from_arrays(arrays=arrays, names=index_names)
-    # elif index_names == ["fips"]:
-    #     pass
-    # else:
-    #     raise ValueError("bad new_index.names")
+    if index_names == COMMON_FIELDS_TIMESERIES_KEYS:
+        new_index, aligned_dataframes = _align_fips_date_dataframes(datasource_dataframes)
+        # Override.BY_ROW needs the rows of the inputs as they are.
+        if override is Override.BY_TIMESERIES:
+            datasource_dataframes = aligned_dataframes
+    else:
+        # Inspired by pd.Series.combine_first(). Create a new index which is a union of all the
+        # input dataframe index.
+        new_index = dataframes[0].index
+        for df in dataframes[1:]:
+            new_index = new_index.union(df.index)
 
     data, provenance = _merge_data(
         datasource_dataframes, feature_definitions, _log, new_index, override
@@ -321,6 +391,59 @@ def _build_data_and_provenance(
     return data, provenance
 
 
+def _align_fips_date_dataframes(
+    datasource_dataframes: Mapping[str, pd.DataFrame]
+) -> Tuple[pd.MultiIndex, Dict[str, pd.DataFrame]]:
+    """Reindexes dataframes with a (fips, date) index to the sorted union of their indexes.
+
+    Each row is keyed by an int64 combining an integer code for its FIPS, assigned in sorted FIPS
+    order, and its day offset from the earliest date. The union of the keys is built with
+    np.unique and each dataframe is aligned to it with np.searchsorted, so no Timestamps are
+    boxed. The union MultiIndex is only materialized at the end, from level codes.
+
+    Returns: Tuple of the union index and the dataframes reindexed to it.
+    """
+    dataframes = list(datasource_dataframes.values())
+    fips_codes, fips_levels = pd.factorize(
+        np.concatenate([df.index.get_level_values(CommonFields.FIPS) for df in dataframes]),
+        sort=True,
+    )
+    days = np.concatenate(
+        [
+            df.index.get_level_values(CommonFields.DATE).values.astype("datetime64[D]")
+            for df in dataframes
+        ]
+    )
+    first_day = days.min()
+    day_offsets = (days - first_day).astype(np.int64)
+    keys = (fips_codes.astype(np.int64) << 32) | day_offsets
+
+    union_keys = np.unique(keys)
+    day_offset_levels, day_offset_codes = np.unique(union_keys & 0xFFFFFFFF, return_inverse=True)
+    new_index = pd.MultiIndex(
+        levels=[fips_levels, pd.DatetimeIndex(first_day + day_offset_levels)],
+        codes=[union_keys >> 32, day_offset_codes],
+        names=COMMON_FIELDS_TIMESERIES_KEYS,
+    )
+
+    aligned = {}
+    start = 0
+    for name, df in datasource_dataframes.items():
+        df_keys = keys[start : start + len(df)]
+        start += len(df)
+        # Position in df of each row of new_index, -1 where df doesn't have the row.
+        indexer = np.full(len(union_keys), -1)
+        indexer[np.searchsorted(union_keys, df_keys)] = np.arange(len(df))
+        aligned[name] = pd.DataFrame(
+            {
+                column: pd.api.extensions.take(df[column].values, indexer, allow_fill=True)
+                for column in df.columns
+            },
+            index=new_index,
+        )
+    return new_index, aligned
+
+
 def _merge_data(datasource_dataframes, feature_definitions, log, new_index, override):
     if override is Override.BY_ROW:
         return _merge_data_by_row(datasource_dataframes, feature_definitions, log, new_index)
@@ -331,36 +454,46 @@ def _merge_data(datasource_dataframes, feature_definitions, log, new_index, over
     datasource_dataframes = {
         name: df.reindex(new_index, copy=False) for name, df in datasource_dataframes.items()
     }
+    if new_index.duplicated(keep=False).any():
+        log.error("Found duplicates in index")
+        raise ValueError()  # This is bad, somehow the input /still/ has duplicates
+
+    # Integer code of the FIPS of each row, shared by all fields. A missing FIPS gets code -1,
+    # which indexes the extra last element of the per-FIPS arrays below.
+    fips_codes, fips_uniques = pd.factorize(new_index.get_level_values(CommonFields.FIPS))
+    fips_count = len(fips_uniques) + 1
+
     # Build feature columns from feature_definitions.
-    data = pd.DataFrame(index=new_index)
-    provenance = pd.DataFrame(index=new_index)
+    data = {}
+    provenance = {}
     for field_name, data_source_names in feature_definitions.items():
         log.info("Working field", field=field_name)
         field_out = None
-        field_provenance = pd.Series(index=new_index, dtype="object")
+        # Position in source_names of the source of each row of field_out, -1 where it has no value.
+        source_names = list(reversed(data_source_names))
+        field_source = np.full(len(new_index), -1)
         # Go through the data sources, starting with the highest priority.
-        for datasource_name in reversed(data_source_names):
-            with tmp_bind(log, dataset_name=datasource_name, field=field_name) as log:
-                datasource_field_in = datasource_dataframes[datasource_name][field_name]
-                if field_out is None:
-                    # Copy all values from the highest priority input to the output
-                    field_provenance.loc[pd.notna(datasource_field_in)] = datasource_name
-                    field_out = datasource_field_in
-                else:
-                    field_out_has_ts = field_out.groupby(
-                        level=[CommonFields.FIPS], sort=False
-                    ).transform(lambda x: x.notna().any())
-                    copy_field_in = (~field_out_has_ts) & pd.notna(datasource_field_in)
-                    # Copy from datasource_field_in only on rows where all rows of field_out with that FIPS are NaN.
-                    field_provenance.loc[copy_field_in] = datasource_name
-                    field_out = field_out.where(~copy_field_in, datasource_field_in)
-                dups = field_out.index.duplicated(keep=False)
-                if dups.any():
-                    log.error("Found duplicates in index")
-                    raise ValueError()  # This is bad, somehow the input /still/ has duplicates
-        data.loc[:, field_name] = field_out
-        provenance.loc[:, field_name] = field_provenance
-    return data, provenance
+        for source_position, datasource_name in enumerate(source_names):
+            datasource_field_in = datasource_dataframes[datasource_name][field_name]
+            field_in_has_value = datasource_field_in.notna().to_numpy()
+            if field_out is None:
+                # Copy all values from the highest priority input to the output
+                field_source[field_in_has_value] = source_position
+                field_out = datasource_field_in
+            else:
+                fips_has_value = np.zeros(fips_count, dtype=bool)
+                fips_has_value[fips_codes[field_source >= 0]] = True
+                # Copy from datasource_field_in only on rows where all rows of field_out with that FIPS are NaN.
+                copy_field_in = ~fips_has_value[fips_codes] & field_in_has_value
+                field_source[copy_field_in] = source_position
+                field_out = field_out.where(~copy_field_in, datasource_field_in)
+        data[field_name] = field_out
+        # Index -1 picks the trailing NaN for rows without a source.
+        source_names_or_na = np.array(source_names + [np.nan], dtype=object)
+        provenance[field_name] = pd.Series(
+            source_names_or_na[field_source], index=new_index, dtype="object"
+        )
+    return pd.DataFrame(data, index=new_index), pd.DataFrame(provenance, index=new_index)
 
 
 def _merge_data_by_row(datasource_dataframes, feature_definitions, log, new_index):
@@ -1,8 +1,12 @@
+from typing import List
+import pathlib
+
 import pandas as pd
 
 from covidactnow.datapublic.common_fields import CommonFields
 from libs.datasets.timeseries import TimeseriesDataset
 from libs.datasets.latest_values_dataset import LatestValuesDataset
+from libs.datasets import dataset_utils
 from libs.datasets.dataset_utils import AggregationLevel
 from functools import lru_cache
 
@@ -57,6 +61,18 @@ class DataSource(object):
         """
         raise NotImplementedError("Subclass must implement")
 
+    @classmethod
+    def local_paths(cls) -> List[pathlib.Path]:
+        """Returns the paths of the files read by `local`.
+
+        Used to tell when the source data changed. An empty list means the files are not known
+        and the source is always reloaded.
+        """
+        data_path = getattr(cls, "DATA_PATH", None)
+        if not data_path:
+            return []
+        return [dataset_utils.LOCAL_PUBLIC_DATA_PATH / data_path]
+
     @lru_cache(None)
     def beds(self) -> LatestValuesDataset:
         """Builds generic beds dataset"""
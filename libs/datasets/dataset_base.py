@@ -1,12 +1,15 @@
 from typing import List, Union, TextIO, Mapping, Iterable, Optional
 import pathlib
 
+import numpy as np
 import structlog
 
 from covidactnow.datapublic import common_df
 import pandas as pd
 
+from libs.datasets.common_fields import CommonFields
 from libs.datasets.dataset_utils import AggregationLevel
+from libs.datasets.dataset_utils import make_binary_array
 
 
 class DatasetBase(object):
@@ -15,19 +18,53 @@ class DatasetBase(object):
 
     COMMON_INDEX_FIELDS: List[str] = []
 
+    # Repetitive string columns stored as categoricals in parquet files.
+    CATEGORICAL_FIELDS: List[str] = [
+        CommonFields.AGGREGATE_LEVEL,
+        CommonFields.COUNTRY,
+        CommonFields.STATE,
+        CommonFields.FIPS,
+    ]
+
     def __init__(self, data: pd.DataFrame, provenance: Optional[pd.Series] = None):
         self.data = data
         self.provenance = provenance
+        self._fips_index = None
+        self._fips_index_data = None
+
+    @property
+    def fips_index(self) -> Mapping[str, np.ndarray]:
+        """Map of FIPS to the positions of its rows in `data`, in their original order.
+
+        Built on first use and rebuilt if `data` is replaced, so looking up one region is a dict
+        lookup instead of a scan of the whole table.
+        """
+        if self._fips_index is None or self._fips_index_data is not self.data:
+            self._fips_index = self.data.groupby(CommonFields.FIPS, sort=False).indices
+            self._fips_index_data = self.data
+        return self._fips_index
+
+    def _get_rows(self, fips: Optional[str] = None, **filters) -> pd.DataFrame:
+        """Returns the rows of `data` matching `fips` and the `make_binary_array` filters."""
+        if not fips:
+            return self.data.loc[make_binary_array(self.data, **filters), :]
+
+        rows = self.data.iloc[self.fips_index.get(fips, [])]
+        if any(filters.values()):
+            rows = rows.loc[make_binary_array(rows, **filters), :]
+        return rows
 
     def get_subset(self, aggregation_level: AggregationLevel, **filters) -> "DatasetBase":
         """Returns a subset of the existing dataset."""
         raise NotImplementedError("Subsclass must implement")
 
     def yield_records(self) -> Iterable[dict]:
-        # It'd be faster to use self.data.itertuples or find a way to avoid yield_records, but that
-        # needs larger changes in code calling this.
-        for idx, row in self.data.iterrows():
-            yield row.where(pd.notnull(row), None).to_dict()
+        """Yields a dict for each row of `data`, with NA values replaced by None.
+
+        NA values are replaced once for the whole table rather than row by row.
+        """
+        data = self.data.astype(object).where(pd.notnull(self.data), None)
+        yield from data.to_dict(orient="records")
 
     @classmethod
     def build_from_data_source(cls, source) -> "DatasetBase":
@@ -38,6 +75,31 @@ class DatasetBase(object):
     def load_csv(cls, path_or_buf: Union[pathlib.Path, TextIO]):
         raise NotImplementedError()
 
+    @classmethod
+    def load_parquet(cls, path: pathlib.Path):
+        """Load a dataset written by `to_parquet`.
+
+        Columns come back with the same dtypes and missing values as when the dataset is loaded
+        from CSV: categoricals are converted back to strings and missing strings are NaN.
+        """
+        data = pd.read_parquet(path)
+        for column, dtype in data.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                data[column] = data[column].astype(object)
+            elif dtype == object and data[column].isna().any():
+                data[column] = data[column].fillna(np.nan)
+        return cls(data)
+
+    def to_parquet(self, path: pathlib.Path):
+        """Persists the data, without provenance, to a Parquet file.
+
+        Args:
+            path: Path to write to.
+        """
+        categorical_columns = self.data.columns.intersection(self.CATEGORICAL_FIELDS)
+        data = self.data.astype({column: "category" for column in categorical_columns})
+        data.to_parquet(path, index=False)
+
     def to_csv(self, path: pathlib.Path):
         """Persists timeseries to CSV.
 
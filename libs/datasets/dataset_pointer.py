@@ -1,6 +1,7 @@
-from typing import Type, Tuple
+from typing import Type, Tuple, Optional
 import os
 import io
+import hashlib
 import pathlib
 import datetime
 
@@ -21,6 +22,40 @@ def form_filename(dataset_type: DatasetType) -> str:
     return f"{dataset_type.value}.json"
 
 
+def content_hash(path: pathlib.Path) -> str:
+    """Returns a short hash of the contents of the file at `path`."""
+    sha = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:16]
+
+
+def form_cache_path(path: pathlib.Path, csv_hash: str) -> pathlib.Path:
+    """Returns the path of the parquet copy of the CSV at `path` with contents `csv_hash`."""
+    return path.with_name(f"{path.stem}.{csv_hash}.parquet")
+
+
+def write_parquet_cache(dataset: DatasetBase, cache_path: pathlib.Path) -> bool:
+    """Writes a parquet copy of `dataset` to `cache_path`, returning True on success.
+
+    The copy is written to a temporary file that replaces `cache_path` once complete, so that
+    other processes loading the dataset never read a partially written copy. Failing to write
+    the copy is logged and otherwise ignored, loading falls back to the CSV.
+    """
+    temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        dataset.to_parquet(temp_path)
+        os.replace(temp_path, cache_path)
+    except Exception:
+        _logger.warning("Unable to write dataset cache", path=str(cache_path), exc_info=True)
+        if temp_path.exists():
+            temp_path.unlink()
+        return False
+    return True
+
+
 class DatasetPointer(pydantic.BaseModel):
     """Describes a persisted combined dataset."""
 
@@ -44,14 +79,76 @@ class DatasetPointer(pydantic.BaseModel):
     def save_dataset(self, dataset: DatasetBase) -> pathlib.Path:
         dataset.to_csv(self.path)
         _logger.info("Successfully saved dataset", path=str(self.path))
+        # Cache the dataset as read back from the CSV so that both load paths return the same data.
+        self._write_cache(self.path, self.dataset_type.dataset_class.load_csv(self.path))
         return self.path
 
+    def _write_cache(self, path: pathlib.Path, dataset: DatasetBase) -> Optional[pathlib.Path]:
+        """Writes a parquet copy of the dataset loaded from the CSV at `path`.
+
+        The copy is keyed by the hash of the CSV contents, so it is only used while the CSV is
+        unchanged. Copies of previous versions of the CSV are removed.
+        """
+        cache_path = form_cache_path(path, content_hash(path))
+        if not write_parquet_cache(dataset, cache_path):
+            return None
+
+        for stale_path in path.parent.glob(f"{path.stem}.*.parquet"):
+            if stale_path != cache_path:
+                try:
+                    stale_path.unlink()
+                except FileNotFoundError:
+                    # Removed by another process loading the same CSV.
+                    pass
+        return cache_path
+
+    def _load_from_path(self, path: pathlib.Path) -> DatasetBase:
+        """Loads the dataset from its parquet copy if fresh, otherwise from the CSV."""
+        dataset_class = self.dataset_type.dataset_class
+        cache_path = form_cache_path(path, content_hash(path))
+        if cache_path.exists():
+            try:
+                return dataset_class.load_parquet(cache_path)
+            except Exception:
+                _logger.warning("Unable to read dataset cache", path=str(cache_path), exc_info=True)
+                return dataset_class.load_csv(path)
+
+        dataset = dataset_class.load_csv(path)
+        self._write_cache(path, dataset)
+        return dataset
+
+    def _load_from_history(
+        self, path: pathlib.Path, before: str, previous_commit: bool, commit: str
+    ) -> DatasetBase:
+        """Loads a previous version of the dataset from the git history of `path`.
+
+        Parsed versions are kept as parquet files keyed by the sha of the file blob, so each
+        version is only fetched from LFS and parsed once.
+        """
+        dataset_class = self.dataset_type.dataset_class
+        blob = git_lfs_object_helpers.get_blob_for_path(
+            path, before=before, previous_commit=previous_commit, commit=commit
+        )
+        cache_path = git_lfs_object_helpers.CACHE_DIRECTORY / f"{path.stem}.{blob.hexsha}.parquet"
+        if cache_path.exists():
+            try:
+                return dataset_class.load_parquet(cache_path)
+            except Exception:
+                _logger.warning("Unable to read dataset cache", path=str(cache_path), exc_info=True)
+
+        lfs_buf = io.BytesIO(git_lfs_object_helpers.read_blob_data(blob))
+        dataset = dataset_class.load_csv(lfs_buf)
+        write_parquet_cache(dataset, cache_path)
+        return dataset
+
     def load_dataset(
         self, before: str = None, previous_commit: bool = False, commit: str = None
     ) -> DatasetBase:
         """Load dataset from file specified by pointer.
 
-        If options are specified, will load from git history of the file.
+        If options are specified, will load from git history of the file, using a parquet copy
+        of that version if it was loaded before. Otherwise the parquet copy of the file is used
+        when it matches the current file contents.
 
         Args:
             before: If set, returns dataset from first commit for file before date.
@@ -67,13 +164,9 @@ class DatasetPointer(pydantic.BaseModel):
             path = dataset_utils.REPO_ROOT / path
 
         if before or previous_commit or commit:
-            lfs_data = git_lfs_object_helpers.get_data_for_path(
-                path, before=before, previous_commit=previous_commit, commit=commit
-            )
-            lfs_buf = io.BytesIO(lfs_data)
-            return self.dataset_type.dataset_class.load_csv(lfs_buf)
+            return self._load_from_history(path, before, previous_commit, commit)
 
-        return self.dataset_type.dataset_class.load_csv(path)
+        return self._load_from_path(path)
 
     def save(self, directory: pathlib.Path) -> pathlib.Path:
         filename = form_filename(self.dataset_type)
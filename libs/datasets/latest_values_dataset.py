@@ -8,7 +8,7 @@ from covidactnow.datapublic import common_df
 from libs import us_state_abbrev
 import pandas as pd
 import numpy as np
-from libs.datasets.dataset_utils import AggregationLevel, make_binary_array
+from libs.datasets.dataset_utils import AggregationLevel
 from libs.datasets import dataset_utils
 from libs.datasets import custom_aggregations
 from libs.datasets import dataset_base
@@ -158,8 +158,7 @@ class LatestValuesDataset(dataset_base.DatasetBase):
         after: Optional[str] = None,
         before: Optional[str] = None,
     ) -> "LatestValuesDataset":
-        rows_binary_array = make_binary_array(
-            self.data,
+        rows = self._get_rows(
             aggregation_level=aggregation_level,
             country=country,
             fips=fips,
@@ -169,7 +168,7 @@ class LatestValuesDataset(dataset_base.DatasetBase):
             after=after,
             before=before,
         )
-        return self.__class__(self.data.loc[rows_binary_array, :])
+        return self.__class__(rows)
 
     def get_record_for_fips(self, fips) -> dict:
         """Gets all data for a given fips code.
@@ -1,10 +1,13 @@
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from functools import lru_cache
 import pathlib
 import datetime
 
+import numpy as np
 import pandas as pd
 
 from libs.datasets import can_model_output_schema as schema
+from libs.datasets.dataset_utils import AggregationLevel
 from libs.enums import Intervention
 from pyseir.deployment import webui_data_adaptor_v1
 
@@ -15,6 +18,23 @@ def get_can_projection_path(input_dir, fips, intervention) -> pathlib.Path:
     return file_path
 
 
+def get_can_projection_bulk_path(
+    input_dir, aggregation_level: AggregationLevel, intervention: Intervention
+) -> pathlib.Path:
+    """Returns the path of the projections of all regions of a level for an intervention."""
+    file_name = webui_data_adaptor_v1.get_bulk_output_filename(aggregation_level, intervention)
+    return pathlib.Path(input_dir) / file_name
+
+
+@lru_cache(maxsize=16)
+def _load_bulk_projections(
+    path: pathlib.Path, modified_time: float
+) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    # modified_time is part of the key so a rewritten file is read again.
+    data = pd.read_parquet(path)
+    return data, data.groupby(schema.FIPS, sort=False).indices
+
+
 def _calculate_shortfall(beds: pd.Series, hospitalized: pd.Series) -> pd.Series:
     shortfall = hospitalized - beds
     shortfall[shortfall > 0] = 0
@@ -35,18 +55,25 @@ class CANPyseirLocationOutput(object):
 
     @classmethod
     def load_from_path(cls, path):
-        data = pd.read_json(
-            path,
-            convert_dates=[schema.DATE],
-            dtype={schema.FIPS: str},
-            orient=webui_data_adaptor_v1.OUTPUT_JSON_ORIENT,
-        )
-        return cls(data)
+        return cls(webui_data_adaptor_v1.read_output_json(path))
 
     @classmethod
     def load_from_model_output_if_exists(
         cls, fips, intervention, input_dir
     ) -> Optional["CANPyseirLocationOutput"]:
+        """Loads the model output of a region if it exists.
+
+        Outputs are read from the projections file of all regions of the same level when it
+        includes the region, which is parsed once per process. Other regions are read from their
+        own json output.
+        """
+        level = AggregationLevel.STATE if len(fips) == 2 else AggregationLevel.COUNTY
+        bulk_path = get_can_projection_bulk_path(input_dir, level, intervention)
+        if bulk_path.exists():
+            data, rows_by_fips = _load_bulk_projections(bulk_path, bulk_path.stat().st_mtime)
+            if fips in rows_by_fips:
+                return cls(data.iloc[rows_by_fips[fips]])
+
         path = get_can_projection_path(input_dir, fips, intervention)
         if not path.exists():
             return None
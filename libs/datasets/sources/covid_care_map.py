@@ -1,4 +1,6 @@
+from typing import List
 import logging
+import pathlib
 import pandas as pd
 
 from covidactnow.datapublic.common_fields import CommonFields
@@ -81,6 +83,11 @@ class CovidCareMapBeds(data_source.DataSource):
         is_virgin_islands = data[cls.Fields.STATE] == "VI"
         return data[~is_virgin_islands]
 
+    @classmethod
+    def local_paths(cls) -> List[pathlib.Path]:
+        data_root = dataset_utils.LOCAL_PUBLIC_DATA_PATH
+        return [data_root / cls.COUNTY_DATA_PATH, data_root / cls.STATE_DATA_PATH]
+
     @classmethod
     def local(cls) -> "CovidCareMapBeds":
         data_root = dataset_utils.LOCAL_PUBLIC_DATA_PATH
@@ -1,3 +1,4 @@
+from typing import List
 import pathlib
 import pandas as pd
 
@@ -50,6 +51,10 @@ class FIPSPopulation(data_source.DataSource):
         data = self.standardize_data(data)
         super().__init__(data)
 
+    @classmethod
+    def local_paths(cls) -> List[pathlib.Path]:
+        return [cls.FILE_PATH]
+
     @classmethod
     def local(cls):
         return cls(cls.FILE_PATH)
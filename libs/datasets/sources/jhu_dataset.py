@@ -1,3 +1,4 @@
+from typing import List
 import logging
 import numpy
 import pandas as pd
@@ -165,6 +166,11 @@ class JHUDataset(data_source.DataSource):
 
         return pd.concat([data[~(is_county_level & has_fips)], result])
 
+    @classmethod
+    def local_paths(cls) -> List[pathlib.Path]:
+        data_root = dataset_utils.LOCAL_PUBLIC_DATA_PATH
+        return sorted((data_root / cls.DATA_FOLDER).glob("*.csv"))
+
     @classmethod
     def local(cls) -> "JHUDataset":
         data_root = dataset_utils.LOCAL_PUBLIC_DATA_PATH
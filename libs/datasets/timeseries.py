@@ -110,8 +110,7 @@ class TimeseriesDataset(dataset_base.DatasetBase):
         """Fetch a new TimeseriesDataset with a subset of the data in `self`.
 
         Some parameters are only used in ipython notebooks."""
-        row_binary_array = dataset_utils.make_binary_array(
-            self.data,
+        rows = self._get_rows(
             aggregation_level=aggregation_level,
             country=country,
             fips=fips,
@@ -121,7 +120,7 @@ class TimeseriesDataset(dataset_base.DatasetBase):
             after=after,
             before=before,
         )
-        return self.__class__(self.data.loc[row_binary_array, :])
+        return self.__class__(rows)
 
     def get_records_for_fips(self, fips) -> List[dict]:
         """Get data for FIPS code.
@@ -145,8 +144,7 @@ class TimeseriesDataset(dataset_base.DatasetBase):
         before: Optional[str] = None,
         columns_slice: Optional[List[str]] = None,
     ) -> pd.DataFrame:
-        rows_binary_array = dataset_utils.make_binary_array(
-            self.data,
+        rows = self._get_rows(
             aggregation_level=aggregation_level,
             country=country,
             fips=fips,
@@ -157,8 +155,8 @@ class TimeseriesDataset(dataset_base.DatasetBase):
             before=before,
         )
         if columns_slice is None:
-            columns_slice = slice(None, None, None)
-        return self.data.loc[rows_binary_array, columns_slice]
+            return rows
+        return rows.loc[:, columns_slice]
 
     @classmethod
     def from_source(
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Iterator, List, Optional
 from datetime import datetime, timedelta
 from api.can_api_definition import (
     AggregateRegionSummary,
@@ -129,11 +129,14 @@ def generate_region_summary(
     )
 
 
-def generate_region_timeseries(
-    region_summary: RegionSummary,
-    timeseries: TimeseriesDataset,
-    model_output: Optional[CANPyseirLocationOutput],
-) -> RegionSummaryWithTimeseries:
+def generate_actuals_timeseries(
+    region_summary: RegionSummary, timeseries: TimeseriesDataset
+) -> List[ActualsTimeseriesRow]:
+    """Builds the actuals timeseries of a region.
+
+    Actuals do not depend on model output, the same rows can be used for the region timeseries
+    of every intervention.
+    """
     if not region_summary.intervention:
         # All region summaries here are expected to have actuals values.
         # It's a bit unclear why the actuals value is optional in the first place,
@@ -149,6 +152,27 @@ def generate_region_timeseries(
         timeseries_row = ActualsTimeseriesRow(**actual.dict(), date=row[CommonFields.DATE])
         actuals_timeseries.append(timeseries_row)
 
+    return actuals_timeseries
+
+
+def generate_region_timeseries(
+    region_summary: RegionSummary,
+    timeseries: TimeseriesDataset,
+    model_output: Optional[CANPyseirLocationOutput],
+    actuals_timeseries: Optional[List[ActualsTimeseriesRow]] = None,
+) -> RegionSummaryWithTimeseries:
+    """Builds the timeseries of a region.
+
+    Args:
+        region_summary: Summary of the region.
+        timeseries: Timeseries of the region.
+        model_output: Optional model output to add projections from.
+        actuals_timeseries: Rows from `generate_actuals_timeseries`, built from `timeseries` if
+            not set.
+    """
+    if actuals_timeseries is None:
+        actuals_timeseries = generate_actuals_timeseries(region_summary, timeseries)
+
     model_timeseries = []
     if model_output:
         model_timeseries = [
@@ -162,6 +186,26 @@ def generate_region_timeseries(
     )
 
 
+def generate_flattened_timeseries_rows(
+    region_timeseries: RegionSummaryWithTimeseries,
+) -> Iterator[PredictionTimeseriesRowWithHeader]:
+    """Yields the timeseries rows of a region, with summary data added to each row."""
+    summary_data = {
+        "countryName": region_timeseries.countryName,
+        "countyName": region_timeseries.countyName,
+        "stateName": region_timeseries.stateName,
+        "fips": region_timeseries.fips,
+        "lat": region_timeseries.lat,
+        "long": region_timeseries.long,
+        "intervention": region_timeseries.intervention.name,
+        # TODO(chris): change this to reflect latest time data updated?
+        "lastUpdatedDate": datetime.utcnow(),
+    }
+
+    for timeseries_data in region_timeseries.timeseries:
+        yield PredictionTimeseriesRowWithHeader(**summary_data, **timeseries_data.dict())
+
+
 def generate_bulk_flattened_timeseries(
     bulk_timeseries: AggregateRegionSummary,
 ) -> AggregateFlattenedTimeseries:
@@ -169,22 +213,6 @@ def generate_bulk_flattened_timeseries(
     for region_timeseries in bulk_timeseries.__root__:
         # Iterate through each state or county in data, adding summary data to each
         # timeseries row.
-        summary_data = {
-            "countryName": region_timeseries.countryName,
-            "countyName": region_timeseries.countyName,
-            "stateName": region_timeseries.stateName,
-            "fips": region_timeseries.fips,
-            "lat": region_timeseries.lat,
-            "long": region_timeseries.long,
-            "intervention": region_timeseries.intervention.name,
-            # TODO(chris): change this to reflect latest time data updated?
-            "lastUpdatedDate": datetime.utcnow(),
-        }
-
-        for timeseries_data in region_timeseries.timeseries:
-            timeseries_row = PredictionTimeseriesRowWithHeader(
-                **summary_data, **timeseries_data.dict()
-            )
-            rows.append(timeseries_row)
+        rows.extend(generate_flattened_timeseries_rows(region_timeseries))
 
     return AggregateFlattenedTimeseries(__root__=rows)
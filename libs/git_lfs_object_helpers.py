@@ -4,8 +4,13 @@ Helpers for accessing Git LFS objects from commit history.
 Provides a surface for easy loading of previous versions of Git LFS data.
 """
 
-from typing import Optional
+from typing import List, Optional, Tuple
+from functools import lru_cache
+import bisect
 import datetime
+import hashlib
+import json
+import os
 import subprocess
 import re
 import pathlib
@@ -15,6 +20,92 @@ from libs.datasets import dataset_utils
 
 _logger = structlog.getLogger(__name__)
 
+# Holds commit indexes and parsed copies of historical datasets, all keyed by git shas.
+CACHE_DIRECTORY = dataset_utils.DATA_DIRECTORY / "history_cache"
+
+
+def _repo_relative_path(repo: git.Repo, path: pathlib.Path) -> pathlib.Path:
+    # Converts to a path relative from the repo root if path is absolute.
+    if path.absolute() == path:
+        root = pathlib.Path(repo.common_dir).parent
+        path = path.relative_to(root)
+    return path
+
+
+class CommitIndex:
+    """Commits changing a file, newest first, with their commit timestamps.
+
+    Stored as JSON under CACHE_DIRECTORY keyed by the file path and the HEAD sha it was built
+    at, so the history is only walked again after HEAD moves.
+
+    Args:
+        commits: (commit timestamp, sha) pairs in `git rev-list` order.
+    """
+
+    def __init__(self, commits: List[Tuple[int, str]]):
+        self.commits = commits
+        # Running minimum of the timestamps, negated to give an ascending list for bisect. The
+        # first commit older than a date is also the first whose running minimum is older.
+        self._negated_min_timestamps = []
+        min_timestamp = None
+        for timestamp, _ in commits:
+            if min_timestamp is None or timestamp < min_timestamp:
+                min_timestamp = timestamp
+            self._negated_min_timestamps.append(-min_timestamp)
+
+    def sha_before(self, before: datetime.datetime) -> Optional[str]:
+        """Returns the sha of the first commit, newest first, committed before `before`."""
+        position = bisect.bisect_right(self._negated_min_timestamps, -before.timestamp())
+        if position == len(self.commits):
+            return None
+        return self.commits[position][1]
+
+    @classmethod
+    def build(cls, repo: git.Repo, path: pathlib.Path) -> "CommitIndex":
+        output = repo.git.rev_list("--timestamp", "HEAD", "--", str(path))
+        commits = []
+        for line in output.splitlines():
+            timestamp, sha = line.split()
+            commits.append((int(timestamp), sha))
+        return cls(commits)
+
+
+def _commit_index_path(path: pathlib.Path, head_sha: str) -> pathlib.Path:
+    path_hash = hashlib.sha256(str(path).encode()).hexdigest()[:16]
+    return CACHE_DIRECTORY / f"commits.{path_hash}.{head_sha}.json"
+
+
+@lru_cache(None)
+def _load_commit_index(git_dir: str, path: pathlib.Path, head_sha: str) -> CommitIndex:
+    index_path = _commit_index_path(path, head_sha)
+    if index_path.exists():
+        return CommitIndex([tuple(commit) for commit in json.loads(index_path.read_text())])
+
+    index = CommitIndex.build(git.Repo(git_dir), path)
+    # Written to a temporary file first so that other processes never read a partial index.
+    temp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+        for stale_path in CACHE_DIRECTORY.glob(index_path.name.replace(head_sha, "*")):
+            try:
+                stale_path.unlink()
+            except FileNotFoundError:
+                # Removed by another process updating the same index.
+                pass
+        temp_path.write_text(json.dumps(index.commits))
+        os.replace(temp_path, index_path)
+    except OSError:
+        _logger.warning("Unable to write commit index", path=str(index_path), exc_info=True)
+        if temp_path.exists():
+            temp_path.unlink()
+    return index
+
+
+def get_commit_index(repo: git.Repo, path: pathlib.Path) -> CommitIndex:
+    """Returns the index of commits changing `path`, as of the current HEAD."""
+    path = _repo_relative_path(repo, path)
+    return _load_commit_index(repo.git_dir, path, repo.head.commit.hexsha)
+
 
 def find_commit(
     repo: git.Repo,
@@ -39,22 +130,31 @@ def find_commit(
     """
     if commit_sha:
         return repo.commit(commit_sha)
+
+    index = get_commit_index(repo, path)
+    commits = index.commits
     if previous_commit:
-        commit_iterator = repo.iter_commits(paths=path)
-        _ = next(commit_iterator)
-        return next(commit_iterator)
+        return repo.commit(commits[1][1])
 
     if before:
-        before = datetime.datetime.fromisoformat(before)
+        sha = index.sha_before(datetime.datetime.fromisoformat(before))
+        return repo.commit(sha) if sha else None
 
-    for commit in repo.iter_commits(paths=path):
-        if not before:
-            return commit
+    return repo.commit(commits[0][1]) if commits else None
+
+
+def find_blob(repo: git.Repo, path: pathlib.Path, commit: git.Commit) -> git.Blob:
+    """Returns the blob of `path` at `commit`.
+
+    For LFS files this is the pointer file, so its sha identifies the file contents.
+    """
+    return commit.tree / str(_repo_relative_path(repo, path))
 
-        if commit.committed_datetime >= before:
-            continue
 
-        return commit
+def read_blob_data(blob: git.Blob) -> bytes:
+    """Reads the data of a blob, fetching LFS data if necessary."""
+    pointer_text = blob.data_stream.read()
+    return subprocess.check_output(["git", "lfs", "smudge"], input=pointer_text)
 
 
 def read_data_for_commit(repo: git.Repo, path: pathlib.Path, commit: git.Commit) -> bytes:
@@ -67,14 +167,7 @@ def read_data_for_commit(repo: git.Repo, path: pathlib.Path, commit: git.Commit)
 
     Returns: Bytes for file at commit.
     """
-    # blob expects relative path, converts to relative from the repo root if path is absolute.
-    if path.absolute() == path:
-        root = pathlib.Path(repo.common_dir).parent
-        path = path.relative_to(root)
-
-    blob = commit.tree / str(path)
-    pointer_text = blob.data_stream.read()
-    return subprocess.check_output(["git", "lfs", "smudge"], input=pointer_text)
+    return read_blob_data(find_blob(repo, path, commit))
 
 
 # TODO(chris): Streamline options for choosing the correct commit. Instead of passing specific
@@ -97,9 +190,26 @@ def get_data_for_path(
         previous_commit: Returns the previous commit for the file.
         commit_sha: Commit SHA.
 
+    """
+    blob = get_blob_for_path(
+        path, repo=repo, before=before, previous_commit=previous_commit, commit=commit
+    )
+    return read_blob_data(blob)
+
+
+def get_blob_for_path(
+    path: pathlib.Path,
+    repo: git.Repo = None,
+    before: str = None,
+    previous_commit=False,
+    commit: str = None,
+) -> git.Blob:
+    """Finds the blob of a given path, with the same options as `get_data_for_path`.
+
+    The blob sha identifies the file contents, it can be used to cache data read from it.
     """
     repo = repo or git.Repo(dataset_utils.REPO_ROOT)
     commit = find_commit(
         repo, path, before=before, previous_commit=previous_commit, commit_sha=commit
     )
-    return read_data_for_commit(repo, path, commit)
+    return find_blob(repo, path, commit)
@@ -0,0 +1,162 @@
+"""
+Sinks for writing many small output files.
+
+Build outputs include thousands of small per-region files. `DirectorySink` writes them from a
+bounded pool of threads, so that opening, writing and closing files overlaps with building the
+next outputs, and creates each directory once. `ArchiveSink` writes them as members of a single
+tar or zip archive instead.
+"""
+from typing import Optional, Set, Union
+import concurrent.futures
+import io
+import json
+import pathlib
+import tarfile
+import threading
+import time
+import zipfile
+
+# Name of the member of tar archives listing the position of every other member.
+TAR_INDEX_NAME = "index.json"
+
+
+class OutputSink:
+    """Destination of output files, named by paths relative to the root of the sink.
+
+    Writes may complete after `write` returns. Errors are raised by `flush` or `close`.
+    """
+
+    def write(self, path: str, data: Union[str, bytes]):
+        raise NotImplementedError()
+
+    def flush(self):
+        """Waits for all writes to complete."""
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DirectorySink(OutputSink):
+    """Writes files below a directory from a bounded pool of threads.
+
+    Args:
+        root: Directory to write files to, created if it does not exist.
+        max_workers: Number of writer threads.
+        max_pending: Number of writes that may be queued before `write` blocks, bounding the
+            memory held by queued data.
+    """
+
+    def __init__(self, root: pathlib.Path, max_workers: int = 8, max_pending: int = 256):
+        self.root = pathlib.Path(root)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="output-sink"
+        )
+        self._pending_slots = threading.BoundedSemaphore(max_pending)
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._created_dirs: Set[pathlib.Path] = set()
+        self._created_dirs_lock = threading.Lock()
+
+    def _ensure_dir(self, directory: pathlib.Path):
+        if directory in self._created_dirs:
+            return
+        with self._created_dirs_lock:
+            if directory not in self._created_dirs:
+                directory.mkdir(parents=True, exist_ok=True)
+                self._created_dirs.add(directory)
+
+    def _write(self, path: pathlib.Path, data: Union[str, bytes]):
+        self._ensure_dir(path.parent)
+        if isinstance(data, str):
+            # Same as pathlib.Path.write_text, so outputs do not change with the sink used.
+            path.write_text(data)
+        else:
+            path.write_bytes(data)
+
+    def _on_done(self, future: concurrent.futures.Future):
+        self._pending_slots.release()
+        if not future.exception():
+            with self._pending_lock:
+                self._pending.discard(future)
+
+    def write(self, path: str, data: Union[str, bytes]):
+        self._pending_slots.acquire()
+        future = self._executor.submit(self._write, self.root / path, data)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+
+    def flush(self):
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            # Raises the error of a failed write. Failed writes stay pending, so that they are
+            # raised again by later flushes and by close.
+            future.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+
+
+class ArchiveSink(OutputSink):
+    """Writes files as members of a single tar or zip archive.
+
+    Zip archives list their members in the central directory. Tar archives have no index of
+    their own, so a TAR_INDEX_NAME member is added last, mapping the name of every member to the
+    offset and size of its data in the archive.
+
+    Args:
+        path: Path of the archive, a tar archive unless the suffix is .zip.
+        compress: Deflate zip members. Ignored for tar archives.
+    """
+
+    def __init__(self, path: pathlib.Path, compress: bool = False):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._tar: Optional[tarfile.TarFile] = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar_index = {}
+        if self.path.suffix == ".zip":
+            compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            self._zip = zipfile.ZipFile(self.path, "w", compression=compression)
+        else:
+            self._tar = tarfile.open(self.path, "w")
+
+    def _add_tar_member(self, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = time.time()
+        self._tar.addfile(info, io.BytesIO(data))
+        # The data of the member ends at the current offset, padded to a whole block.
+        padded_size = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self._tar_index[name] = {"offset": self._tar.offset - padded_size, "size": info.size}
+
+    def write(self, path: str, data: Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode()
+        with self._lock:
+            if self._zip:
+                self._zip.writestr(path, data)
+            else:
+                self._add_tar_member(path, data)
+
+    def close(self):
+        with self._lock:
+            if self._zip:
+                self._zip.close()
+                return
+            if self._tar.closed:
+                return
+            index = json.dumps({"members": self._tar_index}).encode()
+            self._add_tar_member(TAR_INDEX_NAME, index)
+            self._tar.close()
@@ -1,5 +1,6 @@
-from typing import List, Optional, Iterator, Tuple
+from typing import Dict, Iterable, List, Optional, Iterator, Tuple
 import pathlib
+import contextlib
 import functools
 from collections import namedtuple
 import logging
@@ -18,6 +19,8 @@ from libs.enums import Intervention
 from libs.datasets import CommonFields
 from libs.datasets.dataset_utils import AggregationLevel
 from libs import dataset_deployer
+from libs import output_sink
+from libs.worker_pool import WorkerPool
 from libs.us_state_abbrev import US_STATE_ABBREV
 from libs.datasets import combined_datasets
 from libs.datasets.latest_values_dataset import LatestValuesDataset
@@ -30,33 +33,86 @@ logger = structlog.getLogger()
 PROD_BUCKET = "data.covidactnow.org"
 
 
-def run_on_all_fips_for_intervention(
+# Arguments of build_timeseries_for_fips_interventions shared by every task of a worker, set by
+# _init_build_timeseries_worker.
+_worker_inputs = None
+
+
+def _init_build_timeseries_worker(interventions, latest_values, timeseries, model_output_dir):
+    global _worker_inputs
+    _worker_inputs = (interventions, latest_values, timeseries, model_output_dir)
+
+
+def _build_timeseries_for_fips_task(fips):
+    return build_timeseries_for_fips_interventions(*_worker_inputs, fips)
+
+
+def iter_timeseries_for_interventions(
     latest_values: LatestValuesDataset,
     timeseries: TimeseriesDataset,
-    intervention: Intervention,
+    interventions: List[Intervention],
     model_output_dir: pathlib.Path,
     pool: multiprocessing.Pool = None,
-    sort_func=None,
-    limit=None,
-) -> Iterator[RegionSummaryWithTimeseries]:
-    run_fips = functools.partial(
-        build_timeseries_for_fips, intervention, latest_values, timeseries, model_output_dir
-    )
+) -> Iterator[Dict[Intervention, RegionSummaryWithTimeseries]]:
+    """Yields the API timeseries of each region in fips order, as workers finish them.
 
+    Each region is processed once for all interventions, see
+    `build_timeseries_for_fips_interventions`. Regions without output for any intervention are
+    skipped.
+    """
     # Load interventions outside of subprocesses to properly cache.
     get_can_projection.get_interventions()
 
-    # Setting maxtasksperchild to one ensures that we minimize memory usage over time by creating
-    # a new child for every task. Addresses OOMs we saw on highly parallel build machine.
-    pool = pool or multiprocessing.Pool(maxtasksperchild=1)
-    results = pool.map(run_fips, latest_values.all_fips)
-    all_timeseries = []
+    if pool:
+        run_fips = functools.partial(
+            build_timeseries_for_fips_interventions,
+            interventions,
+            latest_values,
+            timeseries,
+            model_output_dir,
+        )
+        yield from filter(None, pool.imap(run_fips, latest_values.all_fips))
+        return
 
-    for region_timeseries in results:
-        if not region_timeseries:
-            continue
+    # The datasets are handed to each worker once instead of with every task. Workers are
+    # replaced when they go over the pool memory limit, which addresses OOMs we saw on highly
+    # parallel build machines.
+    inputs = (interventions, latest_values, timeseries, model_output_dir)
+    with WorkerPool(initializer=_init_build_timeseries_worker, initargs=inputs) as pool:
+        yield from filter(None, pool.imap(_build_timeseries_for_fips_task, latest_values.all_fips))
 
-        all_timeseries.append(region_timeseries)
+
+def iter_timeseries_for_intervention(
+    latest_values: LatestValuesDataset,
+    timeseries: TimeseriesDataset,
+    intervention: Intervention,
+    model_output_dir: pathlib.Path,
+    pool: multiprocessing.Pool = None,
+) -> Iterator[RegionSummaryWithTimeseries]:
+    """Yields the API timeseries of each region in fips order, as workers finish them.
+
+    Regions without output are skipped.
+    """
+    for region_results in iter_timeseries_for_interventions(
+        latest_values, timeseries, [intervention], model_output_dir, pool=pool
+    ):
+        yield region_results[intervention]
+
+
+def run_on_all_fips_for_intervention(
+    latest_values: LatestValuesDataset,
+    timeseries: TimeseriesDataset,
+    intervention: Intervention,
+    model_output_dir: pathlib.Path,
+    pool: multiprocessing.Pool = None,
+    sort_func=None,
+    limit=None,
+) -> List[RegionSummaryWithTimeseries]:
+    all_timeseries = list(
+        iter_timeseries_for_intervention(
+            latest_values, timeseries, intervention, model_output_dir, pool=pool
+        )
+    )
 
     if sort_func:
         all_timeseries.sort(key=sort_func)
@@ -70,60 +126,223 @@ def run_on_all_fips_for_intervention(
 def build_timeseries_for_fips(
     intervention, us_latest, us_timeseries, model_output_dir, fips
 ) -> Optional[RegionSummaryWithTimeseries]:
+    results = build_timeseries_for_fips_interventions(
+        [intervention], us_latest, us_timeseries, model_output_dir, fips
+    )
+    return results.get(intervention)
+
+
+def build_timeseries_for_fips_interventions(
+    interventions, us_latest, us_timeseries, model_output_dir, fips
+) -> Dict[Intervention, RegionSummaryWithTimeseries]:
+    """Builds the API timeseries of a region for each intervention.
+
+    The latest values, timeseries and actuals of the region do not depend on the intervention,
+    they are looked up and built once and shared by the results of every intervention.
+
+    Returns: Region timeseries by intervention, for the interventions with output.
+    """
     fips_latest = us_latest.get_record_for_fips(fips)
+    fips_timeseries = None
+    actuals_timeseries = None
+    model_outputs = {}
+    results = {}
 
-    if intervention is Intervention.SELECTED_INTERVENTION:
-        state = fips_latest[CommonFields.STATE]
-        intervention = get_can_projection.get_intervention_for_state(state)
+    for intervention in interventions:
+        model_intervention = intervention
+        if intervention is Intervention.SELECTED_INTERVENTION:
+            state = fips_latest[CommonFields.STATE]
+            model_intervention = get_can_projection.get_intervention_for_state(state)
 
-    model_output = CANPyseirLocationOutput.load_from_model_output_if_exists(
-        fips, intervention, model_output_dir
-    )
-    if not model_output and intervention is not Intervention.OBSERVED_INTERVENTION:
-        # All model output is currently tied to a specific intervention. However,
-        # we want to generate results for regions that don't have a fit result, but we're not
-        # duplicating non-model outputs.
-        return None
-
-    try:
-        region_summary = api.generate_region_summary(fips_latest, model_output)
-        fips_timeseries = us_timeseries.get_subset(None, fips=fips)
-        region_timeseries = api.generate_region_timeseries(
-            region_summary, fips_timeseries, model_output
-        )
-    except Exception:
-        logger.error(f"failed to run output", fips=fips)
-        return None
+        # The selected intervention shares the model output of the intervention of its state.
+        if model_intervention not in model_outputs:
+            model_output = CANPyseirLocationOutput.load_from_model_output_if_exists(
+                fips, model_intervention, model_output_dir
+            )
+            model_outputs[model_intervention] = model_output
+        model_output = model_outputs[model_intervention]
+        if not model_output and model_intervention is not Intervention.OBSERVED_INTERVENTION:
+            # All model output is currently tied to a specific intervention. However,
+            # we want to generate results for regions that don't have a fit result, but we're not
+            # duplicating non-model outputs.
+            continue
+
+        try:
+            region_summary = api.generate_region_summary(fips_latest, model_output)
+            if actuals_timeseries is None:
+                fips_timeseries = us_timeseries.get_subset(None, fips=fips)
+                actuals_timeseries = api.generate_actuals_timeseries(
+                    region_summary, fips_timeseries
+                )
+            results[intervention] = api.generate_region_timeseries(
+                region_summary, fips_timeseries, model_output, actuals_timeseries=actuals_timeseries
+            )
+        except Exception:
+            logger.error(f"failed to run output", fips=fips)
 
-    return region_timeseries
+    return results
 
 
-def _deploy_timeseries(intervention, region_folder, timeseries):
+def _deploy_timeseries(intervention, region_sink: output_sink.OutputSink, timeseries):
     region_summary = timeseries.region_summary
-    deploy_json_api_output(intervention, region_summary, region_folder)
-    deploy_json_api_output(intervention, timeseries, region_folder)
+    region_sink.write(region_summary.output_key(intervention) + ".json", region_summary.json())
+    region_sink.write(timeseries.output_key(intervention) + ".json", timeseries.json())
     return region_summary
 
 
-def deploy_single_level(intervention, all_timeseries, summary_folder, region_folder):
-    if not all_timeseries:
-        return
-    logger.info(f"Deploying {intervention.name}")
-
-    all_summaries = []
-    deploy_timeseries_partial = functools.partial(_deploy_timeseries, intervention, region_folder)
-    all_summaries = [
-        deploy_timeseries_partial(region_timeseries) for region_timeseries in all_timeseries
-    ]
-    bulk_timeseries = AggregateRegionSummaryWithTimeseries(__root__=all_timeseries)
-    bulk_summaries = AggregateRegionSummary(__root__=all_summaries)
-    flattened_timeseries = api.generate_bulk_flattened_timeseries(bulk_timeseries)
-
-    deploy_json_api_output(intervention, bulk_timeseries, summary_folder)
-    deploy_csv_api_output(intervention, flattened_timeseries, summary_folder)
-
-    deploy_json_api_output(intervention, bulk_summaries, summary_folder)
-    deploy_csv_api_output(intervention, bulk_summaries, summary_folder)
+class BulkApiWriter:
+    """Writes the API outputs of one aggregation level as region results arrive.
+
+    Each region is written to its own files, and appended to the bulk timeseries json, the
+    flattened timeseries csv and the bulk summary json and csv. Output is the same as
+    serializing `AggregateRegionSummaryWithTimeseries`, `AggregateFlattenedTimeseries` and
+    `AggregateRegionSummary` models of all regions, while only one region is held in memory.
+    Used as a context manager, the bulk files replace those of a previous run only if no
+    exception is raised.
+
+    Args:
+        intervention: Intervention of the results.
+        summary_folder: Output directory of the bulk files.
+        region_sink: Sink of the per region files.
+    """
+
+    def __init__(
+        self,
+        intervention: Intervention,
+        summary_folder: pathlib.Path,
+        region_sink: output_sink.OutputSink,
+    ):
+        self.intervention = intervention
+        self.summary_folder = summary_folder
+        self.region_sink = region_sink
+        self._timeseries_json = None
+        self._flattened_csv = None
+        self._summaries_json = None
+        self._summaries_csv = None
+
+    def _open(self, first_region: RegionSummaryWithTimeseries):
+        logger.info(f"Deploying {self.intervention.name}")
+        if not self.summary_folder.exists():
+            self.summary_folder.mkdir(parents=True, exist_ok=True)
+
+        # Output keys only depend on the aggregation level of the regions.
+        timeseries_key = AggregateRegionSummaryWithTimeseries.construct(
+            __root__=[first_region]
+        ).output_key(self.intervention)
+        flattened_key = AggregateFlattenedTimeseries.construct(__root__=[first_region]).output_key(
+            self.intervention
+        )
+        summaries_key = AggregateRegionSummary.construct(__root__=[first_region]).output_key(
+            self.intervention
+        )
+        folder = self.summary_folder
+        self._timeseries_json = dataset_deployer.JsonArrayWriter(folder / f"{timeseries_key}.json")
+        self._flattened_csv = dataset_deployer.NestedCsvWriter(folder / f"{flattened_key}.csv")
+        self._summaries_json = dataset_deployer.JsonArrayWriter(folder / f"{summaries_key}.json")
+        self._summaries_csv = dataset_deployer.NestedCsvWriter(folder / f"{summaries_key}.csv")
+
+    def write_region(self, region_timeseries: RegionSummaryWithTimeseries):
+        if not self._timeseries_json:
+            self._open(region_timeseries)
+
+        region_summary = _deploy_timeseries(self.intervention, self.region_sink, region_timeseries)
+        self._timeseries_json.write_item(region_timeseries.json())
+        for row in api.generate_flattened_timeseries_rows(region_timeseries):
+            self._flattened_csv.write_row(row.dict())
+        self._summaries_json.write_item(region_summary.json())
+        self._summaries_csv.write_row(region_summary.dict())
+
+    def _writers(self):
+        writers = [
+            self._timeseries_json,
+            self._flattened_csv,
+            self._summaries_json,
+            self._summaries_csv,
+        ]
+        return [writer for writer in writers if writer]
+
+    def close(self):
+        for writer in self._writers():
+            writer.close()
+
+    def discard(self):
+        """Removes the bulk files written so far, keeping the files of a previous run."""
+        for writer in self._writers():
+            writer.discard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type:
+            self.discard()
+        else:
+            self.close()
+
+
+def deploy_single_level(
+    intervention: Intervention,
+    all_timeseries: Iterable[RegionSummaryWithTimeseries],
+    summary_folder: pathlib.Path,
+    region_folder: pathlib.Path,
+    region_sink: Optional[output_sink.OutputSink] = None,
+):
+    """Writes the region and bulk API outputs of regions of one aggregation level.
+
+    Per region files are written to `region_folder`, or to `region_sink` if set.
+    """
+    with contextlib.ExitStack() as stack:
+        if not region_sink:
+            region_sink = stack.enter_context(output_sink.DirectorySink(region_folder))
+        writer = stack.enter_context(BulkApiWriter(intervention, summary_folder, region_sink))
+        for region_timeseries in all_timeseries:
+            writer.write_region(region_timeseries)
+
+
+def deploy_all_levels(
+    intervention: Intervention,
+    all_timeseries: Iterable[RegionSummaryWithTimeseries],
+    summary_folder: pathlib.Path,
+    region_folder: pathlib.Path,
+    region_sink: Optional[output_sink.OutputSink] = None,
+):
+    """Writes the API outputs of county and state regions, iterating over results once.
+
+    Results can be consumed from `iter_timeseries_for_intervention` as they are built, keeping
+    a single region in memory at a time.
+    """
+    all_region_results = ({intervention: timeseries} for timeseries in all_timeseries)
+    deploy_all_interventions(
+        all_region_results, summary_folder, region_folder, region_sink=region_sink
+    )
+
+
+def deploy_all_interventions(
+    all_region_results: Iterable[Dict[Intervention, RegionSummaryWithTimeseries]],
+    summary_folder: pathlib.Path,
+    region_folder: pathlib.Path,
+    region_sink: Optional[output_sink.OutputSink] = None,
+):
+    """Writes the API outputs of county and state regions for every intervention.
+
+    Results of each region, by intervention, are routed to the writer of their intervention and
+    aggregation level. They can be consumed from `iter_timeseries_for_interventions` as they are
+    built. Per region files are written to `region_folder`, or to `region_sink` if set.
+    """
+    with contextlib.ExitStack() as stack:
+        # Entered first so that pending region files are flushed after the bulk files close.
+        if not region_sink:
+            region_sink = stack.enter_context(output_sink.DirectorySink(region_folder))
+        writers = {}
+        for region_results in all_region_results:
+            for intervention, region_timeseries in region_results.items():
+                level = region_timeseries.aggregate_level
+                if level not in (AggregationLevel.COUNTY, AggregationLevel.STATE):
+                    continue
+                if (intervention, level) not in writers:
+                    writer = BulkApiWriter(intervention, summary_folder, region_sink)
+                    writers[intervention, level] = stack.enter_context(writer)
+                writers[intervention, level].write_region(region_timeseries)
 
 
 def deploy_json_api_output(
@@ -0,0 +1,135 @@
+"""
+Process pools whose workers are reused across tasks and recycled by memory use.
+
+Pools used to be created with `maxtasksperchild=1`, starting a new worker for every task to keep
+memory from growing over long runs. `WorkerPool` instead keeps each worker for as many tasks as
+it can run while its memory stays under a ceiling, and replaces it after the task that takes it
+over the ceiling.
+
+Large read-only inputs are handed to workers once, through the pool initializer, rather than with
+every task. With the default fork start method, initializer arguments and the combined datasets
+loaded by the parent before the pool starts are inherited by the workers without being copied or
+pickled, and their pages stay shared until written to.
+"""
+from typing import Optional
+import multiprocessing
+import multiprocessing.pool
+import resource
+import sys
+
+import structlog
+
+from libs.datasets import combined_datasets
+
+_logger = structlog.getLogger(__name__)
+
+# Private memory a worker may use before it is replaced by a fresh process.
+DEFAULT_MEMORY_LIMIT_BYTES = 4 * 1024 ** 3
+
+
+def load_combined_datasets():
+    """Pool initializer loading the combined latest and timeseries datasets.
+
+    A no-op for forked workers when the parent loaded them before starting the pool.
+    """
+    combined_datasets.load_us_latest_dataset()
+    combined_datasets.load_us_timeseries_dataset()
+
+
+def get_worker_memory_bytes() -> int:
+    """Returns the memory used by the current process and not shared with other processes.
+
+    Pages inherited from the parent and not yet written to are not counted. Where
+    /proc/self/smaps_rollup is not available this falls back to the peak resident set size,
+    which does count them.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            private_kb = sum(
+                int(line.split()[1])
+                for line in f
+                if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+        return private_kb * 1024
+    except OSError:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+        return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class _MemoryLimitedQueue:
+    """Wraps the task queue of a worker, ending the worker once it is over its memory limit.
+
+    `multiprocessing.pool.worker` fetches each task with `get`. Once the worker ran a task and is
+    over the limit, `get` returns the exit sentinel instead of the next task. The worker then
+    exits as it does after `maxtasksperchild` tasks, and the pool starts a replacement.
+    """
+
+    def __init__(self, queue, memory_limit: int):
+        self._queue = queue
+        self._memory_limit = memory_limit
+        self._ran_task = False
+
+    def get(self):
+        if self._ran_task:
+            memory_bytes = get_worker_memory_bytes()
+            if memory_bytes > self._memory_limit:
+                _logger.info(
+                    "Replacing worker over memory limit",
+                    memory=memory_bytes,
+                    limit=self._memory_limit,
+                )
+                return None
+        task = self._queue.get()
+        self._ran_task = True
+        return task
+
+    def __getattr__(self, name):
+        return getattr(self._queue, name)
+
+
+def _memory_limited_worker(
+    inqueue, outqueue, initializer, initargs, maxtasks, wrap_exception, memory_limit
+):
+    multiprocessing.pool.worker(
+        _MemoryLimitedQueue(inqueue, memory_limit),
+        outqueue,
+        initializer,
+        initargs,
+        maxtasks,
+        wrap_exception,
+    )
+
+
+class WorkerPool(multiprocessing.pool.Pool):
+    """Process pool reusing workers until they use more than `memory_limit` bytes.
+
+    Args:
+        processes: Number of workers, defaults to the number of CPUs.
+        initializer: Called with `initargs` once when each worker starts.
+        initargs: Arguments for `initializer`.
+        memory_limit: Private memory in bytes a worker may reach before it is replaced, checked
+            after each task.
+        context: Multiprocessing context.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        initializer=None,
+        initargs=(),
+        memory_limit: int = DEFAULT_MEMORY_LIMIT_BYTES,
+        context=None,
+    ):
+        self._memory_limit = memory_limit
+        super().__init__(processes, initializer, initargs, context=context)
+
+    # Replaces the target of worker processes, started with the arguments of
+    # `multiprocessing.pool.worker`. Pool.Process is an instance method on Python 3.7 and a
+    # staticmethod called with the context as first argument from 3.8, which this override
+    # passes through. Checked against CPython 3.7 to 3.12, worker_pool_test fails if the
+    # signature of `multiprocessing.pool.worker` changes.
+    def Process(self, *args, **kwds):
+        kwds["target"] = _memory_limited_worker
+        kwds["args"] = tuple(kwds["args"]) + (self._memory_limit,)
+        return super().Process(*args, **kwds)
@@ -8,7 +8,7 @@ import seaborn as sns
 from collections import defaultdict
 from datetime import datetime, timedelta
 from matplotlib.dates import DateFormatter
-from multiprocessing import Pool
+from libs.worker_pool import WorkerPool, load_combined_datasets
 from functools import partial
 from pyseir import load_data
 from pyseir.load_data import HospitalizationDataType
@@ -566,5 +566,5 @@ def run_for_fips_list(
     """
 
     kwargs = kwargs or {}
-    with Pool(maxtasksperchild=1) as p:
+    with WorkerPool(initializer=load_combined_datasets) as p:
         p.map(partial(Backtester.run_for_fips, kwargs), fips)
@@ -9,9 +9,9 @@ import logging
 import pandas as pd
 from covidactnow.datapublic import common_init
 
-from multiprocessing import Pool
+from libs.worker_pool import WorkerPool, load_combined_datasets
 from functools import partial
-from pyseir.rt import infer_rt
+from pyseir.rt import infer_rt, infer_rt_batch
 from pyseir.ensembles import ensemble_runner
 from pyseir.inference import model_fitter
 from pyseir.deployment.webui_data_adaptor_v1 import WebUIDataAdaptorV1
@@ -53,9 +53,9 @@ def _run_infer_rt(states: List[str], states_only=False):
         infer_rt.run_rt_for_fips(fips)
 
 
-def _run_mle_fits(states: List[str], states_only=False):
+def _run_mle_fits(states: List[str], states_only=False, warm_start=False):
     for state in states:
-        model_fitter.run_state(state, states_only=states_only)
+        model_fitter.run_state(state, states_only=states_only, warm_start=warm_start)
 
 
 def _run_ensembles(states, ensemble_kwargs=dict(), states_only=False):
@@ -69,28 +69,26 @@ def _map_outputs(
     web_ui_mapper = WebUIDataAdaptorV1(
         output_interval_days=output_interval_days, run_mode=run_mode, output_dir=output_dir,
     )
-    for state in states:
-        web_ui_mapper.generate_state(state, whitelisted_county_fips=[], states_only=states_only)
+    web_ui_mapper.generate_states({state: [] for state in states}, states_only=states_only)
 
 
 def _state_only_pipeline(
-    state, run_mode=DEFAULT_RUN_MODE, output_interval_days=1, output_dir=None,
+    state, run_mode=DEFAULT_RUN_MODE, output_interval_days=1, output_dir=None, warm_start=False,
 ):
     states_only = True
 
     states = [state]
     _run_infer_rt(states, states_only=states_only)
-    _run_mle_fits(states, states_only=states_only)
+    _run_mle_fits(states, states_only=states_only, warm_start=warm_start)
     _run_ensembles(
         states, ensemble_kwargs=dict(run_mode=run_mode), states_only=states_only,
     )
-    # remove outputs atm. just output at the end
-    _map_outputs(
-        states,
-        output_interval_days,
-        states_only=states_only,
-        output_dir=output_dir,
-        run_mode=run_mode,
+    # The bulk outputs of all states are written by the caller, see _build_all_for_states.
+    web_ui_mapper = WebUIDataAdaptorV1(
+        output_interval_days=output_interval_days, run_mode=run_mode, output_dir=output_dir,
+    )
+    return web_ui_mapper.generate_states(
+        {state: [] for state in states}, states_only=states_only, write_bulk_outputs=False
     )
 
 
@@ -130,6 +128,8 @@ def _build_all_for_states(
     skip_whitelist=False,
     states_only=False,
     fips=None,
+    batch_rt=False,
+    warm_start=False,
 ):
     # prepare data
     _cache_global_datasets()
@@ -138,14 +138,23 @@ def _build_all_for_states(
         _generate_whitelist()
 
     # do everything for just states in parallel
-    with Pool(maxtasksperchild=1) as p:
+    with WorkerPool(initializer=load_combined_datasets) as p:
         states_only_func = partial(
             _state_only_pipeline,
             run_mode=run_mode,
             output_interval_days=output_interval_days,
             output_dir=output_dir,
+            warm_start=warm_start,
         )
-        p.map(states_only_func, states)
+        outputs_by_state = p.map(states_only_func, states)
+
+    # Each worker mapped a single state, so the bulk outputs of all states are written here.
+    web_ui_mapper = WebUIDataAdaptorV1(
+        output_interval_days=output_interval_days, run_mode=run_mode, output_dir=output_dir,
+    )
+    web_ui_mapper.write_bulk_outputs(
+        [outputs for state_outputs in outputs_by_state for outputs in state_outputs]
+    )
 
     if states_only:
         root.info("Only executing for states. returning.")
@@ -153,12 +162,22 @@ def _build_all_for_states(
 
     all_county_fips = build_counties_to_run_per_state(states, fips=fips)
 
-    with Pool(maxtasksperchild=1) as p:
+    with WorkerPool(initializer=load_combined_datasets) as p:
         # calculate calculate county inference
-        p.map(infer_rt.run_rt_for_fips, all_county_fips.keys())
+        if batch_rt:
+            # Only states with counties to run, e.g. the state of the county given by --fips.
+            county_fips_per_state = {}
+            for county_fips, state in all_county_fips.items():
+                county_fips_per_state.setdefault(state, []).append(county_fips)
+            p.starmap(infer_rt_batch.run_rt_for_state_counties, county_fips_per_state.items())
+        else:
+            p.map(infer_rt.run_rt_for_fips, all_county_fips.keys())
         # calculate model fit
         root.info(f"executing model for {len(all_county_fips)} counties")
-        fitters = p.map(model_fitter.execute_model_for_fips, all_county_fips.keys())
+        fitters = p.map(
+            partial(model_fitter.execute_model_for_fips, warm_start=warm_start),
+            all_county_fips.keys(),
+        )
 
         df = pd.DataFrame([fit.fit_results for fit in fitters if fit])
         df["state"] = df.fips.replace(all_county_fips)
@@ -180,18 +199,13 @@ def _build_all_for_states(
     _cache_global_datasets()
 
     root.info(f"outputting web results for states and {len(all_county_fips)} counties")
-    # does not parallelize well, because web_ui mapper doesn't serialize efficiently
-    # TODO: Remove intermediate artifacts and paralellize artifacts creation better
-    # Approximately 40% of the processing time is taken on this step
     web_ui_mapper = WebUIDataAdaptorV1(
         output_interval_days=output_interval_days, run_mode=run_mode, output_dir=output_dir,
     )
-    for state in states:
-        web_ui_mapper.generate_state(
-            state,
-            whitelisted_county_fips=[k for k, v in all_county_fips.items() if v == state],
-            states_only=False,
-        )
+    web_ui_mapper.generate_states(
+        {state: [k for k, v in all_county_fips.items() if v == state] for state in states},
+        states_only=False,
+    )
 
     return
 
@@ -216,9 +230,14 @@ def run_infer_rt(state, states_only):
     "--state", help="State to generate files for. If no state is given, all states are computed."
 )
 @click.option("--states-only", default=False, is_flag=True, type=bool, help="Only model states")
-def run_mle_fits(state, states_only):
+@click.option(
+    "--warm-start",
+    is_flag=True,
+    help="If set, seeds each fit from the previous run's fit result when it is recent.",
+)
+def run_mle_fits(state, states_only, warm_start):
     states = [state] if state else ALL_STATES
-    _run_mle_fits(states, states_only=states_only)
+    _run_mle_fits(states, states_only=states_only, warm_start=warm_start)
 
 
 @entry_point.command()
@@ -232,10 +251,17 @@ def run_mle_fits(state, states_only):
     help="State to generate files for. If no state is given, all states are computed.",
 )
 @click.option("--states-only", default=False, is_flag=True, type=bool, help="Only model states")
-def run_ensembles(state, run_mode, states_only):
+@click.option(
+    "--export-json",
+    is_flag=True,
+    help="If set, also writes ensemble results as JSON for debugging.",
+)
+def run_ensembles(state, run_mode, states_only, export_json):
     states = [state] if state else ALL_STATES
     _run_ensembles(
-        states, ensemble_kwargs=dict(run_mode=run_mode), states_only=states_only,
+        states,
+        ensemble_kwargs=dict(run_mode=run_mode, export_json=export_json),
+        states_only=states_only,
     )
 
 
@@ -298,8 +324,26 @@ def map_outputs(state, output_interval_days, run_mode, states_only):
 )
 @click.option("--states-only", is_flag=True, help="If set, only runs on states.")
 @click.option("--output-dir", default=None, type=str, help="Directory to deploy webui output.")
+@click.option(
+    "--batch-rt",
+    is_flag=True,
+    help="If set, infers county Rt for all counties of a state in one batched pass.",
+)
+@click.option(
+    "--warm-start",
+    is_flag=True,
+    help="If set, seeds each MLE fit from the previous run's fit result when it is recent.",
+)
 def build_all(
-    states, run_mode, output_interval_days, output_dir, skip_whitelist, states_only, fips,
+    states,
+    run_mode,
+    output_interval_days,
+    output_dir,
+    skip_whitelist,
+    states_only,
+    fips,
+    batch_rt,
+    warm_start,
 ):
     # split columns by ',' and remove whitespace
     states = [c.strip() for c in states]
@@ -316,6 +360,8 @@ def build_all(
         skip_whitelist=skip_whitelist,
         states_only=states_only,
         fips=fips,
+        batch_rt=batch_rt,
+        warm_start=warm_start,
     )
 
 
@@ -1,17 +1,23 @@
+import io
+import os
 import ujson as json
 import structlog
 import us
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import timedelta, datetime
 import numpy as np
 import pandas as pd
-from multiprocessing import Pool
+from multiprocessing import current_process
 from pyseir import load_data
 from pyseir.deployment import model_to_observed_shim as shim
 from pyseir.inference.fit_results import load_inference_result
 from pyseir.rt.utils import load_Rt_result
-from pyseir.utils import get_run_artifact_path, RunArtifact, RunMode
+from pyseir import OUTPUT_DIR
+from pyseir.utils import get_run_artifact_path, RunArtifact, RunMode, WEB_UI_FOLDER
 from libs.enums import Intervention
+from libs.datasets.dataset_utils import AggregationLevel
+from libs.worker_pool import WorkerPool
+from libs import output_sink
 from libs.datasets import CommonFields
 from libs.datasets import FIPSPopulation, combined_datasets
 import libs.datasets.can_model_output_schema as schema
@@ -23,6 +29,56 @@ log = structlog.get_logger()
 OUTPUT_JSON_ORIENT = "split"
 
 
+def read_output_json(path_or_buf) -> pd.DataFrame:
+    """
+    Read the output of a region written by WebUIDataAdaptorV1.map_fips.
+
+    Parameters
+    ----------
+    path_or_buf: str or file-like
+        Path or buffer of the json output.
+
+    Returns
+    -------
+    output: pd.DataFrame
+        Model output of the region for one intervention.
+    """
+    return pd.read_json(
+        path_or_buf,
+        convert_dates=[schema.DATE],
+        dtype={schema.FIPS: str},
+        orient=OUTPUT_JSON_ORIENT,
+    )
+
+
+def get_bulk_output_filename(aggregation_level: AggregationLevel, intervention: Intervention):
+    """
+    Name of the file holding the outputs of all regions of an aggregation level for one
+    intervention, written next to the outputs of each region.
+    """
+    return f"projections.{aggregation_level.value}.{intervention.value}.parquet"
+
+
+# Adaptor used by the worker processes of WebUIDataAdaptorV1.generate_states. It is handed to
+# the pool initializer so that forked workers inherit it, together with the read-only inputs
+# loaded in the parent, instead of receiving a pickled copy with every task.
+_worker_adaptor = None
+
+# Sink writing the outputs of every region mapped by a worker process.
+_worker_sink = None
+
+
+def _init_map_fips_worker(adaptor):
+    global _worker_adaptor, _worker_sink
+    _worker_adaptor = adaptor
+    # Created in the worker, as threads do not survive the fork.
+    _worker_sink = adaptor.create_output_sink()
+
+
+def _map_fips_task(fips: str) -> List[pd.DataFrame]:
+    return _worker_adaptor.map_fips(fips, sink=_worker_sink)
+
+
 class WebUIDataAdaptorV1:
     """
     Map pyseir output data model to the format required by CovidActNow's webUI.
@@ -77,7 +133,18 @@ class WebUIDataAdaptorV1:
         """
         return self.population_data.get_record_for_fips(fips)[CommonFields.POPULATION]
 
-    def map_fips(self, fips: str) -> None:
+    def create_output_sink(self) -> output_sink.DirectorySink:
+        """
+        Create a sink writing map_fips outputs to the web ui folder. Outputs are written while
+        the next intervention is mapped, which two threads keep up with.
+        """
+        return output_sink.DirectorySink(
+            WEB_UI_FOLDER(self.output_dir or OUTPUT_DIR), max_workers=2
+        )
+
+    def map_fips(
+        self, fips: str, sink: Optional[output_sink.DirectorySink] = None
+    ) -> List[pd.DataFrame]:
         """
         For a given fips code, for either a county or state, generate the CAN UI output format.
 
@@ -85,7 +152,19 @@ class WebUIDataAdaptorV1:
         ----------
         fips: str
             FIPS code to map.
+        sink: output_sink.DirectorySink or NoneType
+            Sink created by create_output_sink, reused across regions. Outputs are flushed
+            before returning. A sink is created for this region if None.
+
+        Returns
+        -------
+        outputs: list(pd.DataFrame)
+            Output of each intervention, as read back by read_output_json.
         """
+        if sink is None:
+            with self.create_output_sink() as sink:
+                return self.map_fips(fips, sink=sink)
+
         # Get the latest observed values to use in calculating shims
         observed_latest_dict = combined_datasets.get_us_latest_for_fips(fips)
 
@@ -97,9 +176,9 @@ class WebUIDataAdaptorV1:
         try:
             fit_results = load_inference_result(fips)
             t0_simulation = datetime.fromisoformat(fit_results["t0_date"])
-        except (KeyError, ValueError):
+        except (KeyError, ValueError, OSError):
             log.error("Fit result not found for fips. Skipping...", fips=fips)
-            return
+            return []
         population = self._get_population(fips)
 
         # We will shim all suppression policies by the same amount (since historical tracking error
@@ -147,6 +226,7 @@ class WebUIDataAdaptorV1:
         suppression_policies = [
             key for key in pyseir_outputs.keys() if key.startswith("suppression_policy")
         ]
+        outputs = []
         for suppression_policy in suppression_policies:
             output_for_policy = pyseir_outputs[suppression_policy]
             output_model = pd.DataFrame()
@@ -299,7 +379,12 @@ class WebUIDataAdaptorV1:
                 fips, RunArtifact.WEB_UI_RESULT, output_dir=self.output_dir
             )
             output_path = output_path.replace("__INTERVENTION_IDX__", str(intervention.value))
-            output_model.to_json(output_path, orient=OUTPUT_JSON_ORIENT)
+            output_json = output_model.to_json(orient=OUTPUT_JSON_ORIENT)
+            sink.write(os.path.relpath(output_path, sink.root), output_json)
+            outputs.append(read_output_json(io.StringIO(output_json)))
+
+        sink.flush()
+        return outputs
 
     def generate_state(self, state: str, whitelisted_county_fips: list, states_only=False):
         """
@@ -315,17 +400,120 @@ class WebUIDataAdaptorV1:
             If True only run the state level.
         """
 
-        state_fips = us.states.lookup(state).fips
-        self.map_fips(state_fips)
+        self.generate_states({state: whitelisted_county_fips}, states_only=states_only)
 
-        if states_only:
-            return
+    def _load_shared_inputs(self, all_fips: List[str]) -> None:
+        """
+        Load the read-only inputs used by map_fips in this process, so that
+        forked workers share them instead of each loading their own copy.
+        """
+        combined_datasets.load_us_latest_dataset()
+        # Fit results are stored in one file per state for states and one for
+        # counties. Touch one region per file to populate the cache.
+        results_files = {}
+        for fips in all_fips:
+            results_files.setdefault(get_run_artifact_path(fips, RunArtifact.MLE_FIT_RESULT), fips)
+        for fips in results_files.values():
+            try:
+                load_inference_result(fips)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def generate_states(
+        self,
+        counties_by_state: Dict[str, List[str]],
+        states_only=False,
+        processes=None,
+        write_bulk_outputs=True,
+    ) -> List[List[pd.DataFrame]]:
+        """
+        Generate the output for the webUI for several states, and their
+        counties if states_only=False, mapping all regions in one worker pool.
+
+        Parameters
+        ----------
+        counties_by_state: dict(str, list(str))
+            Whitelisted county fips codes to map for each state.
+        states_only: bool
+            If True only run the state level.
+        processes: int or NoneType
+            Number of worker processes. Defaults to the number of cores. The
+            regions are mapped in this process if 1, or if this process is
+            itself a pool worker.
+        write_bulk_outputs: bool
+            If False, the bulk outputs are not written. Used when states are
+            mapped by separate calls, whose outputs are combined and passed to
+            write_bulk_outputs once all of them returned.
+
+        Returns
+        -------
+        outputs_by_fips: list(list(pd.DataFrame))
+            Outputs returned by map_fips for each region.
+        """
+        all_fips = [us.states.lookup(state).fips for state in counties_by_state]
+        if not states_only:
+            for county_fips in counties_by_state.values():
+                all_fips.extend(county_fips)
+
+        # Daemonic pool workers (e.g. the states only pipeline) cannot start their own pool.
+        if current_process().daemon or processes == 1 or len(all_fips) == 1:
+            with self.create_output_sink() as sink:
+                outputs_by_fips = [self.map_fips(fips, sink=sink) for fips in all_fips]
         else:
-            with Pool(maxtasksperchild=1) as p:
-                p.map(self.map_fips, whitelisted_county_fips)
+            self._load_shared_inputs(all_fips)
+
+            processes = processes or os.cpu_count()
+            # Regions are small uniform tasks, so hand them out in chunks.
+            chunksize = max(1, len(all_fips) // (4 * processes))
+            with WorkerPool(
+                processes=processes, initializer=_init_map_fips_worker, initargs=(self,)
+            ) as p:
+                outputs_by_fips = p.map(_map_fips_task, all_fips, chunksize=chunksize)
+
+        if write_bulk_outputs:
+            self.write_bulk_outputs(outputs_by_fips)
+        return outputs_by_fips
+
+    def write_bulk_outputs(self, outputs_by_fips: List[List[pd.DataFrame]]) -> None:
+        """
+        Write the outputs of all mapped regions to one parquet file per aggregation level and
+        intervention, so they can be loaded without reading the json of every region.
 
+        Each file is replaced as a whole. Regions missing from it, e.g. mapped by a previous
+        run, are still loaded from their json output.
+
+        Parameters
+        ----------
+        outputs_by_fips: list(list(pd.DataFrame))
+            Outputs returned by map_fips for each region.
+        """
+        outputs_by_key = {}
+        for outputs in outputs_by_fips:
+            for output in outputs or []:
+                if output.empty:
+                    continue
+                fips = output[schema.FIPS].iloc[0]
+                level = AggregationLevel.STATE if len(fips) == 2 else AggregationLevel.COUNTY
+                intervention = Intervention(output[schema.INTERVENTION].iloc[0])
+                outputs_by_key.setdefault((level, intervention), []).append(output)
+        if not outputs_by_key:
             return
 
+        output_dir = WEB_UI_FOLDER(self.output_dir or OUTPUT_DIR)
+        for (level, intervention), outputs in outputs_by_key.items():
+            path = os.path.join(output_dir, get_bulk_output_filename(level, intervention))
+            # Written to a temporary file first, so that readers never load a partial file.
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                pd.concat(outputs, ignore_index=True).to_parquet(temp_path, index=False)
+                os.replace(temp_path, path)
+            except Exception:
+                log.warning("Unable to write bulk output.", path=path, exc_info=True)
+                # Stale outputs would be loaded instead of the json outputs of this run.
+                for stale_path in (temp_path, path):
+                    if os.path.exists(stale_path):
+                        os.remove(stale_path)
+
 
 if __name__ == "__main__":
     # Need to have a whitelist pre-generated
@@ -0,0 +1,119 @@
+"""
+Binary storage for EnsembleRunner outputs.
+
+Each suppression policy's time series (its t_list and the ci_* percentiles of every compartment)
+are stacked into one 2-D float array, stored as a member of an uncompressed npz file. Everything
+else (peaks, capacities, surge windows, county metadata) goes into a small JSON header stored
+alongside. Loading reads one array per policy and hands out row views, so no list parsing happens
+on the read path.
+"""
+import json
+
+import numpy as np
+
+HEADER_KEY = "header"
+
+
+def _is_policy_output(value):
+    return isinstance(value, dict) and "t_list" in value
+
+
+def _is_series_key(key):
+    return key == "t_list" or key.startswith("ci_")
+
+
+def _to_json_compatible(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_ensemble_results_json(ensemble_results, f):
+    """
+    Write ensemble results as JSON, converting numpy values to lists and scalars.
+
+    Parameters
+    ----------
+    ensemble_results: dict
+        EnsembleRunner outputs.
+    f: file-like
+        Open text file to write to.
+    """
+    json.dump(ensemble_results, f, default=_to_json_compatible)
+
+
+def save_ensemble_results(ensemble_results, path):
+    """
+    Save ensemble results as an npz artifact.
+
+    Parameters
+    ----------
+    ensemble_results: dict
+        EnsembleRunner outputs: suppression policy name -> outputs, plus
+        optional non-policy entries such as county_metadata.
+    path: str
+        Output path, usually RunArtifact.ENSEMBLE_RESULT_ARRAYS.
+    """
+    header = {"policies": {}, "metadata": {}}
+    arrays = {}
+    for key, value in ensemble_results.items():
+        if not _is_policy_output(value):
+            header["metadata"][key] = value
+            continue
+
+        rows, row_keys, scalars = [], [], {}
+        for name, item in value.items():
+            if _is_series_key(name):
+                rows.append(item)
+                row_keys.append([name])
+            elif isinstance(item, dict):
+                scalars[name] = {}
+                for stat, stat_value in item.items():
+                    if _is_series_key(stat):
+                        rows.append(stat_value)
+                        row_keys.append([name, stat])
+                    else:
+                        scalars[name][stat] = stat_value
+            else:
+                scalars[name] = item
+
+        header["policies"][key] = {"rows": row_keys, "scalars": scalars}
+        arrays[key] = np.vstack(rows).astype(float)
+
+    header_json = json.dumps(header, default=_to_json_compatible)
+    with open(path, "wb") as f:
+        np.savez(f, **{HEADER_KEY: np.array(header_json)}, **arrays)
+
+
+def load_ensemble_results(path):
+    """
+    Load an npz ensemble artifact written by save_ensemble_results.
+
+    Parameters
+    ----------
+    path: str
+        Path of the artifact.
+
+    Returns
+    -------
+    ensemble_results: dict
+        Same layout as the EnsembleRunner outputs, with t_list and ci_*
+        entries as read-only row views into one array per policy.
+    """
+    with np.load(path) as data:
+        header = json.loads(str(data[HEADER_KEY]))
+        ensemble_results = dict(header["metadata"])
+        for policy, policy_header in header["policies"].items():
+            values = data[policy]
+            values.flags.writeable = False
+
+            outputs = policy_header["scalars"]
+            for row, row_key in zip(values, policy_header["rows"]):
+                if len(row_key) == 1:
+                    outputs[row_key[0]] = row
+                else:
+                    outputs.setdefault(row_key[0], {})[row_key[1]] = row
+            ensemble_results[policy] = outputs
+    return ensemble_results
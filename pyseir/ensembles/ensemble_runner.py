@@ -2,19 +2,19 @@ import datetime
 import logging
 import os
 import numpy as np
-from multiprocessing import Pool
+from libs.worker_pool import WorkerPool, load_combined_datasets
 from functools import partial
 import us
 import pickle
-import json
 import copy
 from collections import defaultdict
-from pyseir.models.seir_model import SEIRModel
+from pyseir.models.seir_model import SEIRModel, StackedSEIRModel
 from pyseir.parameters.parameter_ensemble_generator import ParameterEnsembleGenerator
 import pyseir.models.suppression_policies as sp
 from pyseir import load_data
 from pyseir.utils import get_run_artifact_path, RunArtifact, RunMode
 from pyseir.inference import fit_results
+from pyseir.ensembles import ensemble_artifact
 from libs.datasets import AggregationLevel
 from libs.datasets import combined_datasets
 
@@ -55,6 +55,9 @@ class EnsembleRunner:
     hospitalization_to_confirmed_case_ratio: float
         When hospitalization data is not available directly, this fraction of
         confirmed cases defines the initial number of hospitalizations.
+    export_json: bool
+        If True, also write the outputs as JSON (RunArtifact.ENSEMBLE_RESULT)
+        for debugging. The npz artifact is always written.
     """
 
     def __init__(
@@ -68,6 +71,7 @@ class EnsembleRunner:
         run_mode=RunMode.DEFAULT,
         min_hospitalization_threshold=5,
         hospitalization_to_confirmed_case_ratio=1 / 4,
+        export_json=False,
     ):
 
         self.fips = fips
@@ -87,6 +91,10 @@ class EnsembleRunner:
         else:
             self.state_name = us.states.lookup(self.fips).name
             self.output_file_data = get_run_artifact_path(self.fips, RunArtifact.ENSEMBLE_RESULT)
+        self.output_file_arrays = get_run_artifact_path(
+            self.fips, RunArtifact.ENSEMBLE_RESULT_ARRAYS
+        )
+        self.export_json = export_json
 
         os.makedirs(os.path.dirname(self.output_file_data), exist_ok=True)
         self.output_percentiles = output_percentiles
@@ -151,10 +159,18 @@ class EnsembleRunner:
         model.run()
         return model
 
-    def _load_model_for_fips(self, scenario="inferred"):
+    def _load_model_for_fips(self, scenario="inferred", run_model=True):
         """
         Try to load a model for the locale, else load the state level model
         and update parameters for the county.
+
+        Parameters
+        ----------
+        scenario: str
+            Future suppression scenario to apply.
+        run_model: bool
+            If False, return the model without integrating it so that the
+            caller can run several scenarios in a single stacked solve.
         """
         artifact_path = get_run_artifact_path(self.fips, RunArtifact.MLE_FIT_MODEL)
         if os.path.exists(artifact_path):
@@ -176,9 +192,6 @@ class EnsembleRunner:
 
             # Rescale state values to the county population and replace county
             # specific params.
-            # TODO: get_average_seir_parameters should return the analytic solution when available
-            # right now it runs an average over the ensemble (with N_samples not consistently set
-            # across the code base).
             default_params = ParameterEnsembleGenerator(
                 self.fips,
                 N_samples=500,
@@ -211,25 +224,48 @@ class EnsembleRunner:
             ).days,
             eps_final=eps_final,
         )
-        model.run()
+        if run_model:
+            model.run()
         return model
 
+    def _run_scenario_models(self):
+        """
+        Load the model for every suppression scenario and integrate them
+        together.
+
+        Returns
+        -------
+        scenario_models: dict
+            Executed model for each suppression policy name.
+        """
+        models = [
+            self._load_model_for_fips(scenario=scenario, run_model=False)
+            for scenario in self.suppression_policies.values()
+        ]
+        if all(type(model) is SEIRModel for model in models):
+            StackedSEIRModel(models).run()
+        else:
+            for model in models:
+                model.run()
+        return dict(zip(self.suppression_policies, models))
+
     def run_ensemble(self):
         """
         Run an ensemble of models for each suppression policy nad generate the
         output report / results dataset.
         """
-        for suppression_policy_name, suppression_policy in self.suppression_policies.items():
+        if self.run_mode is RunMode.CAN_INFERENCE_DERIVED:
+            scenario_models = self._run_scenario_models()
+        else:
+            raise ValueError(f"Run mode {self.run_mode.value} not supported.")
+
+        for suppression_policy_name in self.suppression_policies:
 
             _logger.info(
                 f"Running simulation ensemble for {self.state_name} {self.fips} {suppression_policy_name}"
             )
 
-            if self.run_mode is RunMode.CAN_INFERENCE_DERIVED:
-                model_ensemble = [self._load_model_for_fips(scenario=suppression_policy)]
-
-            else:
-                raise ValueError(f"Run mode {self.run_mode.value} not supported.")
+            model_ensemble = [scenario_models[suppression_policy_name]]
 
             if self.agg_level is AggregationLevel.COUNTY:
                 self.all_outputs["county_metadata"] = self.county_metadata
@@ -244,8 +280,10 @@ class EnsembleRunner:
                 f"{suppression_policy_name}"
             ] = self._generate_output_for_suppression_policy(model_ensemble)
 
-        with open(self.output_file_data, "w") as f:
-            json.dump(self.all_outputs, f)
+        ensemble_artifact.save_ensemble_results(self.all_outputs, self.output_file_arrays)
+        if self.export_json:
+            with open(self.output_file_data, "w") as f:
+                ensemble_artifact.dump_ensemble_results_json(self.all_outputs, f)
 
     @staticmethod
     def _generate_compartment_arrays(model_ensemble):
@@ -275,47 +313,39 @@ class EnsembleRunner:
         return {key: np.vstack(value_stack) for key, value_stack in compartments.items()}
 
     @staticmethod
-    def _get_surge_window(model_ensemble, compartment):
+    def _get_surge_window(value_stack, capacity, t_list):
         """
         Calculate the list of surge window starts and ends for an ensemble.
 
         Parameters
         ----------
-        model_ensemble: list(SEIRModel)
-            List of models to compute the surge windows for.
-        compartment: str
-            Compartment to calculate the surge window over.
+        value_stack: array[n_samples, time steps]
+            Array with the stacked model output results for one compartment.
+        capacity: array[n_samples]
+            Capacity of each model for the compartment.
+        t_list: array
+            Array of timesteps.
 
         Returns
         -------
-        surge_start: np.array
+        surge_start: list
             For each model, the surge start window time (since beginning of
             simulation). NaN implies no surge occurred.
-        surge_end: np.array
+        surge_end: list
             For each model, the surge end window time (since beginning of
             simulation). NaN implies no surge occurred.
         """
-        surge_start = []
-        surge_end = []
-        for m in model_ensemble:
-            # Find the first t where overcapacity occurs
-            surge_start_idx = np.argwhere(
-                m.results[compartment] > getattr(m, compartment_to_capacity_attr_map[compartment])
-            )
-            surge_start.append(
-                m.t_list[surge_start_idx[0][0]] if len(surge_start_idx) > 0 else float("NaN")
-            )
+        t_list = np.asarray(t_list)
+        over_capacity = value_stack > np.asarray(capacity)[:, np.newaxis]
+        has_surge = over_capacity.any(axis=1)
 
-            # Reverse the t-list and capacity and do the same.
-            surge_end_idx = np.argwhere(
-                m.results[compartment][::-1]
-                > getattr(m, compartment_to_capacity_attr_map[compartment])
-            )
-            surge_end.append(
-                m.t_list[::-1][surge_end_idx[0][0]] if len(surge_end_idx) > 0 else float("NaN")
-            )
+        # First and last t where overcapacity occurs.
+        first_idx = over_capacity.argmax(axis=1)
+        last_idx = over_capacity.shape[1] - 1 - over_capacity[:, ::-1].argmax(axis=1)
 
-        return surge_start, surge_end
+        surge_start = np.where(has_surge, t_list[first_idx], np.nan)
+        surge_end = np.where(has_surge, t_list[last_idx], np.nan)
+        return surge_start.tolist(), surge_end.tolist()
 
     def _detect_peak_time_and_value(self, value_stack, t_list):
         """
@@ -338,17 +368,18 @@ class EnsembleRunner:
             Also add peak_value_mean.
         """
         peak_indices = value_stack.argmax(axis=1)
-        peak_times = [t_list[peak_index] for peak_index in peak_indices]
-        values_at_peak_index = [val[idx] for val, idx in zip(value_stack, peak_indices)]
+        peak_times = np.asarray(t_list)[peak_indices]
+        values_at_peak_index = value_stack[np.arange(len(value_stack)), peak_indices]
+
+        peak_value_percentiles = np.percentile(values_at_peak_index, self.output_percentiles)
+        peak_time_percentiles = np.percentile(peak_times, self.output_percentiles)
 
         peak_data = dict()
-        for percentile in self.output_percentiles:
-            peak_data["peak_value_ci%i" % percentile] = np.percentile(
-                values_at_peak_index, percentile
-            ).tolist()
-            peak_data["peak_time_ci%i" % percentile] = np.percentile(
-                peak_times, percentile
-            ).tolist()
+        for percentile, peak_value, peak_time in zip(
+            self.output_percentiles, peak_value_percentiles, peak_time_percentiles
+        ):
+            peak_data["peak_value_ci%i" % percentile] = peak_value.tolist()
+            peak_data["peak_time_ci%i" % percentile] = peak_time.tolist()
 
         peak_data["peak_value_mean"] = np.mean(values_at_peak_index).tolist()
         return peak_data
@@ -368,7 +399,7 @@ class EnsembleRunner:
             Output data for this suppression policc ensemble.
         """
         outputs = defaultdict(dict)
-        outputs["t_list"] = model_ensemble[0].t_list.tolist()
+        outputs["t_list"] = model_ensemble[0].t_list
 
         # ------------------------------------------
         # Calculate Confidence Intervals and Peaks
@@ -376,21 +407,21 @@ class EnsembleRunner:
         for compartment, value_stack in self._generate_compartment_arrays(model_ensemble).items():
             compartment_output = dict()
 
-            # Compute percentiles over the ensemble
-            for percentile in self.output_percentiles:
-                outputs[compartment]["ci_%i" % percentile] = np.percentile(
-                    value_stack, percentile, axis=0
-                ).tolist()
+            # Compute all percentiles over the ensemble in a single pass.
+            percentile_values = np.percentile(value_stack, self.output_percentiles, axis=0)
+            for percentile, values in zip(self.output_percentiles, percentile_values):
+                outputs[compartment]["ci_%i" % percentile] = values
 
             if compartment in compartment_to_capacity_attr_map:
-                (
-                    compartment_output["surge_start"],
-                    compartment_output["surge_start"],
-                ) = self._get_surge_window(model_ensemble, compartment)
-                compartment_output["capacity"] = [
+                capacity = [
                     getattr(m, compartment_to_capacity_attr_map[compartment])
                     for m in model_ensemble
                 ]
+                (
+                    compartment_output["surge_start"],
+                    compartment_output["surge_end"],
+                ) = self._get_surge_window(value_stack, capacity, outputs["t_list"])
+                compartment_output["capacity"] = capacity
 
             compartment_output.update(
                 self._detect_peak_time_and_value(value_stack, outputs["t_list"])
@@ -440,6 +471,6 @@ def run_state(state, ensemble_kwargs, states_only=False):
         # Run county level
         county_latest = combined_datasets.load_us_latest_dataset().county
         all_fips = county_latest.get_subset(state=state).all_fips
-        with Pool(maxtasksperchild=1) as p:
+        with WorkerPool(initializer=load_combined_datasets) as p:
             f = partial(_run_county, ensemble_kwargs=ensemble_kwargs)
             p.map(f, all_fips)
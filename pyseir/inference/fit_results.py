@@ -1,11 +1,23 @@
+import os
+from functools import lru_cache
+
 import pandas as pd
 from pyseir.utils import get_run_artifact_path, RunArtifact
 
 
+@lru_cache(maxsize=64)
+def _load_inference_result_frame(output_file, modified_time):
+    # modified_time is part of the key so a rewritten result file is read again.
+    return pd.read_json(output_file, dtype={"fips": "str"})
+
+
 def load_inference_result(fips):
     """
     Load fit results by state or county fips code.
 
+    The results file of a state is parsed once and cached until it is
+    rewritten, so looking up every county of a state does not re-read it.
+
     Parameters
     ----------
     fips: str
@@ -17,7 +29,7 @@ def load_inference_result(fips):
         Dictionary of fit result information.
     """
     output_file = get_run_artifact_path(fips, RunArtifact.MLE_FIT_RESULT)
-    df = pd.read_json(output_file, dtype={"fips": "str"})
+    df = _load_inference_result_frame(output_file, os.path.getmtime(output_file))
     if len(fips) == 2:
         return df.iloc[0].to_dict()
     else:
@@ -1,12 +1,14 @@
 from typing import List
 import os
+from collections import OrderedDict
 import us
 import json
 import structlog
 from pprint import pformat
 import datetime as dt
 from datetime import datetime, timedelta
-from multiprocessing import Pool
+from functools import partial
+from libs.worker_pool import WorkerPool, load_combined_datasets
 
 import pandas as pd
 import dill as pickle
@@ -17,7 +19,7 @@ from covidactnow.datapublic.common_fields import CommonFields
 from pyseir.inference import model_plotting
 from pyseir.models import suppression_policies
 from pyseir import load_data
-from pyseir.models.seir_model import SEIRModel
+from pyseir.models.seir_model import SEIRModel, IntegrationMode
 from pyseir.models.seir_model_age import SEIRModelAge
 from pyseir.parameters.parameter_ensemble_generator import ParameterEnsembleGenerator
 from pyseir.parameters.parameter_ensemble_generator_age import ParameterEnsembleGeneratorAge
@@ -35,6 +37,61 @@ def calc_chi_sq(obs, predicted, stddev):
     return np.sum((obs - predicted) ** 2 / stddev ** 2)
 
 
+class ObjectiveCache:
+    """
+    Bounded LRU cache of objective evaluations keyed on the rounded parameter
+    vector.
+
+    Minuit re-evaluates the objective at identical points (e.g. the final
+    chi2 update after MIGRAD and repeated points across retries). Rounding to
+    a number of significant digits well below the gradient step sizes merges
+    those repeats without collapsing distinct gradient probes.
+
+    Parameters
+    ----------
+    maxsize: int
+        Maximum number of evaluations to keep.
+    significant_digits: int
+        Significant digits each parameter is rounded to when building keys.
+    """
+
+    def __init__(self, maxsize=256, significant_digits=10):
+        self.maxsize = maxsize
+        self.significant_digits = significant_digits
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def make_key(self, values):
+        return tuple(float(f"{value:.{self.significant_digits}g}") for value in values)
+
+    def get(self, key):
+        """
+        Return the cached evaluation for key, or None, updating the counters.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, evaluation):
+        self._entries[key] = evaluation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Fitters are pickled back from worker processes. Only ship counters.
+        state = self.__dict__.copy()
+        state["_entries"] = OrderedDict()
+        return state
+
+
 class ModelFitter:
     """
     Fit a SEIR model and suppression policy for a geographic unit (county or
@@ -70,6 +127,16 @@ class ModelFitter:
         estimates.  0.5 = 50% error. Best to be conservatively high.
     with_age_structure: bool
         Whether run model with age structure.
+    fit_integration_mode: IntegrationMode
+        Integration scheme used for the model evaluations inside the MIGRAD
+        loop. The returned mle_model is always integrated with odeint.
+    objective_cache: ObjectiveCache or NoneType
+        Cache of objective evaluations. Pass the cache of a previous fitter
+        for the same fips to reuse its evaluations, e.g. across retries.
+    warm_start: bool
+        If True, seed the fit parameter values, step sizes and limits from the
+        previous run's MLE fit result for this fips when one exists and is
+        recent enough. Falls back to the static initial guesses otherwise.
     """
 
     DEFAULT_FIT_PARAMS = dict(
@@ -106,6 +173,15 @@ class ModelFitter:
 
     REFF_LOWER_BOUND = 0.7
 
+    # Number of objective evaluations (chi2 components and model) to memoize.
+    OBJECTIVE_CACHE_SIZE = 256
+
+    # Prior fit results older than this are not used to warm start a fit.
+    WARM_START_MAX_AGE_DAYS = 7
+    # Warm started limits span this many prior errors around the prior value,
+    # clipped to the static limits.
+    WARM_START_LIMIT_N_ERRORS = 10
+
     steady_state_exposed_to_infected_ratio = 1.2
 
     def __init__(
@@ -118,6 +194,9 @@ class ModelFitter:
         hospital_to_deaths_err_factor=0.5,
         percent_error_on_max_observation=0.5,
         with_age_structure=False,
+        fit_integration_mode=IntegrationMode.RK4,
+        objective_cache=None,
+        warm_start=False,
     ):
 
         # Seed the random state. It is unclear whether this propagates to the
@@ -137,6 +216,11 @@ class ModelFitter:
         self.percent_error_on_max_observation = percent_error_on_max_observation
         self.t0_guess = 60
         self.with_age_structure = with_age_structure
+        self.fit_integration_mode = IntegrationMode(fit_integration_mode)
+        if objective_cache is None:
+            objective_cache = ObjectiveCache(maxsize=self.OBJECTIVE_CACHE_SIZE)
+        self.objective_cache = objective_cache
+        self.warm_start = warm_start
 
         (
             self.times,
@@ -196,7 +280,8 @@ class ModelFitter:
         overrides.  As data becomes more sparse, we further constrain the fit,
         which improves stability substantially.
         """
-        self.fit_params = self.DEFAULT_FIT_PARAMS
+        # Copy so that per-fips updates don't leak into other fitters in this process.
+        self.fit_params = dict(self.DEFAULT_FIT_PARAMS)
         # Update State specific SEIR initial guesses
         overwrite_params_df = pd.read_csv(
             "./pyseir_data/pyseir_fitter_initial_conditions.csv", dtype={"fips": object}
@@ -267,6 +352,60 @@ class ModelFitter:
                 self.fit_params["fix_eps"] = True
                 self.fit_params["fix_t_break"] = True
 
+        if self.warm_start:
+            self.apply_warm_start()
+
+    def apply_warm_start(self):
+        """
+        Seed fit_params from the previous MLE fit result for this fips.
+
+        For every free parameter, the prior value becomes the initial guess,
+        the prior error becomes the step size and the limits are narrowed to
+        WARM_START_LIMIT_N_ERRORS prior errors around the value (never beyond
+        the static limits). Missing, stale or non-finite prior results leave
+        the static guesses untouched.
+
+        Returns
+        -------
+        warm_started: bool
+            Whether any parameter was seeded from the prior result.
+        """
+        try:
+            prior_result = load_inference_result(self.fips)
+        except (OSError, KeyError, ValueError):
+            log.info("No prior fit result to warm start from", fips=self.fips)
+            return False
+
+        t_today = (datetime.today() - self.ref_date).days
+        prior_age_days = t_today - prior_result.get("t_today", -np.inf)
+        if not 0 <= prior_age_days <= self.WARM_START_MAX_AGE_DAYS:
+            log.info("Prior fit result is stale", fips=self.fips, age_days=prior_age_days)
+            return False
+
+        warm_started_params = []
+        for param in list(self.fit_params):
+            if f"limit_{param}" not in self.fit_params or self.fit_params.get(f"fix_{param}"):
+                continue
+
+            value = prior_result.get(param)
+            error = prior_result.get(f"{param}_error")
+            lower, upper = self.fit_params[f"limit_{param}"]
+            if value is None or error is None or not np.isfinite([value, error]).all():
+                continue
+            if error <= 0 or not lower <= value <= upper:
+                continue
+
+            self.fit_params[param] = value
+            self.fit_params[f"error_{param}"] = error
+            self.fit_params[f"limit_{param}"] = [
+                max(lower, value - self.WARM_START_LIMIT_N_ERRORS * error),
+                min(upper, value + self.WARM_START_LIMIT_N_ERRORS * error),
+            ]
+            warm_started_params.append(param)
+
+        log.info("Warm started fit", fips=self.fips, params=warm_started_params)
+        return bool(warm_started_params)
+
     def get_average_seir_parameters(self):
         """
         Generate the additional fitter candidates from the ensemble generator. This
@@ -381,7 +520,16 @@ class ModelFitter:
 
         return cases_stdev, hosp_stdev, deaths_stdev
 
-    def run_model(self, R0, eps, t_break, eps2, t_delta_phases, log10_I_initial):
+    def run_model(
+        self,
+        R0,
+        eps,
+        t_break,
+        eps2,
+        t_delta_phases,
+        log10_I_initial,
+        integration_mode=IntegrationMode.ODEINT,
+    ):
         """
         Generate the model and run.
 
@@ -399,6 +547,9 @@ class ModelFitter:
             Timing for the switch in from second to third stage.
         log10_I_initial:
             log10 initial infections.
+        integration_mode: IntegrationMode
+            Integration scheme for the SEIR model. The age structured model
+            always uses its own integrator.
 
         Returns
         -------
@@ -430,7 +581,10 @@ class ModelFitter:
             **self.SEIR_kwargs,
         )
 
-        model.run()
+        if self.with_age_structure:
+            model.run()
+        else:
+            model.run(integration_mode=integration_mode)
         return model
 
     def _fit_seir(
@@ -446,7 +600,7 @@ class ModelFitter:
         log10_I_initial,
     ):
         """
-        Fit SEIR model by MLE.
+        Fit SEIR model by MLE. Evaluations are memoized in objective_cache.
 
         Parameters
         ----------
@@ -471,6 +625,70 @@ class ModelFitter:
           : float
             Chi square of fitting model to observed cases, deaths, and hospitalizations.
         """
+        params = dict(
+            R0=R0,
+            t0=t0,
+            eps=eps,
+            t_break=t_break,
+            eps2=eps2,
+            t_delta_phases=t_delta_phases,
+            test_fraction=test_fraction,
+            hosp_fraction=hosp_fraction,
+            log10_I_initial=log10_I_initial,
+        )
+        key = self.objective_cache.make_key(params.values())
+        evaluation = self.objective_cache.get(key)
+        if evaluation is None:
+            evaluation = self._evaluate_seir(**params)
+            self.objective_cache.put(key, evaluation)
+
+        self.chi2_deaths = evaluation["chi2_deaths"]
+        self.chi2_cases = evaluation["chi2_cases"]
+        self.chi2_hosp = evaluation["chi2_hosp"]
+        self.dof_deaths = evaluation["dof_deaths"]
+        self.dof_cases = evaluation["dof_cases"]
+        self.dof_hosp = evaluation["dof_hosp"]
+        return evaluation["score"]
+
+    def _evaluate_seir(
+        self,
+        R0,
+        t0,
+        eps,
+        t_break,
+        eps2,
+        t_delta_phases,
+        test_fraction,
+        hosp_fraction,
+        log10_I_initial,
+    ):
+        """
+        Run the model for a parameter point and compute the chi2 components.
+
+        Parameters
+        ----------
+        R0: float
+            Basic reproduction number
+        t0: float
+            Epidemic starting time.
+        eps: float
+            Fraction of reduction in contact rates as result of  to suppression
+            policy projected into future.
+        t_break: float
+            Timing for the switch in suppression policy.
+        test_fraction: float
+            Fraction of cases that get tested.
+        hosp_fraction: float
+            Fraction of actual hospitalizations vs the total.
+        log10_I_initial:
+            log10 initial infections.
+
+        Returns
+        -------
+        evaluation: dict
+            The penalized chi2 score, its case, hospitalization and death
+            components with their degrees of freedom, and the model results.
+        """
         l = locals()
         model_kwargs = {k: l[k] for k in self.model_fit_keys}
 
@@ -485,7 +703,7 @@ class ModelFitter:
         if number_of_not_allowed_days_used > self.days_allowed_beyond_ref:
             not_allowed_days_penalty = 10 * number_of_not_allowed_days_used
 
-        model = self.run_model(**model_kwargs)
+        model = self.run_model(**model_kwargs, integration_mode=self.fit_integration_mode)
         # -----------------------------------
         # Chi2 Cases
         # -----------------------------------
@@ -512,7 +730,7 @@ class ModelFitter:
                 right=0,
             )
             chi2_hosp = calc_chi_sq(self.hospitalizations, predicted_hosp, self.hosp_stdev)
-            self.dof_hosp = (self.observed_new_cases > 0).sum()
+            dof_hosp = (self.observed_new_cases > 0).sum()
 
         elif self.hospitalization_data_type is HospitalizationDataType.CUMULATIVE_HOSPITALIZATIONS:
             # Cumulative, so differentiate the data
@@ -526,10 +744,10 @@ class ModelFitter:
             new_hosp_observed = self.hospitalizations[1:] - self.hospitalizations[:-1]
 
             chi2_hosp = calc_chi_sq(new_hosp_observed, new_hosp_predicted, self.hosp_stdev)
-            self.dof_hosp = (self.observed_new_cases > 0).sum()
+            dof_hosp = (self.observed_new_cases > 0).sum()
         else:
             chi2_hosp = 0
-            self.dof_hosp = 1e-10
+            dof_hosp = 1e-10
 
         # -----------------------------------
         # Chi2 Deaths
@@ -543,18 +761,21 @@ class ModelFitter:
         else:
             chi2_deaths = 0
 
-        self.chi2_deaths = chi2_deaths
-        self.chi2_cases = chi2_cases
-        self.chi2_hosp = chi2_hosp
-        self.dof_deaths = (self.observed_new_deaths > 0).sum()
-        self.dof_cases = (self.observed_new_cases > 0).sum()
-
         not_penalized_score = chi2_deaths + chi2_cases + chi2_hosp
 
         # Calculate the final score as the product of the not_allowed_days_penalty and not_penalized_score
         score = not_allowed_days_penalty + (chi2_deaths + chi2_cases + chi2_hosp)
 
-        return score
+        return dict(
+            score=score,
+            chi2_deaths=chi2_deaths,
+            chi2_cases=chi2_cases,
+            chi2_hosp=chi2_hosp,
+            dof_deaths=(self.observed_new_deaths > 0).sum(),
+            dof_cases=(self.observed_new_cases > 0).sum(),
+            dof_hosp=dof_hosp,
+            model_results=model.results,
+        )
 
     def fit(self):
         """
@@ -599,6 +820,8 @@ class ModelFitter:
             self.fit_results["chi2_hosps"] = self.chi2_hosp
         self.fit_results["chi2_deaths"] = self.chi2_deaths
         self.fit_results["chi2_total"] = self.chi2_cases + self.chi2_deaths + self.chi2_hosp
+        self.fit_results["objective_cache_hits"] = self.objective_cache.hits
+        self.fit_results["objective_cache_misses"] = self.objective_cache.misses
 
         if self.hospitalization_data_type:
             self.fit_results["hospitalization_data_type"] = self.hospitalization_data_type.value
@@ -619,7 +842,7 @@ class ModelFitter:
         self.mle_model = self.run_model(**{k: self.fit_results[k] for k in self.model_fit_keys})
 
     @classmethod
-    def run_for_fips(cls, fips, n_retries=3, with_age_structure=False):
+    def run_for_fips(cls, fips, n_retries=3, with_age_structure=False, warm_start=False):
         """
         Run the model fitter for a state or county fips code.
 
@@ -633,6 +856,8 @@ class ModelFitter:
             implemented.
         with_age_structure: bool
             If True run model with age structure.
+        warm_start: bool
+            If True, seed the fit from the previous fit result for this fips.
 
         Returns
         -------
@@ -649,8 +874,15 @@ class ModelFitter:
         try:
             retries_left = n_retries
             model_is_empty = True
+            # Retries refit the same data, so share evaluations between them.
+            objective_cache = ObjectiveCache(maxsize=cls.OBJECTIVE_CACHE_SIZE)
             while retries_left > 0 and model_is_empty:
-                model_fitter = cls(fips=fips, with_age_structure=with_age_structure)
+                model_fitter = cls(
+                    fips=fips,
+                    with_age_structure=with_age_structure,
+                    objective_cache=objective_cache,
+                    warm_start=warm_start,
+                )
                 try:
                     model_fitter.fit()
                     if model_fitter.mle_model and os.environ.get("PYSEIR_PLOT_RESULTS") == "True":
@@ -668,9 +900,9 @@ class ModelFitter:
             return None
 
 
-def execute_model_for_fips(fips):
+def execute_model_for_fips(fips, warm_start=False):
     if fips:
-        model_fitter = ModelFitter.run_for_fips(fips)
+        model_fitter = ModelFitter.run_for_fips(fips, warm_start=warm_start)
         return model_fitter
     log.warning(f"Not running model run for ${fips}")
     return None
@@ -699,7 +931,7 @@ def build_county_list(state: str) -> List[str]:
     return all_fips
 
 
-def run_state(state, states_only=False, with_age_structure=False):
+def run_state(state, states_only=False, with_age_structure=False, warm_start=False):
     """
     Run the fitter for each county in a state.
 
@@ -711,12 +943,16 @@ def run_state(state, states_only=False, with_age_structure=False):
         If True only run the state level.
     with_age_structure: bool
         If True run model with age structure.
+    warm_start: bool
+        If True, seed each fit from the previous fit result for its fips.
     """
     state_obj = us.states.lookup(state)
     fips = state_obj.fips
     log.info(f"Running MLE fitter for state {state}")
 
-    model_fitter = ModelFitter.run_for_fips(fips, with_age_structure=with_age_structure)
+    model_fitter = ModelFitter.run_for_fips(
+        fips, with_age_structure=with_age_structure, warm_start=warm_start
+    )
 
     df_whitelist = load_data.load_whitelist()
     df_whitelist = df_whitelist[df_whitelist["inference_ok"] == True]
@@ -738,8 +974,8 @@ def run_state(state, states_only=False, with_age_structure=False):
         all_fips = df_whitelist.loc[is_state, CommonFields.FIPS].values
 
         if len(all_fips) > 0:
-            with Pool(maxtasksperchild=1) as p:
-                fitters = p.map(ModelFitter.run_for_fips, all_fips)
+            with WorkerPool(initializer=load_combined_datasets) as p:
+                fitters = p.map(partial(ModelFitter.run_for_fips, warm_start=warm_start), all_fips)
 
             county_output_file = get_run_artifact_path(all_fips[0], RunArtifact.MLE_FIT_RESULT)
             data = pd.DataFrame([fit.fit_results for fit in fitters if fit])
@@ -19,6 +19,7 @@ from libs.datasets import combined_datasets
 from libs.datasets.timeseries import TimeseriesDataset
 from libs.datasets.dataset_utils import AggregationLevel
 import pyseir.utils
+from pyseir.ensembles import ensemble_artifact
 
 # from pyseir.utils import get_run_artifact_path, RunArtifact, ewma_smoothing
 
@@ -167,7 +168,15 @@ def load_ensemble_results(fips):
     Returns
     -------
     ensemble_results: dict
+        Time series are numpy arrays when read from the npz artifact and
+        lists when read from a JSON export.
     """
+    arrays_filename = pyseir.utils.get_run_artifact_path(
+        fips, pyseir.utils.RunArtifact.ENSEMBLE_RESULT_ARRAYS
+    )
+    if os.path.exists(arrays_filename):
+        return ensemble_artifact.load_ensemble_results(arrays_filename)
+
     output_filename = pyseir.utils.get_run_artifact_path(
         fips, pyseir.utils.RunArtifact.ENSEMBLE_RESULT
     )
@@ -1,6 +1,8 @@
+from functools import lru_cache
+
 import numpy as np
-import pandas as pd
 import us
+from scipy import special, stats
 
 from covidactnow.datapublic.common_fields import CommonFields
 from pyseir import load_data
@@ -8,6 +10,105 @@ from libs.datasets import combined_datasets
 from libs.datasets.dataset_utils import AggregationLevel
 
 
+def expected_clipped_normal(loc, scale, lower=0):
+    """
+    Expected value of max(X, lower) for X ~ Normal(loc, scale).
+    """
+    z = (loc - lower) / scale
+    return lower + (loc - lower) * stats.norm.cdf(z) + scale * stats.norm.pdf(z)
+
+
+def expected_reciprocal_normal(loc, scale):
+    """
+    Expected value of 1 / X for X ~ Normal(loc, scale).
+
+    The integral diverges at X = 0, so this returns the Cauchy principal
+    value, sqrt(2) / scale * D(loc / (sqrt(2) * scale)) with D the Dawson
+    function. This is the value sample means of 1 / X concentrate around.
+    """
+    return np.sqrt(2) / scale * special.dawsn(loc / (np.sqrt(2) * scale))
+
+
+def expected_reciprocal_gamma(shape, scale=1):
+    """
+    Expected value of 1 / X for X ~ Gamma(shape, scale), defined for shape > 1.
+    """
+    return 1 / (scale * (shape - 1))
+
+
+class SEIRParameterSamples:
+    """
+    Struct-of-arrays container for an ensemble of SEIR parameter samples.
+
+    Every sampled parameter is stored once as an array of length n_samples,
+    while t_list and suppression_policy are shared by all samples.
+
+    Parameters
+    ----------
+    t_list: array-like
+        Array of times to integrate against.
+    suppression_policy: callable(t): pyseir.model.suppression_policy
+        Suppression policy shared by the samples.
+    parameters: dict(str, np.array)
+        Parameter name to array of sampled values.
+    """
+
+    SHARED_PARAMETERS = ("t_list", "suppression_policy")
+
+    def __init__(self, t_list, suppression_policy, parameters):
+        self.t_list = t_list
+        self.suppression_policy = suppression_policy
+        self.parameters = parameters
+
+    @property
+    def n_samples(self):
+        return len(next(iter(self.parameters.values())))
+
+    def __len__(self):
+        return self.n_samples
+
+    def __getitem__(self, name):
+        return self.parameters[name]
+
+    def update(self, override_params):
+        """
+        Override parameters with scalars, applied to every sample, or arrays
+        of length n_samples.
+        """
+        for name, value in override_params.items():
+            if name in self.SHARED_PARAMETERS:
+                setattr(self, name, value)
+            else:
+                self.parameters[name] = np.broadcast_to(value, (self.n_samples,)).copy()
+
+    def iter_parameter_sets(self):
+        """
+        Yield one legacy parameter dict per sample, with Python scalar values.
+        """
+        names = list(self.parameters)
+        columns = [self.parameters[name].tolist() for name in names]
+        for values in zip(*columns):
+            parameter_set = dict(zip(names, values))
+            parameter_set["t_list"] = self.t_list
+            parameter_set["suppression_policy"] = self.suppression_policy
+            yield parameter_set
+
+    def to_parameter_sets(self):
+        """
+        Returns
+        -------
+        : list(dict)
+            List of parameter sets to feed to the simulations.
+        """
+        return list(self.iter_parameter_sets())
+
+
+@lru_cache(maxsize=None)
+def _get_expected_seir_parameters(fips, I_initial):
+    generator = ParameterEnsembleGenerator(fips, N_samples=0, t_list=None, I_initial=I_initial)
+    return generator.get_expected_seir_parameters()
+
+
 class ParameterEnsembleGenerator:
     """
     Generate ensembles of parameters for SEIR modeling.
@@ -56,120 +157,193 @@ class ParameterEnsembleGenerator:
         """Returns the utilization rate if known, otherwise default."""
         return self._latest[CommonFields.ALL_BED_TYPICAL_OCCUPANCY_RATE] or 0.4
 
-    def sample_seir_parameters(self, override_params=None):
+    def sample_seir_parameters(self, override_params=None, random_state=None):
         """
-        Generate N_samples of parameter values from the priors listed below.
+        Generate N_samples of parameter values from the priors listed in
+        sample_seir_parameter_arrays, as one dict per sample.
 
         Parameters
         ----------
         override_params: dict()
             Individual parameters can be overridden here.
+        random_state: int or np.random.Generator or NoneType
+            Seed or generator for the draws. See sample_seir_parameter_arrays.
 
         Returns
         -------
         : list(dict)
             List of parameter sets to feed to the simulations.
         """
-        override_params = override_params or dict()
-        parameter_sets = []
-
-        for _ in range(self.N_samples):
-
-            hospitalization_rate_general = np.random.normal(loc=0.02, scale=0.01)
-            # For now we have disabled this bucket and lowered rates of other
-            # boxes accordingly. Since we were not modeling different contact
-            # rates, this has the same result.
-            fraction_asymptomatic = 0
-            parameter_sets.append(
-                dict(
-                    t_list=self.t_list,
-                    N=self.population,
-                    A_initial=0.0,
-                    I_initial=self.I_initial,
-                    R_initial=0,
-                    E_initial=0,
-                    D_initial=0,
-                    HGen_initial=0,
-                    HICU_initial=0,
-                    HICUVent_initial=0,
-                    suppression_policy=self.suppression_policy,
-                    R0=np.random.uniform(low=3.2, high=4),
-                    R0_hospital=np.random.uniform(low=3.2 / 6, high=4 / 6),
-                    # These parameters produce an IFR ~0.0065 if we had infinite
-                    # capacity, and about ~0.0125 with capacity constraints imposed
-                    hospitalization_rate_general=hospitalization_rate_general,
-                    hospitalization_rate_icu=max(
-                        np.random.normal(loc=0.30, scale=0.05) * hospitalization_rate_general, 0
-                    ),
-                    fraction_icu_requiring_ventilator=max(np.random.normal(loc=0.6, scale=0.1), 0),
-                    sigma=1 / np.random.normal(loc=3.0, scale=0.86),
-                    # Sigma = Imperial college - 2 days since that is expected infectious period.
-                    delta=1 / np.random.gamma(6.0, scale=1),
-                    # Delta = Kind of based on imperial college + CDC digest.
-                    delta_hospital=1 / np.random.gamma(8.0, scale=1),
-                    # delta_hospitalKind of based on imperial college + CDC digest.
-                    kappa=1,  # Contact rate for asympt
-                    gamma=(1 - fraction_asymptomatic),
-                    # https://www.cdc.gov/coronavirus/2019-ncov/hcp/clinical-guidance-management-patients.html
-                    symptoms_to_hospital_days=np.random.normal(loc=6.0, scale=1.5),
-                    hospitalization_length_of_stay_general=np.random.normal(loc=7, scale=1),
-                    # hospitalization_length_of_stay_icu_avg=8.6,  # Weighted avg of icu w & w/o
-                    hospitalization_length_of_stay_icu=np.random.normal(loc=8, scale=3),
-                    hospitalization_length_of_stay_icu_and_ventilator=np.random.normal(
-                        loc=9, scale=3
-                    ),
-                    # if you assume the ARDS population is the group that would die
-                    # w/o ventilation, this would suggest a 20-42% mortality rate
-                    # among general hospitalized patients w/o access to ventilators:
-                    # “Among all patients, a range of 3% to 17% developed ARDS
-                    # compared to a range of 20% to 42% for hospitalized patients
-                    # and 67% to 85% for patients admitted to the ICU.1,4-6,8,11”
-                    # 10% Of the population should die at saturation levels. CFR
-                    # from Italy is 11.9% right now, Spain 8.9%.  System has to
-                    # produce,
-                    mortality_rate_no_general_beds=np.random.normal(loc=0.10, scale=0.01),
-                    mortality_rate_from_hospital=0.05,
-                    mortality_rate_from_ICU=np.random.normal(loc=0.5, scale=0.05),
-                    mortality_rate_from_ICUVent=0.70,
-                    mortality_rate_no_ICU_beds=1.0,
-                    beds_general=self.beds
-                    * (1 - self.bed_utilization)
-                    * 2.07,  # 60% utliization, no scaling...
-                    # TODO.. Patch this After Issue 132
-                    beds_ICU=(1 - self.icu_utilization)
-                    * self.icu_beds,  # No scaling, 75% utilization...
-                    # hospital_capacity_change_daily_rate=1.05,
-                    # max_hospital_capacity_factor=2.07,
-                    # initial_hospital_bed_utilization=0.6,
-                    # Rubinson L, Vaughn F, Nelson S, et al. Mechanical ventilators
-                    # in US acute care hospitals. Disaster Med Public Health Prep.
-                    # 2010;4(3):199-206. http://dx.doi.org/10.1001/dmp.2010.18.
-                    # 0.7 ventilators per ICU bed on average in US ~80k Assume
-                    # another 20-40% of 100k old ventilators can be used. = 100-120
-                    # for 100k ICU beds
-                    # TODO: Update this if possible by county or state. The ref above has state estimates
-                    # Staff expertise may be a limiting factor:
-                    # https://sccm.org/getattachment/About-SCCM/Media-Relations/Final-Covid19-Press-Release.pdf?lang=en-US
-                    # TODO: Patch after #133
-                    ventilators=self.icu_beds * np.random.uniform(low=0.9, high=1.1),
-                )
-            )
-
-        for parameter_set in parameter_sets:
-            parameter_set.update(override_params)
-
-        return parameter_sets
+        return self.sample_seir_parameter_arrays(
+            override_params, random_state=random_state
+        ).to_parameter_sets()
+
+    def sample_seir_parameter_arrays(self, override_params=None, random_state=None):
+        """
+        Generate N_samples of parameter values from the priors listed below,
+        drawing each parameter as an array in a single call.
+
+        Parameters
+        ----------
+        override_params: dict()
+            Individual parameters can be overridden here. Values may be
+            scalars or arrays of length N_samples.
+        random_state: int or np.random.Generator or NoneType
+            Seed or generator for the draws. If None, the generator is seeded
+            from the global numpy random state so np.random.seed keeps runs
+            reproducible.
+
+        Returns
+        -------
+        : SEIRParameterSamples
+            Columnar parameter samples.
+        """
+        if random_state is None:
+            random_state = np.random.randint(2 ** 31 - 1)
+        rng = np.random.default_rng(random_state)
+        n = self.N_samples
+
+        def constant(value):
+            return np.full(n, value)
+
+        hospitalization_rate_general = rng.normal(loc=0.02, scale=0.01, size=n)
+        # For now we have disabled this bucket and lowered rates of other
+        # boxes accordingly. Since we were not modeling different contact
+        # rates, this has the same result.
+        fraction_asymptomatic = 0
+        parameters = dict(
+            N=constant(self.population),
+            A_initial=constant(0.0),
+            I_initial=constant(self.I_initial),
+            R_initial=constant(0),
+            E_initial=constant(0),
+            D_initial=constant(0),
+            HGen_initial=constant(0),
+            HICU_initial=constant(0),
+            HICUVent_initial=constant(0),
+            R0=rng.uniform(low=3.2, high=4, size=n),
+            R0_hospital=rng.uniform(low=3.2 / 6, high=4 / 6, size=n),
+            # These parameters produce an IFR ~0.0065 if we had infinite
+            # capacity, and about ~0.0125 with capacity constraints imposed
+            hospitalization_rate_general=hospitalization_rate_general,
+            hospitalization_rate_icu=np.maximum(
+                rng.normal(loc=0.30, scale=0.05, size=n) * hospitalization_rate_general, 0
+            ),
+            fraction_icu_requiring_ventilator=np.maximum(rng.normal(loc=0.6, scale=0.1, size=n), 0),
+            sigma=1 / rng.normal(loc=3.0, scale=0.86, size=n),
+            # Sigma = Imperial college - 2 days since that is expected infectious period.
+            delta=1 / rng.gamma(6.0, scale=1, size=n),
+            # Delta = Kind of based on imperial college + CDC digest.
+            delta_hospital=1 / rng.gamma(8.0, scale=1, size=n),
+            # delta_hospitalKind of based on imperial college + CDC digest.
+            kappa=constant(1),  # Contact rate for asympt
+            gamma=constant(1 - fraction_asymptomatic),
+            # https://www.cdc.gov/coronavirus/2019-ncov/hcp/clinical-guidance-management-patients.html
+            symptoms_to_hospital_days=rng.normal(loc=6.0, scale=1.5, size=n),
+            hospitalization_length_of_stay_general=rng.normal(loc=7, scale=1, size=n),
+            # hospitalization_length_of_stay_icu_avg=8.6,  # Weighted avg of icu w & w/o
+            hospitalization_length_of_stay_icu=rng.normal(loc=8, scale=3, size=n),
+            hospitalization_length_of_stay_icu_and_ventilator=rng.normal(loc=9, scale=3, size=n),
+            # if you assume the ARDS population is the group that would die
+            # w/o ventilation, this would suggest a 20-42% mortality rate
+            # among general hospitalized patients w/o access to ventilators:
+            # “Among all patients, a range of 3% to 17% developed ARDS
+            # compared to a range of 20% to 42% for hospitalized patients
+            # and 67% to 85% for patients admitted to the ICU.1,4-6,8,11”
+            # 10% Of the population should die at saturation levels. CFR
+            # from Italy is 11.9% right now, Spain 8.9%.  System has to
+            # produce,
+            mortality_rate_no_general_beds=rng.normal(loc=0.10, scale=0.01, size=n),
+            mortality_rate_from_hospital=constant(0.05),
+            mortality_rate_from_ICU=rng.normal(loc=0.5, scale=0.05, size=n),
+            mortality_rate_from_ICUVent=constant(0.70),
+            mortality_rate_no_ICU_beds=constant(1.0),
+            beds_general=constant(
+                self.beds * (1 - self.bed_utilization) * 2.07
+            ),  # 60% utliization, no scaling...
+            # TODO.. Patch this After Issue 132
+            beds_ICU=constant(
+                (1 - self.icu_utilization) * self.icu_beds
+            ),  # No scaling, 75% utilization...
+            # hospital_capacity_change_daily_rate=1.05,
+            # max_hospital_capacity_factor=2.07,
+            # initial_hospital_bed_utilization=0.6,
+            # Rubinson L, Vaughn F, Nelson S, et al. Mechanical ventilators
+            # in US acute care hospitals. Disaster Med Public Health Prep.
+            # 2010;4(3):199-206. http://dx.doi.org/10.1001/dmp.2010.18.
+            # 0.7 ventilators per ICU bed on average in US ~80k Assume
+            # another 20-40% of 100k old ventilators can be used. = 100-120
+            # for 100k ICU beds
+            # TODO: Update this if possible by county or state. The ref above has state estimates
+            # Staff expertise may be a limiting factor:
+            # https://sccm.org/getattachment/About-SCCM/Media-Relations/Final-Covid19-Press-Release.pdf?lang=en-US
+            # TODO: Patch after #133
+            ventilators=self.icu_beds * rng.uniform(low=0.9, high=1.1, size=n),
+        )
+
+        samples = SEIRParameterSamples(
+            t_list=self.t_list, suppression_policy=self.suppression_policy, parameters=parameters
+        )
+        samples.update(override_params or dict())
+        return samples
+
+    def get_expected_seir_parameters(self):
+        """
+        Closed form expected values of the priors in sample_seir_parameters.
+
+        Returns
+        -------
+        expected_parameters: dict
+            Expected value of every numeric parameter of the ensemble.
+        """
+        hospitalization_rate_general = 0.02
+        fraction_asymptomatic = 0
+        return dict(
+            N=self.population,
+            A_initial=0.0,
+            I_initial=self.I_initial,
+            R_initial=0,
+            E_initial=0,
+            D_initial=0,
+            HGen_initial=0,
+            HICU_initial=0,
+            HICUVent_initial=0,
+            R0=(3.2 + 4) / 2,
+            R0_hospital=(3.2 / 6 + 4 / 6) / 2,
+            hospitalization_rate_general=hospitalization_rate_general,
+            # The ICU fraction is positive, so it factors out of the clipped product.
+            hospitalization_rate_icu=0.30 * expected_clipped_normal(loc=0.02, scale=0.01),
+            fraction_icu_requiring_ventilator=expected_clipped_normal(loc=0.6, scale=0.1),
+            sigma=expected_reciprocal_normal(loc=3.0, scale=0.86),
+            delta=expected_reciprocal_gamma(6.0, scale=1),
+            delta_hospital=expected_reciprocal_gamma(8.0, scale=1),
+            kappa=1,
+            gamma=(1 - fraction_asymptomatic),
+            symptoms_to_hospital_days=6.0,
+            hospitalization_length_of_stay_general=7,
+            hospitalization_length_of_stay_icu=8,
+            hospitalization_length_of_stay_icu_and_ventilator=9,
+            mortality_rate_no_general_beds=0.10,
+            mortality_rate_from_hospital=0.05,
+            mortality_rate_from_ICU=0.5,
+            mortality_rate_from_ICUVent=0.70,
+            mortality_rate_no_ICU_beds=1.0,
+            beds_general=self.beds * (1 - self.bed_utilization) * 2.07,
+            beds_ICU=(1 - self.icu_utilization) * self.icu_beds,
+            ventilators=self.icu_beds,
+        )
 
     def get_average_seir_parameters(self):
         """
-        Sample from the ensemble to obtain the average parameter values.
+        Obtain the average parameter values of the ensemble. These are the
+        analytic expected values of the priors, cached per fips.
 
         Returns
         -------
         average_parameters: dict
-            Average of the parameter ensemble, determined by sampling.
+            Average of the parameter ensemble.
         """
-        df = pd.DataFrame(self.sample_seir_parameters()).drop("t_list", axis=1)
-        average_parameters = df.mean().to_dict()
+        average_parameters = dict(_get_expected_seir_parameters(self.fips, self.I_initial))
         average_parameters["t_list"] = self.t_list
+        average_parameters["suppression_policy"] = self.suppression_policy
         return average_parameters
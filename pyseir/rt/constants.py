@@ -37,6 +37,23 @@ class InferRtConstants:
     # Recommend range 20. - 50. 30. appears to be best
     MAX_SCALING_OF_SIGMA = 30.0
 
+    # Process sigma is rounded to a multiple of this value so that process matrices can be built
+    # once and reused across days and regions by the vectorized posterior engine. The resulting
+    # change in the prior is far below the R bucket resolution.
+    PROCESS_SIGMA_QUANTUM = 0.0001
+
+    # Maximum number of (501 x 501) process matrices kept in the per-process cache (~2MB each).
+    PROCESS_MATRIX_CACHE_SIZE = 64
+
+    # Use the NumPy array posterior engine rather than the original day-by-day DataFrame loop.
+    VECTORIZED_POSTERIORS = True
+
+    # Batched (multi-region) inference groups regions by process sigma each day, so it uses a
+    # coarser grid: sigma is rounded to steps of this size in log(sigma / DEFAULT_PROCESS_SIGMA),
+    # i.e. to within 1%. This bounds the number of process matrices to
+    # log(MAX_SCALING_OF_SIGMA) / BATCH_PROCESS_SIGMA_LOG_STEP + 1 = 171.
+    BATCH_PROCESS_SIGMA_LOG_STEP = 0.02
+
     # Override min_cases and min_deaths with this value.
     # Recommend 1. - 5. range.
     # 1. is allowing some counties to run that shouldn't (unphysical results)
@@ -2,6 +2,7 @@ import math
 from datetime import timedelta
 import logging
 import structlog
+from functools import lru_cache
 from typing import Optional
 
 import numpy as np
@@ -167,6 +168,123 @@ def filter_and_smooth_input_data(
     return df
 
 
+def build_process_matrix(r_list: np.ndarray, sigma: float) -> np.ndarray:
+    """
+    Build the Gaussian process matrix that smooths the previous posterior into the next prior.
+
+    Parameters
+    ----------
+    r_list: np.ndarray
+        The R buckets.
+    sigma: float
+        Standard deviation of the day-to-day shift in R_t.
+
+    Returns
+    -------
+    process_matrix: np.ndarray
+        Row normalized (len(r_list), len(r_list)) matrix.
+    """
+    process_matrix = sps.norm(loc=r_list, scale=sigma).pdf(r_list[:, None])
+
+    # process_matrix applies gaussian smoothing to the previous posterior to make the prior.
+    # But when the gaussian is wide much of its distribution function can be outside of the
+    # range Reff = (0,10). When this happens the smoothing is not symmetric in R space. For
+    # R<1, when posteriors[previous_day]).argmax() < 50, this asymmetry can push the argmax of
+    # the prior >10 Reff bins (delta R = .2) on each new day. This was a large systematic error.
+
+    # Ensure smoothing window is symmetric in X direction around diagonal
+    # to avoid systematic drift towards middle (Reff = 5). This is done by
+    # ensuring the following matrix values are 0:
+    # 1 0 0 0 0 0 ... 0 0 0 0 0 0
+    # * * * 0 0 0 ... 0 0 0 0 0 0
+    # ...
+    # * * * * * * ... * * * * 0 0
+    # * * * * * * ... * * * * * *
+    # 0 0 * * * * ... * * * * * *
+    # ...
+    # 0 0 0 0 0 0 ... 0 0 0 * * *
+    # 0 0 0 0 0 0 ... 0 0 0 0 0 1
+    _, symmetry_mask = _process_matrix_layout(len(r_list))
+    process_matrix[symmetry_mask] = 0.0
+
+    # (3a) Normalize all rows to sum to 1
+    process_matrix /= process_matrix.sum(axis=1)[:, None]
+
+    return process_matrix
+
+
+@lru_cache(maxsize=4)
+def _process_matrix_layout(sz: int):
+    """
+    Index arrays shared by every (sz x sz) process matrix.
+
+    Returns
+    -------
+    offsets: np.ndarray
+        Integer (row - col + sz - 1) for each element, used to gather a Toeplitz matrix from a
+        kernel evaluated over the 2 * sz - 1 possible bucket offsets.
+    symmetry_mask: np.ndarray
+        True for the elements zeroed to keep the smoothing symmetric, see build_process_matrix.
+    """
+    rows = np.arange(sz)[:, None]
+    cols = np.arange(sz)[None, :]
+    offsets = rows - cols + sz - 1
+    below_middle = (rows < (sz - 1) / 2) & (cols >= 2 * rows + 1)
+    above_middle = (rows > (sz - 1) / 2) & (cols < 2 * rows - sz)
+    return offsets, below_middle | above_middle
+
+
+def gather_process_matrix(sigma: float) -> np.ndarray:
+    """
+    Process matrix over the (evenly spaced) InferRtConstants.R_BUCKETS. Equivalent to
+    build_process_matrix but gathers the matrix from a 1-D kernel over the bucket offsets instead
+    of evaluating the pdf for every element.
+
+    Parameters
+    ----------
+    sigma: float
+        Standard deviation of the day-to-day shift in R_t.
+
+    Returns
+    -------
+    process_matrix: np.ndarray
+        Row normalized (len(R_BUCKETS), len(R_BUCKETS)) matrix.
+    """
+    r_list = InferRtConstants.R_BUCKETS
+    sz = len(r_list)
+    offsets, symmetry_mask = _process_matrix_layout(sz)
+
+    kernel = sps.norm(scale=sigma).pdf(np.arange(-(sz - 1), sz) * (r_list[1] - r_list[0]))
+    process_matrix = kernel[offsets]
+    process_matrix[symmetry_mask] = 0.0
+    process_matrix /= process_matrix.sum(axis=1)[:, None]
+    return process_matrix
+
+
+@lru_cache(maxsize=InferRtConstants.PROCESS_MATRIX_CACHE_SIZE)
+def _get_quantized_process_matrix(sigma_bucket: int) -> np.ndarray:
+    """
+    Cached process matrix for a sigma of sigma_bucket * PROCESS_SIGMA_QUANTUM. Returned array is
+    read-only as it is shared between engines.
+    """
+    process_matrix = gather_process_matrix(sigma_bucket * InferRtConstants.PROCESS_SIGMA_QUANTUM)
+    process_matrix.setflags(write=False)
+    return process_matrix
+
+
+def evaluate_head_tail_suppression(window_size: int, kernel_std: float) -> pd.Series:
+    """
+    Evaluates how much time slows down (which suppresses Rt) as series approaches latest date
+    """
+    timeseries = pd.Series(1.0 * np.arange(0, 2 * window_size))
+    smoothed = timeseries.rolling(
+        window_size, win_type="gaussian", min_periods=kernel_std, center=True
+    ).mean(std=kernel_std)
+    delta = (smoothed - smoothed.shift()).tail(math.ceil(window_size / 2))
+
+    return delta[delta < 1.0]
+
+
 class RtInferenceEngine:
     """
     This class extends the analysis of Bettencourt et al to include mortality data in a
@@ -213,6 +331,7 @@ class RtInferenceEngine:
         self.smooth_rt_map_composite = InferRtConstants.SMOOTH_RT_MAP_COMPOSITE
         self.rt_smoothing_window_size = InferRtConstants.RT_SMOOTHING_WINDOW_SIZE
         self.min_conf_width = InferRtConstants.MIN_CONF_WIDTH
+        self.vectorized_posteriors = InferRtConstants.VECTORIZED_POSTERIORS
         self.log = structlog.getLogger(Rt_Inference_Target=self.display_name)
         self.log_likelihood = None  # TODO: Add this later. Not in init.
         self.log.info(event="Running:")
@@ -246,13 +365,7 @@ class RtInferenceEngine:
         """
         Evaluates how much time slows down (which suppresses Rt) as series approaches latest date
         """
-        timeseries = pd.Series(1.0 * np.arange(0, 2 * self.window_size))
-        smoothed = timeseries.rolling(
-            self.window_size, win_type="gaussian", min_periods=self.kernel_std, center=True
-        ).mean(std=self.kernel_std)
-        delta = (smoothed - smoothed.shift()).tail(math.ceil(self.window_size / 2))
-
-        return delta[delta < 1.0]
+        return evaluate_head_tail_suppression(self.window_size, self.kernel_std)
 
     def highest_density_interval(self, posteriors, ci):
         """
@@ -280,12 +393,10 @@ class RtInferenceEngine:
         ci_high = self.r_list[high_idx_list]
         return ci_low, ci_high
 
-    def make_process_matrix(self, timeseries_scale=InferRtConstants.SCALE_SIGMA_FROM_COUNT):
-        """ Externalizes process of generating the Gaussian process matrix adding the following:
-        1) Auto adjusts sigma from its default value for low counts - scales sigma up as
-           1/sqrt(count) up to a maximum factor of MAX_SCALING_OF_SIGMA
-        2) Ensures the smoothing (of the posterior when creating the prior) is symmetric
-           in R so that this process does not move argmax (the peak in probability)
+    def get_process_sigma(self, timeseries_scale=InferRtConstants.SCALE_SIGMA_FROM_COUNT):
+        """
+        Auto adjusts sigma from its default value for low counts - scales sigma up as
+        1/sqrt(count) up to a maximum factor of MAX_SCALING_OF_SIGMA.
         """
         # TODO FOR ALEX: Please expand this and describe more clearly the meaning of these variables
         a = self.max_scaling_sigma
@@ -294,41 +405,17 @@ class RtInferenceEngine:
         else:
             b = max(1.0, math.sqrt(self.scale_sigma_from_count / timeseries_scale))
 
-        use_sigma = min(a, b) * self.default_process_sigma
-
-        process_matrix = sps.norm(loc=self.r_list, scale=use_sigma).pdf(self.r_list[:, None])
-
-        # process_matrix applies gaussian smoothing to the previous posterior to make the prior.
-        # But when the gaussian is wide much of its distribution function can be outside of the
-        # range Reff = (0,10). When this happens the smoothing is not symmetric in R space. For
-        # R<1, when posteriors[previous_day]).argmax() < 50, this asymmetry can push the argmax of
-        # the prior >10 Reff bins (delta R = .2) on each new day. This was a large systematic error.
-
-        # Ensure smoothing window is symmetric in X direction around diagonal
-        # to avoid systematic drift towards middle (Reff = 5). This is done by
-        # ensuring the following matrix values are 0:
-        # 1 0 0 0 0 0 ... 0 0 0 0 0 0
-        # * * * 0 0 0 ... 0 0 0 0 0 0
-        # ...
-        # * * * * * * ... * * * * 0 0
-        # * * * * * * ... * * * * * *
-        # 0 0 * * * * ... * * * * * *
-        # ...
-        # 0 0 0 0 0 0 ... 0 0 0 * * *
-        # 0 0 0 0 0 0 ... 0 0 0 0 0 1
-        sz = len(self.r_list)
-        for row in range(0, sz):
-            if row < (sz - 1) / 2:
-                process_matrix[row, 2 * row + 1 : sz] = 0.0
-            elif row > (sz - 1) / 2:
-                process_matrix[row, 0 : sz - 2 * (sz - row)] = 0.0
-
-        # (3a) Normalize all rows to sum to 1
-        row_sums = process_matrix.sum(axis=1)
-        for row in range(0, sz):
-            process_matrix[row] = process_matrix[row] / row_sums[row]
+        return min(a, b) * self.default_process_sigma
 
-        return use_sigma, process_matrix
+    def make_process_matrix(self, timeseries_scale=InferRtConstants.SCALE_SIGMA_FROM_COUNT):
+        """ Externalizes process of generating the Gaussian process matrix adding the following:
+        1) Auto adjusts sigma from its default value for low counts - scales sigma up as
+           1/sqrt(count) up to a maximum factor of MAX_SCALING_OF_SIGMA
+        2) Ensures the smoothing (of the posterior when creating the prior) is symmetric
+           in R so that this process does not move argmax (the peak in probability)
+        """
+        use_sigma = self.get_process_sigma(timeseries_scale)
+        return use_sigma, build_process_matrix(self.r_list, use_sigma)
 
     def get_posteriors(self, timeseries_type, plot=False):
         """
@@ -368,6 +455,34 @@ class RtInferenceEngine:
                 % (self.display_name, timeseries_type.value)
             )
 
+        if self.vectorized_posteriors:
+            posteriors = self._get_posteriors_vectorized(timeseries)
+        else:
+            posteriors = self._get_posteriors_iterative(timeseries)
+
+        if plot:
+            plotting.plot_posteriors(x=posteriors)  # Returns Figure.
+            # The interpreter will handle this as it sees fit. Normal builds never call plot flag.
+
+        start_idx = -len(posteriors.columns)
+
+        return dates[start_idx:], posteriors, start_idx
+
+    def _get_posteriors_iterative(self, timeseries):
+        """
+        Original implementation of the Bayesian update, walking the series one day at a time over
+        DataFrame columns and rebuilding the process matrix every day.
+
+        Parameters
+        ----------
+        timeseries: pd.Series
+            Smoothed new counts per day.
+
+        Returns
+        -------
+        posteriors: pd.DataFrame
+            Posterior over self.r_list (index) for each date (columns).
+        """
         # (1) Calculate Lambda (the Poisson likelihood given the data) based on
         # the observed increase from t-1 cases to t cases.
         lam = timeseries[:-1].values * np.exp((self.r_list[:, None] - 1) / self.serial_period)
@@ -477,13 +592,88 @@ class RtInferenceEngine:
 
         self.log_likelihood = log_likelihood
 
-        if plot:
-            plotting.plot_posteriors(x=posteriors)  # Returns Figure.
-            # The interpreter will handle this as it sees fit. Normal builds never call plot flag.
+        return posteriors
 
-        start_idx = -len(posteriors.columns)
+    def _get_posteriors_vectorized(self, timeseries):
+        """
+        Array implementation of the Bayesian update in _get_posteriors_iterative. Likelihoods are
+        computed for all days at once, posteriors are written into a preallocated
+        (len(r_list), len(timeseries)) array and process matrices are taken from a cache keyed by
+        sigma quantized to InferRtConstants.PROCESS_SIGMA_QUANTUM.
 
-        return dates[start_idx:], posteriors, start_idx
+        Parameters
+        ----------
+        timeseries: pd.Series
+            Smoothed new counts per day.
+
+        Returns
+        -------
+        posteriors: pd.DataFrame
+            Posterior over self.r_list (index) for each date (columns).
+        """
+        counts = timeseries.values.astype(float)
+        n_days = len(counts)
+
+        # (1) Poisson rate for each R bucket (rows) given the previous day's count (columns).
+        lam = counts[:-1] * np.exp((self.r_list[:, None] - 1) / self.serial_period)
+
+        # (2) Likelihoods interpolated between the floor and ceiling of the smoothed counts.
+        counts_floor = np.floor(counts).astype(int)
+        counts_ceil = np.ceil(counts).astype(int)
+        counts_frac = (counts - counts_floor)[1:]
+        likelihoods = counts_frac * sps.poisson.pmf(counts_ceil[1:], lam) + (
+            1 - counts_frac
+        ) * sps.poisson.pmf(counts_floor[1:], lam)
+
+        # (3) Process sigma for each day from an exponential moving average of the counts.
+        sigma_buckets = np.empty(n_days - 1, dtype=int)
+        scale = counts[0]
+        for i, count in enumerate(counts[1:]):
+            scale = 0.9 * scale + 0.1 * count
+            sigma_buckets[i] = round(
+                self.get_process_sigma(scale) / InferRtConstants.PROCESS_SIGMA_QUANTUM
+            )
+
+        # (4) Initial and restart priors.
+        prior0 = sps.gamma(a=2.5).pdf(self.r_list)
+        prior0 /= prior0.sum()
+
+        reinit_prior = sps.gamma(a=2).pdf(self.r_list)
+        reinit_prior /= reinit_prior.sum()
+
+        posteriors = np.empty((len(self.r_list), n_days))
+        posteriors[:, 0] = prior0
+
+        log_likelihood = 0.0
+        monitor = utils.LagMonitor(debug=False)
+
+        # (5) Iteratively apply Bayes' rule
+        for day in range(1, n_days):
+            process_matrix = _get_quantized_process_matrix(sigma_buckets[day - 1])
+            current_prior = process_matrix @ posteriors[:, day - 1]
+            numerator = likelihoods[:, day - 1] * current_prior
+            denominator = numerator.sum()
+
+            if denominator == 0:
+                # Restart the bayesian learning, see _get_posteriors_iterative.
+                posteriors[:, day] = reinit_prior
+            else:
+                posteriors[:, day] = numerator / denominator
+
+            monitor.evaluate_lag_using_argmaxes(
+                current_day=day - 1,
+                current_sigma=sigma_buckets[day - 1] * InferRtConstants.PROCESS_SIGMA_QUANTUM,
+                prev_post_am=posteriors[:, day - 1].argmax(),
+                prior_am=current_prior.argmax(),
+                like_am=likelihoods[:, day - 1].argmax(),
+                post_am=numerator.argmax(),
+            )
+
+            log_likelihood += np.log(denominator)
+
+        self.log_likelihood = log_likelihood
+
+        return pd.DataFrame(data=posteriors, index=self.r_list, columns=timeseries.index)
 
     def get_available_timeseries(self):
         """
@@ -0,0 +1,387 @@
+"""
+Batched Rt inference for every county of a state in one pass.
+
+Instead of loading, smoothing and running an RtInferenceEngine per county, the new case series of
+all counties are stacked into one padded (dates x counties) frame and the Bayesian update is applied
+to all counties at once. Counties only differ in which days are active (their own date range) and
+in the process sigma, so the update is a handful of array operations per day plus one matrix
+product per distinct (quantized) sigma.
+
+Only the case based Rt is computed (counties are run with include_deaths=False) and no figures are
+produced. Results for a state are written to a single parquet file,
+RunArtifact.RT_INFERENCE_BATCH_RESULT, which pyseir.rt.utils.load_Rt_result reads unless a
+per-county result file was written after it.
+"""
+import math
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import structlog
+import us
+from scipy import stats as sps
+from covidactnow.datapublic.common_fields import CommonFields
+
+from libs.datasets import combined_datasets
+from libs.datasets.dataset_utils import AggregationLevel
+from pyseir.rt import infer_rt, utils
+from pyseir.rt.constants import InferRtConstants
+from pyseir.utils import TimeseriesType, get_run_artifact_path, RunArtifact
+
+rt_log = structlog.get_logger(__name__)
+
+
+def run_rt_for_state_counties(state: str, county_fips: Optional[List[str]] = None):
+    """
+    Entry point for batched county Rt inference.
+
+    Parameters
+    ----------
+    state: str
+        State abbreviation.
+    county_fips: list(str)
+        Counties to run. If None, all counties in the state with data are run.
+
+    Returns
+    -------
+    output_df: pd.DataFrame
+        Long format results with one row per fips and date.
+    """
+    state_fips = us.states.lookup(state).fips
+    log = rt_log.new(state=state)
+
+    new_cases = load_county_new_cases(state, county_fips=county_fips)
+    smoothed_cases = filter_and_smooth_county_cases(new_cases, log=log)
+    if smoothed_cases.empty:
+        log.warning(event="Batched Infer Rt Skipped. No Data Passed Filter Requirements:")
+        return
+
+    engine = BatchRtInferenceEngine(data=smoothed_cases, display_name=state)
+    output_df = engine.infer_all()
+
+    if output_df is not None and not output_df.empty:
+        output_path = get_run_artifact_path(state_fips, RunArtifact.RT_INFERENCE_BATCH_RESULT)
+        output_df.to_parquet(output_path, index=False)
+    return output_df
+
+
+def load_county_new_cases(state: str, county_fips: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load new cases per day for the counties of a state.
+
+    Matches pyseir.load_data.load_new_case_data_by_fips: each county's series covers the range
+    with some case or death data, the first day of that range is dropped by the difference and
+    negative values are clipped.
+
+    Returns
+    -------
+    new_cases: pd.DataFrame
+        Date index and one column per county fips, NaN outside of each county's range.
+    """
+    county_data = (
+        combined_datasets.load_us_timeseries_dataset()
+        .get_subset(AggregationLevel.COUNTY, state=state)
+        .data
+    )
+    if county_fips is not None:
+        county_data = county_data.loc[county_data[CommonFields.FIPS].isin(county_fips)]
+    if county_data.empty:
+        # Pivoting no rows leaves no cases column to select.
+        return pd.DataFrame(index=pd.DatetimeIndex([], name=CommonFields.DATE))
+
+    cumulative = county_data.pivot(
+        index=CommonFields.DATE,
+        columns=CommonFields.FIPS,
+        values=[CommonFields.CASES, CommonFields.DEATHS],
+    )
+    cases = cumulative[CommonFields.CASES]
+    has_value = cases.notna() | cumulative[CommonFields.DEATHS].notna()
+
+    # Positions outside of [first valid, last valid] are padding for that county.
+    in_range = has_value.cummax() & has_value[::-1].cummax()[::-1]
+    return cases.where(in_range).diff().clip(lower=0)
+
+
+def filter_and_smooth_county_cases(new_cases: pd.DataFrame, log) -> pd.DataFrame:
+    """
+    Apply the case requirements, outlier replacement and smoothing of
+    infer_rt.filter_and_smooth_input_data to every county column at once.
+
+    Returns
+    -------
+    smoothed_cases: pd.DataFrame
+        Smoothed new cases for the counties that pass the requirements.
+    """
+    MIN_CUMULATIVE_COUNTS = 20
+    MIN_INCIDENT_COUNTS = 5
+
+    passes = (
+        (new_cases.count() > InferRtConstants.MIN_TIMESERIES_LENGTH)
+        & (new_cases.sum() > MIN_CUMULATIVE_COUNTS)
+        & (new_cases.max() > MIN_INCIDENT_COUNTS)
+    )
+    filtered = new_cases.loc[:, passes].copy()
+
+    # Outliers are replaced on each county's own range so that the newest value is handled the
+    # same way as it is for an unpadded series.
+    for fips in filtered.columns:
+        first, last = filtered[fips].first_valid_index(), filtered[fips].last_valid_index()
+        filtered.loc[first:last, fips] = utils.replace_outliers(
+            filtered.loc[first:last, fips].copy(), log=log.new(fips=fips)
+        )
+
+    # Rolling windows ignore the NaN padding, so this matches smoothing each series separately.
+    smoothed = filtered.rolling(
+        InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE,
+        win_type="gaussian",
+        min_periods=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD,
+        center=True,
+    ).mean(std=InferRtConstants.COUNT_SMOOTHING_KERNEL_STD)
+    smoothed = smoothed.where(filtered.notna().cummax() & filtered[::-1].notna().cummax()[::-1])
+
+    dropped = smoothed.columns[~(smoothed.max() > MIN_INCIDENT_COUNTS)]
+    if len(dropped):
+        log.info("Dropping:", fips=list(dropped))
+    return smoothed.drop(columns=dropped)
+
+
+@lru_cache(maxsize=None)
+def _get_log_quantized_process_matrix(sigma_bucket: int) -> np.ndarray:
+    """
+    Cached process matrix for a sigma of
+    DEFAULT_PROCESS_SIGMA * exp(sigma_bucket * BATCH_PROCESS_SIGMA_LOG_STEP). Sigma is bounded by
+    MAX_SCALING_OF_SIGMA so the number of buckets, and the size of this cache, is fixed.
+    """
+    sigma = InferRtConstants.DEFAULT_PROCESS_SIGMA * math.exp(
+        sigma_bucket * InferRtConstants.BATCH_PROCESS_SIGMA_LOG_STEP
+    )
+    process_matrix = infer_rt.gather_process_matrix(sigma)
+    process_matrix.setflags(write=False)
+    return process_matrix
+
+
+class BatchRtInferenceEngine:
+    """
+    Case based R_t inference of RtInferenceEngine applied to many regions at once.
+
+    Parameters
+    ----------
+    data: DataFrame
+        DataFrame with a Date index and one column of smoothed new cases per region. Values
+        outside of a region's date range are NaN.
+    display_name: str
+        Used for logging.
+    """
+
+    def __init__(self, data: pd.DataFrame, display_name: str):
+        self.dates = data.index
+        self.regions = data.columns
+        self.counts = data.values.T.astype(float)
+
+        self.display_name = display_name
+        self.r_list = InferRtConstants.R_BUCKETS
+        self.window_size = InferRtConstants.COUNT_SMOOTHING_WINDOW_SIZE
+        self.kernel_std = InferRtConstants.COUNT_SMOOTHING_KERNEL_STD
+        self.default_process_sigma = InferRtConstants.DEFAULT_PROCESS_SIGMA
+        self.confidence_intervals = InferRtConstants.CONFIDENCE_INTERVALS
+        self.serial_period = InferRtConstants.SERIAL_PERIOD
+        self.max_scaling_sigma = InferRtConstants.MAX_SCALING_OF_SIGMA
+        self.scale_sigma_from_count = InferRtConstants.SCALE_SIGMA_FROM_COUNT
+        self.tail_suppression_correction = InferRtConstants.TAIL_SUPPRESSION_CORRECTION
+        self.smooth_rt_map_composite = InferRtConstants.SMOOTH_RT_MAP_COMPOSITE
+        self.rt_smoothing_window_size = InferRtConstants.RT_SMOOTHING_WINDOW_SIZE
+        self.min_conf_width = InferRtConstants.MIN_CONF_WIDTH
+        self.log = structlog.getLogger(Rt_Inference_Target=self.display_name)
+        self.log_likelihood = None
+
+        # Each region is active from its first to its last non NaN count.
+        valid = ~np.isnan(self.counts)
+        self.has_data = valid.any(axis=1)
+        self.first_idx = np.where(self.has_data, valid.argmax(axis=1), len(self.dates))
+        self.last_idx = np.where(
+            self.has_data, len(self.dates) - 1 - valid[:, ::-1].argmax(axis=1), -1
+        )
+        self.log.info(event="Running:", regions=len(self.regions))
+
+    def get_process_sigma_buckets(self, scale: np.ndarray) -> np.ndarray:
+        """
+        Vectorized RtInferenceEngine.get_process_sigma, quantized to multiples of
+        BATCH_PROCESS_SIGMA_LOG_STEP in log(sigma / DEFAULT_PROCESS_SIGMA).
+        """
+        sqrt_ratio = np.sqrt(
+            np.divide(
+                self.scale_sigma_from_count, scale, out=np.ones_like(scale), where=scale != 0,
+            )
+        )
+        factor = np.minimum(self.max_scaling_sigma, np.maximum(1.0, sqrt_ratio))
+        return np.rint(np.log(factor) / InferRtConstants.BATCH_PROCESS_SIGMA_LOG_STEP).astype(int)
+
+    def _apply_process_matrices(self, posteriors: np.ndarray, sigma_buckets: np.ndarray):
+        """Smooth each posterior (row) into a prior using the process matrix of its sigma."""
+        priors = np.empty_like(posteriors)
+        order = np.argsort(sigma_buckets, kind="stable")
+        buckets, starts = np.unique(sigma_buckets[order], return_index=True)
+        for bucket, rows in zip(buckets, np.split(order, starts[1:])):
+            priors[rows] = posteriors[rows] @ _get_log_quantized_process_matrix(bucket).T
+        return priors
+
+    def _summarize(self, posteriors: np.ndarray):
+        """MAP and credible interval bounds for each posterior (row)."""
+        posterior_cdfs = posteriors.cumsum(axis=1)
+        summary = [self.r_list[posteriors.argmax(axis=1)]]
+        for ci in self.confidence_intervals:
+            summary.append(self.r_list[np.argmin(np.abs(posterior_cdfs - (1 - ci)), axis=1)])
+            summary.append(self.r_list[np.argmin(np.abs(posterior_cdfs - ci), axis=1)])
+        return summary
+
+    def get_posterior_summaries(self) -> List[np.ndarray]:
+        """
+        Run the Bayesian update for every region, keeping only the daily summaries.
+
+        Returns
+        -------
+        summaries: list(np.ndarray)
+            (regions, dates) arrays of the MAP followed by the low and high bound of each
+            confidence interval. NaN outside of each region's date range.
+        """
+        n_regions, n_days = self.counts.shape
+        n_summaries = 1 + 2 * len(self.confidence_intervals)
+        summaries = [np.full((n_regions, n_days), np.nan) for _ in range(n_summaries)]
+
+        prior0 = sps.gamma(a=2.5).pdf(self.r_list)
+        prior0 /= prior0.sum()
+
+        reinit_prior = sps.gamma(a=2).pdf(self.r_list)
+        reinit_prior /= reinit_prior.sum()
+
+        growth = np.exp((self.r_list - 1) / self.serial_period)
+
+        posteriors = np.tile(prior0, (n_regions, 1))
+        scale = np.zeros(n_regions)
+        log_likelihood = np.zeros(n_regions)
+
+        for day in range(n_days):
+            starting = self.first_idx == day
+            scale[starting] = self.counts[starting, day]
+
+            updating = (self.first_idx < day) & (day <= self.last_idx)
+            if day > 0:
+                updating &= ~np.isnan(self.counts[:, day]) & ~np.isnan(self.counts[:, day - 1])
+            rows = np.flatnonzero(updating)
+
+            if len(rows):
+                previous_counts = self.counts[rows, day - 1]
+                counts = self.counts[rows, day]
+
+                # Keep track of exponential moving average of scale of counts of timeseries
+                scale[rows] = 0.9 * scale[rows] + 0.1 * counts
+
+                # Poisson likelihood interpolated between floor and ceiling of smoothed counts
+                lam = previous_counts[:, None] * growth[None, :]
+                counts_floor = np.floor(counts)
+                counts_frac = (counts - counts_floor)[:, None]
+                likelihoods = counts_frac * sps.poisson.pmf(np.ceil(counts)[:, None], lam) + (
+                    1 - counts_frac
+                ) * sps.poisson.pmf(counts_floor[:, None], lam)
+
+                priors = self._apply_process_matrices(
+                    posteriors[rows], self.get_process_sigma_buckets(scale[rows])
+                )
+                numerators = likelihoods * priors
+                denominators = numerators.sum(axis=1)
+
+                # Restart the bayesian learning where the denominator vanishes, see
+                # RtInferenceEngine._get_posteriors_iterative.
+                restart = denominators == 0
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    updated = numerators / denominators[:, None]
+                    log_likelihood[rows] += np.log(denominators)
+                updated[restart] = reinit_prior
+                posteriors[rows] = updated
+
+            # Summaries are recorded for every day in each region's range, including the first.
+            reporting = np.flatnonzero((self.first_idx <= day) & (day <= self.last_idx))
+            for summary, values in zip(summaries, self._summarize(posteriors[reporting])):
+                summary[reporting, day] = values
+
+        self.log_likelihood = log_likelihood
+        return summaries
+
+    def infer_all(self) -> Optional[pd.DataFrame]:
+        """
+        Infer R_t from new cases for all regions, applying the tail suppression correction and
+        composite smoothing of RtInferenceEngine.infer_all.
+
+        Returns
+        -------
+        inference_results: pd.DataFrame
+            Long format with fips, date, MAP estimates and confidence intervals.
+        """
+        if not self.has_data.any():
+            self.log.warning("Inference not possible for any region")
+            return None
+
+        suffix = TimeseriesType.NEW_CASES.value
+        summaries = iter(self.get_posterior_summaries())
+        columns = {f"Rt_MAP__{suffix}": next(summaries)}
+        for ci in self.confidence_intervals:
+            columns[f"Rt_ci{int(math.floor(100 * (1 - ci)))}__{suffix}"] = next(summaries)
+            columns[f"Rt_ci{int(math.floor(100 * ci))}__{suffix}"] = next(summaries)
+
+        # Work with (dates, regions) frames from here on so rolling windows run along dates.
+        frames = {
+            name: pd.DataFrame(values.T, index=self.dates, columns=self.regions)
+            for name, values in columns.items()
+        }
+        in_range = frames[f"Rt_MAP__{suffix}"].notna()
+        rt_map_composite = frames[f"Rt_MAP__{suffix}"].copy()
+        rt_ci95_composite = frames[f"Rt_ci95__{suffix}"].copy()
+
+        # Correct for tail suppression over the last days of each region.
+        suppression = np.ones(rt_map_composite.shape)
+        if self.tail_suppression_correction > 0.0:
+            tail_sup = infer_rt.evaluate_head_tail_suppression(
+                self.window_size, self.kernel_std
+            ).values
+            for offset, value in enumerate(tail_sup[::-1]):
+                day = self.last_idx - offset
+                regions = np.flatnonzero(day >= self.first_idx)
+                suppression[day[regions], regions] = value
+            rt_map_composite = (rt_map_composite - 1.0) / np.power(
+                suppression, self.tail_suppression_correction
+            ) + 1.0
+
+        # Optionally Smooth just Rt_MAP_composite. Rolling windows ignore the NaN padding.
+        for i in range(0, self.smooth_rt_map_composite):
+            kernel_width = round(self.rt_smoothing_window_size / 4)
+            rt_map_composite = (
+                rt_map_composite.rolling(
+                    self.rt_smoothing_window_size,
+                    win_type="gaussian",
+                    min_periods=kernel_width,
+                    center=True,
+                )
+                .mean(std=kernel_width)
+                .where(in_range)
+            )
+            rt_ci95_composite = (
+                np.maximum(
+                    (rt_ci95_composite - rt_map_composite)
+                    / math.sqrt(2.0 * kernel_width)
+                    / np.power(suppression, self.tail_suppression_correction / 2),
+                    self.min_conf_width,
+                )
+                + rt_map_composite
+            )
+
+        frames["Rt_MAP_composite"] = rt_map_composite
+        frames["Rt_ci95_composite"] = rt_ci95_composite
+
+        output_df = pd.concat(
+            {name: frame.stack(dropna=False) for name, frame in frames.items()}, axis=1
+        )
+        output_df = output_df.loc[in_range.stack(dropna=False).values]
+        output_df.index.names = ["date", "fips"]
+        output_df = output_df.reset_index().sort_values(["fips", "date"], ignore_index=True)
+        return output_df[["fips", "date"] + list(frames)]
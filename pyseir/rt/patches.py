@@ -3,7 +3,7 @@ import numpy as np
 
 from libs.datasets import combined_datasets
 from libs.datasets.combined_datasets import CommonFields
-import pyseir.utils
+import pyseir.rt.utils
 
 
 def patch_aggregate_rt_results(fips_superset: list) -> pd.DataFrame:
@@ -21,10 +21,7 @@ def patch_aggregate_rt_results(fips_superset: list) -> pd.DataFrame:
     """
 
     def load_and_append_population(fips: str) -> pd.DataFrame:
-        path = pyseir.utils.get_run_artifact_path(
-            fips, pyseir.utils.RunArtifact.RT_INFERENCE_RESULT
-        )
-        tmp = pd.read_json(path)
+        tmp = pyseir.rt.utils.load_fips_Rt_result(fips)
         tmp["population"] = combined_datasets.get_us_latest_for_fips(fips)[CommonFields.POPULATION]
         return tmp
 
@@ -1,5 +1,6 @@
 import logging
 import os
+from functools import lru_cache
 from typing import Optional
 
 import numpy as np
@@ -271,7 +272,69 @@ def load_Rt_result(fips) -> Optional[pd.DataFrame]:
         utils_log.info("Applying New Orleans Patch")
         return pyseir.rt.patches.patch_aggregate_rt_results(NEW_ORLEANS_FIPS)
 
+    return load_fips_Rt_result(fips)
+
+
+def load_fips_Rt_result(fips) -> Optional[pd.DataFrame]:
+    """
+    Load the Rt inference result of a single fips, without any patches applied.
+
+    A county may have both a result written by run_rt_for_fips and a row in the batched
+    results of its state (see pyseir.rt.infer_rt_batch), for instance when an output directory
+    is rebuilt in the other mode. The most recently written of the two is used.
+
+    Parameters
+    ----------
+    fips: str
+        State or County FIPS code.
+
+    Returns
+    -------
+    results: pd.DataFrame
+        DataFrame containing the R_t inferences.
+    """
     path = pyseir.utils.get_run_artifact_path(fips, pyseir.utils.RunArtifact.RT_INFERENCE_RESULT)
+    modified_time = os.path.getmtime(path) if os.path.exists(path) else None
+
+    if len(fips) == 5:
+        batch_path = pyseir.utils.get_run_artifact_path(
+            fips[:2], pyseir.utils.RunArtifact.RT_INFERENCE_BATCH_RESULT
+        )
+        if os.path.exists(batch_path):
+            batch_modified_time = os.path.getmtime(batch_path)
+            if modified_time is None or batch_modified_time >= modified_time:
+                batch_results = _load_batch_Rt_frame(batch_path, batch_modified_time)
+                if fips in batch_results.index:
+                    return batch_results.loc[[fips]].set_index("date")
+
+    if modified_time is not None:
+        return pd.read_json(path)
+    return None
+
+
+@lru_cache(maxsize=4)
+def _load_batch_Rt_frame(path, modified_time):
+    # modified_time is part of the key so a rewritten result file is read again.
+    return pd.read_parquet(path).set_index("fips")
+
+
+def load_state_batch_Rt_result(state_fips: str) -> Optional[pd.DataFrame]:
+    """
+    Load the batched county Rt results of a state, indexed by fips.
+
+    Parameters
+    ----------
+    state_fips: str
+        State fips code.
+
+    Returns
+    -------
+    results: pd.DataFrame
+        Results for all counties that were run, or None if the state was not run in batch mode.
+    """
+    path = pyseir.utils.get_run_artifact_path(
+        state_fips, pyseir.utils.RunArtifact.RT_INFERENCE_BATCH_RESULT
+    )
     if not os.path.exists(path):
         return None
-    return pd.read_json(path)
+    return _load_batch_Rt_frame(path, os.path.getmtime(path))
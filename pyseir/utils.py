@@ -2,6 +2,9 @@ import os
 import us
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
+from typing import Dict, Optional
+import pandas as pd
 from scipy import signal
 from covidactnow.datapublic.common_fields import CommonFields
 
@@ -38,6 +41,7 @@ class RunMode(Enum):
 
 class RunArtifact(Enum):
     RT_INFERENCE_RESULT = "rt_inference_result"
+    RT_INFERENCE_BATCH_RESULT = "rt_inference_batch_result"
     RT_INFERENCE_REPORT = "rt_inference_report"
     RT_SMOOTHING_REPORT = "rt_smoothing_report"
 
@@ -48,12 +52,36 @@ class RunArtifact(Enum):
     WHITELIST_RESULT = "whitelist_result"
 
     ENSEMBLE_RESULT = "ensemble_result"
+    ENSEMBLE_RESULT_ARRAYS = "ensemble_result_arrays"
 
     WEB_UI_RESULT = "web_ui_result"
 
     BACKTEST_RESULT = "backtest_result"
 
 
+@lru_cache(maxsize=None)
+def get_county_names() -> Dict[str, Optional[str]]:
+    """
+    Map every county FIPS in the latest US dataset to its county name.
+
+    Built once per process so resolving a county artifact path does not filter
+    the latest dataset.
+
+    Returns
+    -------
+    county_names: dict
+        County FIPS code -> county name, None where the dataset has no name.
+    """
+    data = combined_datasets.load_us_latest_dataset().data
+    counties = data.loc[data[CommonFields.FIPS].str.len() == 5].drop_duplicates(CommonFields.FIPS)
+    names = (
+        counties[CommonFields.COUNTY]
+        .astype(object)
+        .where(pd.notnull(counties[CommonFields.COUNTY]), None)
+    )
+    return dict(zip(counties[CommonFields.FIPS], names))
+
+
 def get_run_artifact_path(fips, artifact, output_dir=None) -> str:
     """
     Get an artifact path for a given locale and artifact type.
@@ -76,7 +104,7 @@ def get_run_artifact_path(fips, artifact, output_dir=None) -> str:
     state_obj = us.states.lookup(fips[:2])
     if len(fips) == 5:
         agg_level = AggregationLevel.COUNTY
-        county = combined_datasets.get_us_latest_for_fips(fips)[CommonFields.COUNTY]
+        county = get_county_names()[fips]
     elif len(fips) == 2:
         agg_level = AggregationLevel.STATE
     else:
@@ -131,6 +159,13 @@ def get_run_artifact_path(fips, artifact, output_dir=None) -> str:
                 f"Rt_results__{state_obj.name}__{fips}.json",
             )
 
+    elif artifact is RunArtifact.RT_INFERENCE_BATCH_RESULT:
+        path = os.path.join(
+            STATE_SUMMARY_FOLDER(output_dir),
+            "data",
+            f"Rt_results__{state_obj.name}_counties.parquet",
+        )
+
     elif artifact is RunArtifact.MLE_FIT_REPORT:
         if agg_level is AggregationLevel.COUNTY:
             path = os.path.join(
@@ -184,6 +219,19 @@ def get_run_artifact_path(fips, artifact, output_dir=None) -> str:
                 f"ensemble_projections__{state_obj.name}__{fips}.json",
             )
 
+    elif artifact is RunArtifact.ENSEMBLE_RESULT_ARRAYS:
+        if agg_level is AggregationLevel.COUNTY:
+            path = os.path.join(
+                DATA_FOLDER(output_dir, state_obj.name),
+                f"ensemble_projections__{state_obj.name}__{county}__{fips}.npz",
+            )
+        else:
+            path = os.path.join(
+                STATE_SUMMARY_FOLDER(output_dir),
+                "data",
+                f"ensemble_projections__{state_obj.name}__{fips}.npz",
+            )
+
     elif artifact is RunArtifact.WEB_UI_RESULT:
         path = os.path.join(WEB_UI_FOLDER(output_dir), f"{fips}.__INTERVENTION_IDX__.json")
 
@@ -1,10 +1,13 @@
 import logging
+from io import StringIO
+from unittest import mock
 import re
 
 import structlog
 
 from covidactnow.datapublic.common_fields import COMMON_FIELDS_TIMESERIES_KEYS
 from libs.datasets import combined_datasets, CommonFields
+from libs.datasets import dataset_utils
 from libs.datasets.combined_datasets import (
     _build_data_and_provenance,
     Override,
@@ -352,3 +355,101 @@ def test_make_latest_from_timeseries_dont_touch_county():
         "97123": {"m1": 2, "county": "Smith Countzz"},
         "97": {"m1": 3},
     }
+
+
+def test_build_timeseries_override_three_sources():
+    data_a = read_csv_and_index_fips_date(
+        "fips,date,m1,m2\n" "97111,2020-04-01,1,10\n" "97222,2020-04-01,,\n" "97333,2020-04-01,,\n"
+    )
+    data_b = read_csv_and_index_fips_date(
+        "fips,date,m1,m2\n" "97111,2020-04-02,2,\n" "97222,2020-04-02,,20\n"
+    )
+    data_c = read_csv_and_index_fips_date(
+        "fips,date,m1,m2\n" "97222,2020-04-01,3,\n" "97222,2020-04-02,,\n" "97333,2020-04-03,4,\n"
+    )
+    datasets = {"source_a": data_a, "source_b": data_b, "source_c": data_c}
+
+    combined, provenance = _build_data_and_provenance(
+        {"m1": ["source_a", "source_b", "source_c"], "m2": ["source_c", "source_a", "source_b"]},
+        datasets,
+        override=Override.BY_TIMESERIES,
+    )
+    # Each FIPS takes the whole timeseries from the highest priority source that has a value.
+    assert combined["m1"].replace({np.nan: None}).to_dict() == {
+        ("97111", pd.Timestamp("2020-04-01")): None,
+        ("97111", pd.Timestamp("2020-04-02")): 2,
+        ("97222", pd.Timestamp("2020-04-01")): 3,
+        ("97222", pd.Timestamp("2020-04-02")): None,
+        ("97333", pd.Timestamp("2020-04-01")): None,
+        ("97333", pd.Timestamp("2020-04-03")): 4,
+    }
+    assert provenance["m1"].dropna().to_dict() == {
+        ("97111", pd.Timestamp("2020-04-02")): "source_b",
+        ("97222", pd.Timestamp("2020-04-01")): "source_c",
+        ("97333", pd.Timestamp("2020-04-03")): "source_c",
+    }
+    assert provenance["m2"].dropna().to_dict() == {
+        ("97111", pd.Timestamp("2020-04-01")): "source_a",
+        ("97222", pd.Timestamp("2020-04-02")): "source_b",
+    }
+
+
+def test_align_fips_date_dataframes():
+    data_a = read_csv_and_index_fips_date(
+        "fips,date,m1,m2\n" "97222,2020-04-02,1,x\n" "97111,2020-04-03,2,\n"
+    ).astype({"m1": "Int64"})
+    data_b = read_csv_and_index_fips_date("fips,date,m1,m2\n" "97111,2020-04-01,3,y\n").astype(
+        {"m1": "Int64"}
+    )
+
+    new_index, aligned = combined_datasets._align_fips_date_dataframes(
+        {"source_a": data_a, "source_b": data_b}
+    )
+
+    expected_index = data_a.index.union(data_b.index)
+    assert new_index.tolist() == expected_index.tolist() == sorted(expected_index.tolist())
+    pd.testing.assert_frame_equal(aligned["source_a"], data_a.reindex(expected_index))
+    pd.testing.assert_frame_equal(aligned["source_b"], data_b.reindex(expected_index))
+    assert aligned["source_b"]["m1"].dtype == "Int64"
+
+
+def test_build_combined_dataset_from_cached_sources(tmp_path, monkeypatch):
+    public_data_path = tmp_path / "public"
+    nytimes_path = public_data_path / NYTimesDataset.DATA_PATH
+    nytimes_path.parent.mkdir(parents=True)
+    nytimes_path.write_text(
+        "fips,date,aggregate_level,country,state,cases,deaths\n"
+        "06075,2020-04-01,county,USA,CA,10,1\n"
+        "06075,2020-04-02,county,USA,CA,12,1\n"
+        "36061,2020-04-01,county,USA,NY,20,2\n"
+    )
+    monkeypatch.setattr(dataset_utils, "LOCAL_PUBLIC_DATA_PATH", public_data_path)
+    cache_dir = tmp_path / "cache"
+    feature_definition: FeatureDataSourceMap = {
+        CommonFields.CASES: [NYTimesDataset],
+        CommonFields.DEATHS: [NYTimesDataset],
+    }
+
+    def build_csv(name):
+        dataset = _build_combined_dataset_from_sources(
+            TimeseriesDataset, feature_definition, filter=US_STATES_FILTER, cache_dir=cache_dir
+        )
+        dataset.to_csv(tmp_path / name)
+        return (tmp_path / name).read_bytes()
+
+    uncached = build_csv("uncached.csv")
+    assert len(list(cache_dir.glob("TimeseriesDataset-NYTimes-*.pkl"))) == 1
+
+    # Unchanged sources are not loaded again and the output is identical.
+    with monkeypatch.context() as m:
+        m.setattr(NYTimesDataset, "local", mock.Mock(side_effect=AssertionError))
+        assert build_csv("cached.csv") == uncached
+
+    # A changed source file is loaded again and replaces the cached copy.
+    nytimes_path.write_text(
+        "fips,date,aggregate_level,country,state,cases,deaths\n"
+        "06075,2020-04-01,county,USA,CA,11,1\n"
+    )
+    changed = TimeseriesDataset.load_csv(StringIO(build_csv("changed.csv").decode()))
+    assert changed.get_data(None, fips="06075")[CommonFields.CASES].tolist() == [11]
+    assert len(list(cache_dir.glob("TimeseriesDataset-NYTimes-*.pkl"))) == 1
@@ -1,3 +1,7 @@
+import json
+
+import pytest
+
 from libs import dataset_deployer
 
 
@@ -9,3 +13,34 @@ def test_flatten_dict():
 
     expected = {"key1": 1, "key2.nested1": "a", "key2.nested2": "b"}
     assert results == expected
+
+
+def test_json_array_writer_replaces_file_on_close(tmp_path):
+    output_path = tmp_path / "items.json"
+    output_path.write_text("[1]")
+
+    with dataset_deployer.JsonArrayWriter(output_path) as writer:
+        writer.write_item("2")
+        writer.write_item("3")
+        assert output_path.read_text() == "[1]"
+
+    assert json.loads(output_path.read_text()) == [2, 3]
+    assert list(tmp_path.iterdir()) == [output_path]
+
+
+def test_writers_keep_previous_file_on_error(tmp_path):
+    json_path = tmp_path / "items.json"
+    json_path.write_text("[1]")
+    csv_path = tmp_path / "items.csv"
+    csv_path.write_text("a\n1\n")
+
+    with pytest.raises(ValueError):
+        with dataset_deployer.JsonArrayWriter(json_path) as json_writer:
+            with dataset_deployer.NestedCsvWriter(csv_path) as csv_writer:
+                json_writer.write_item("2")
+                csv_writer.write_row({"a": 2})
+                raise ValueError()
+
+    assert json_path.read_text() == "[1]"
+    assert csv_path.read_text() == "a\n1\n"
+    assert sorted(tmp_path.iterdir()) == [csv_path, json_path]
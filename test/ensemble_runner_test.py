@@ -0,0 +1,84 @@
+import io
+import json
+
+import numpy as np
+
+from pyseir.ensembles import ensemble_artifact
+from pyseir.ensembles.ensemble_runner import EnsembleRunner
+from pyseir.models.seir_model import SEIRModel, StackedSEIRModel
+
+
+def test_get_surge_window():
+    t_list = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+    value_stack = np.array([[0, 5, 7, 5, 0], [0, 1, 2, 1, 0], [9, 9, 0, 0, 9]])
+    capacity = [4, 4, 4]
+
+    surge_start, surge_end = EnsembleRunner._get_surge_window(value_stack, capacity, t_list)
+
+    np.testing.assert_array_equal(surge_start, [1.0, np.nan, 0.0])
+    np.testing.assert_array_equal(surge_end, [3.0, np.nan, 4.0])
+
+
+def test_generate_output_surge_start_and_end():
+    t_list = np.linspace(0, 120, 121)
+    models = [
+        SEIRModel(N=1e5, t_list=t_list, suppression_policy=lambda t: 0.8, R0=r0, beds_ICU=20)
+        for r0 in (2.5, 3.5)
+    ]
+    StackedSEIRModel(models).run()
+    runner = EnsembleRunner.__new__(EnsembleRunner)
+    runner.output_percentiles = (5, 50, 95)
+
+    outputs = runner._generate_output_for_suppression_policy(models)
+
+    for i, model in enumerate(models):
+        over_capacity_idx = np.flatnonzero(model.results["HICU"] > model.beds_ICU)
+        assert len(over_capacity_idx) > 1
+        # surge_start used to be overwritten with the end of the window.
+        assert outputs["HICU"]["surge_start"][i] == t_list[over_capacity_idx[0]]
+        assert outputs["HICU"]["surge_end"][i] == t_list[over_capacity_idx[-1]]
+        assert outputs["HICU"]["surge_start"][i] < outputs["HICU"]["surge_end"][i]
+
+
+def test_detect_peak_time_and_value():
+    runner = EnsembleRunner.__new__(EnsembleRunner)
+    runner.output_percentiles = (0, 50, 100)
+    t_list = [0.0, 1.0, 2.0, 3.0]
+    value_stack = np.array([[0, 5, 1, 0], [0, 1, 2, 8], [3, 0, 0, 0]])
+
+    peak_data = runner._detect_peak_time_and_value(value_stack, t_list)
+
+    assert peak_data["peak_value_ci0"] == 3
+    assert peak_data["peak_value_ci50"] == 5
+    assert peak_data["peak_value_ci100"] == 8
+    assert peak_data["peak_time_ci0"] == 0.0
+    assert peak_data["peak_time_ci50"] == 1.0
+    assert peak_data["peak_time_ci100"] == 3.0
+    assert peak_data["peak_value_mean"] == 16 / 3
+
+
+def test_ensemble_artifact_round_trip(tmp_path):
+    t_list = np.linspace(0, 60, 61)
+    models = [
+        SEIRModel(N=1e5, t_list=t_list, suppression_policy=lambda t: 0.8, R0=r0, beds_ICU=20)
+        for r0 in (2.5, 3.0, 3.5)
+    ]
+    StackedSEIRModel(models).run()
+    runner = EnsembleRunner.__new__(EnsembleRunner)
+    runner.output_percentiles = (5, 50, 95)
+    all_outputs = {
+        "county_metadata": {"state": "ID", "age_distribution": [1, 2]},
+        "suppression_policy__inferred": runner._generate_output_for_suppression_policy(models),
+    }
+
+    path = tmp_path / "ensemble.npz"
+    ensemble_artifact.save_ensemble_results(all_outputs, path)
+    loaded = ensemble_artifact.load_ensemble_results(path)
+
+    policy = loaded["suppression_policy__inferred"]
+    assert isinstance(policy["HICU"]["ci_50"], np.ndarray)
+    np.testing.assert_array_equal(policy["t_list"], t_list)
+    expected_json, loaded_json = io.StringIO(), io.StringIO()
+    ensemble_artifact.dump_ensemble_results_json(all_outputs, expected_json)
+    ensemble_artifact.dump_ensemble_results_json(loaded, loaded_json)
+    assert json.loads(loaded_json.getvalue()) == json.loads(expected_json.getvalue())
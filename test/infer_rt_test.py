@@ -1,13 +1,20 @@
+import os
 import pathlib
+from io import StringIO
+from unittest import mock
 
+import numpy as np
 import pytest
 import pandas as pd
 import structlog
 from matplotlib import pyplot as plt
 
+from libs.datasets import combined_datasets
+from libs.datasets.timeseries import TimeseriesDataset
 from pyseir.rt import utils
 from pyseir.rt import infer_rt
-from pyseir.utils import get_run_artifact_path, RunArtifact
+from pyseir.rt import infer_rt_batch
+from pyseir.utils import get_run_artifact_path, RunArtifact, TimeseriesType
 from test.mocks.inference import load_data
 from test.mocks.inference.load_data import RateChange
 
@@ -191,3 +198,155 @@ def test_smoothing_and_causality():
         ),
         "test_smoothing_and_causality",
     )
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "scale,ratechange1,ratechange2",
+    [
+        (1000.0, RateChange(0, 1.0), RateChange(80, 1.5)),
+        (100.0, RateChange(0, 1.5), RateChange(50, 0.7)),
+        (5.0, RateChange(0, 1.0), RateChange(70, 1.2)),
+    ],
+)
+def test_vectorized_posteriors_match_iterative(scale, ratechange1, ratechange2):
+    """The array posterior engine must reproduce the MAP and CI of the day-by-day loop."""
+    spec = load_data.DataSpec(
+        generator_type=load_data.DataGeneratorType.EXP,
+        disable_deaths=True,
+        scale=scale,
+        ratechange1=ratechange1,
+        ratechange2=ratechange2,
+    )
+    input_df = load_data.create_synthetic_df(load_data.DataGenerator(spec))
+    smoothed_df = infer_rt.filter_and_smooth_input_data(
+        df=input_df,
+        display_name="06",
+        include_deaths=False,
+        figure_collector={"skip_saving": None},
+        log=structlog.getLogger(),
+    )
+
+    results = {}
+    for vectorized in (False, True):
+        engine = infer_rt.RtInferenceEngine(data=smoothed_df, display_name="06", fips="06")
+        engine.vectorized_posteriors = vectorized
+        dates, posteriors, start_idx = engine.get_posteriors(TimeseriesType.NEW_CASES)
+        results[vectorized] = (engine, dates, posteriors, start_idx)
+
+    engine, dates, expected, start_idx = results[False]
+    _, vectorized_dates, posteriors, vectorized_start_idx = results[True]
+
+    assert start_idx == vectorized_start_idx
+    assert list(dates) == list(vectorized_dates)
+    np.testing.assert_allclose(posteriors.values, expected.values.astype(float), atol=1e-3)
+    pd.testing.assert_series_equal(posteriors.idxmax(), expected.idxmax())
+    for ci in engine.confidence_intervals:
+        np.testing.assert_array_equal(
+            engine.highest_density_interval(posteriors, ci=ci),
+            engine.highest_density_interval(expected, ci=ci),
+        )
+
+
+@pytest.mark.slow
+def test_batch_engine_matches_single_region_engine():
+    """Batched inference over staggered regions agrees with running each region on its own."""
+    specs = {
+        "01001": (1000.0, RateChange(0, 1.0), RateChange(80, 1.5)),
+        "01003": (100.0, RateChange(0, 1.5), RateChange(50, 0.7)),
+        "01005": (20.0, RateChange(0, 0.8), RateChange(40, 1.3)),
+    }
+    smoothed_cases = {}
+    expected = {}
+    for i, (fips, (scale, ratechange1, ratechange2)) in enumerate(specs.items()):
+        spec = load_data.DataSpec(
+            generator_type=load_data.DataGeneratorType.EXP,
+            disable_deaths=True,
+            scale=scale,
+            ratechange1=ratechange1,
+            ratechange2=ratechange2,
+        )
+        # Give each region a different date range so the batch has to handle padding.
+        input_df = load_data.create_synthetic_df(load_data.DataGenerator(spec))
+        input_df = input_df.iloc[5 * i : len(input_df) - 3 * i].copy()
+        smoothed_df = infer_rt.filter_and_smooth_input_data(
+            df=input_df,
+            display_name="01",
+            include_deaths=False,
+            figure_collector={"skip_saving": None},
+            log=structlog.getLogger(),
+        )
+        smoothed_cases[fips] = smoothed_df["cases"]
+        engine = infer_rt.RtInferenceEngine(
+            data=smoothed_df, display_name=fips, fips=fips, figure_collector={}
+        )
+        expected[fips] = engine.infer_all(plot=False)
+
+    engine = infer_rt_batch.BatchRtInferenceEngine(
+        data=pd.DataFrame(smoothed_cases), display_name="01"
+    )
+    results = engine.infer_all()
+
+    assert set(results["fips"]) == set(specs)
+    for fips, expected_df in expected.items():
+        result_df = results.loc[results["fips"] == fips].set_index("date")
+        assert list(result_df.index) == list(expected_df.index)
+        # Batched inference rounds sigma more coarsely, allow one R bucket of difference.
+        for column in expected_df.columns:
+            np.testing.assert_allclose(
+                result_df[column].values, expected_df[column].values, atol=0.02 + 1e-9
+            )
+
+
+def test_load_fips_rt_result_uses_most_recent_source(tmp_path, monkeypatch):
+    artifact_paths = {
+        RunArtifact.RT_INFERENCE_RESULT: tmp_path / "Rt_results__01001.json",
+        RunArtifact.RT_INFERENCE_BATCH_RESULT: tmp_path / "Rt_results__01_counties.parquet",
+    }
+    monkeypatch.setattr(
+        utils.pyseir.utils,
+        "get_run_artifact_path",
+        lambda fips, artifact: str(artifact_paths[artifact]),
+    )
+    dates = pd.date_range("2020-08-01", periods=3)
+    json_path = artifact_paths[RunArtifact.RT_INFERENCE_RESULT]
+    batch_path = artifact_paths[RunArtifact.RT_INFERENCE_BATCH_RESULT]
+
+    def write_batch(value, modified_time):
+        batch_df = pd.DataFrame({"fips": "01001", "date": dates, "Rt_MAP__new_cases": value})
+        batch_df.to_parquet(batch_path, index=False)
+        os.utime(batch_path, (modified_time, modified_time))
+
+    # A state looked up before its batch results exist.
+    assert utils.load_state_batch_Rt_result("01") is None
+
+    pd.DataFrame({"Rt_MAP__new_cases": [1.0] * 3}, index=dates).to_json(json_path)
+    os.utime(json_path, (1000, 1000))
+    write_batch(2.0, 2000)
+    assert utils.load_fips_Rt_result("01001")["Rt_MAP__new_cases"].tolist() == [2.0] * 3
+    assert utils.load_state_batch_Rt_result("01") is not None
+
+    # A rewritten batch file is read again.
+    write_batch(3.0, 3000)
+    assert utils.load_fips_Rt_result("01001")["Rt_MAP__new_cases"].tolist() == [3.0] * 3
+
+    # A per-county result written after the batch file wins.
+    os.utime(json_path, (4000, 4000))
+    assert utils.load_fips_Rt_result("01001")["Rt_MAP__new_cases"].tolist() == [1.0] * 3
+
+
+@pytest.mark.parametrize("county_fips", [[], ["01001"], ["01003"]])
+def test_batch_rt_skips_states_without_county_data(county_fips):
+    # 01001 has no case or death data, 01003 has no rows.
+    timeseries = TimeseriesDataset.load_csv(
+        StringIO(
+            "fips,date,aggregate_level,country,state,county,cases,deaths\n"
+            "01001,2020-03-01,county,USA,AL,Autauga County,,\n"
+            "01001,2020-03-02,county,USA,AL,Autauga County,,\n"
+            "01,2020-03-01,state,USA,AL,,10,1\n"
+        )
+    )
+    with mock.patch.object(
+        combined_datasets, "load_us_timeseries_dataset", return_value=timeseries
+    ):
+        assert infer_rt_batch.run_rt_for_state_counties("AL", county_fips) is None
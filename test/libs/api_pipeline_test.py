@@ -1,14 +1,26 @@
 import datetime
 import pathlib
 import tempfile
+from io import StringIO
+from unittest import mock
 import pytest
 from libs.functions import generate_api
+from libs.functions import get_can_projection
 from libs.pipelines import api_pipeline
 from libs.datasets import combined_datasets
+from libs.datasets.latest_values_dataset import LatestValuesDataset
+from libs.datasets.timeseries import TimeseriesDataset
 from libs.datasets.sources.can_pyseir_location_output import CANPyseirLocationOutput
 from libs.enums import Intervention
+from libs.datasets.dataset_utils import AggregationLevel
 from api.can_api_definition import RegionSummary
+from api.can_api_definition import RegionSummaryWithTimeseries
+from api.can_api_definition import AggregateRegionSummary
+from api.can_api_definition import AggregateRegionSummaryWithTimeseries
 from api.can_api_definition import Actuals
+from api.can_api_definition import ActualsTimeseriesRow
+from api.can_api_definition import PredictionTimeseriesRow
+from api.can_api_definition import ResourceUtilization
 from api.can_api_definition import Projections
 from api.can_api_definition import ResourceUsageProjection
 
@@ -77,3 +89,166 @@ def test_build_api_output_for_intervention(nyc_fips, nyc_model_output_path, tmp_
         str(path.relative_to(tmp_path)) for path in tmp_path.glob("**/*") if not path.is_dir()
     ]
     assert sorted(output_paths) == sorted(expected_outputs)
+
+
+def _region_timeseries(fips, state_name, county_name, num_days) -> RegionSummaryWithTimeseries:
+    actuals = Actuals(
+        population=1000,
+        intervention="STRONG_INTERVENTION",
+        cumulativeConfirmedCases=10,
+        cumulativePositiveTests=None,
+        cumulativeNegativeTests=None,
+        cumulativeDeaths=1,
+        hospitalBeds=ResourceUtilization(
+            capacity=5,
+            totalCapacity=20,
+            currentUsageCovid=None,
+            currentUsageTotal=None,
+            typicalUsageRate=0.4,
+        ),
+        ICUBeds=None,
+    )
+    start = datetime.date(2020, 4, 1)
+    timeseries = [
+        PredictionTimeseriesRow(
+            date=start + datetime.timedelta(days=i),
+            hospitalBedsRequired=i,
+            hospitalBedCapacity=20,
+            ICUBedsInUse=0,
+            ICUBedCapacity=4,
+            ventilatorsInUse=0,
+            ventilatorCapacity=2,
+            RtIndicator=1.1 + i / 3,
+            RtIndicatorCI90=float("nan") if i == 1 else 0.2,
+            cumulativeDeaths=i,
+            cumulativeInfected=None,
+            currentInfected=i * 7,
+            currentSusceptible=None,
+            currentExposed=None,
+        )
+        for i in range(num_days)
+    ]
+    actuals_timeseries = [
+        ActualsTimeseriesRow(date=start, **actuals.dict()),
+    ]
+    return RegionSummaryWithTimeseries(
+        fips=fips,
+        lat=None,
+        long=-122.5,
+        stateName=state_name,
+        countyName=county_name,
+        lastUpdatedDate=start,
+        projections=None,
+        actuals=actuals,
+        population=1000,
+        timeseries=timeseries,
+        actualsTimeseries=actuals_timeseries,
+    )
+
+
+def test_deploy_all_levels_matches_bulk_models(tmp_path):
+    intervention = Intervention.STRONG_INTERVENTION
+    all_timeseries = [
+        _region_timeseries("06", "California", None, 3),
+        _region_timeseries("06075", "California", "San Francisco County", 2),
+        _region_timeseries("36", "New York", None, 0),
+        _region_timeseries("36061", "New York", "New York County", 4),
+    ]
+
+    # Outputs as written from models holding all regions.
+    expected_folder = tmp_path / "expected"
+    for level in [AggregationLevel.COUNTY, AggregationLevel.STATE]:
+        level_timeseries = [region for region in all_timeseries if region.aggregate_level is level]
+        bulk_timeseries = AggregateRegionSummaryWithTimeseries(__root__=level_timeseries)
+        bulk_summaries = AggregateRegionSummary(
+            __root__=[region.region_summary for region in level_timeseries]
+        )
+        flattened = generate_api.generate_bulk_flattened_timeseries(bulk_timeseries)
+        api_pipeline.deploy_json_api_output(intervention, bulk_timeseries, expected_folder)
+        api_pipeline.deploy_csv_api_output(intervention, flattened, expected_folder)
+        api_pipeline.deploy_json_api_output(intervention, bulk_summaries, expected_folder)
+        api_pipeline.deploy_csv_api_output(intervention, bulk_summaries, expected_folder)
+
+    summary_folder = tmp_path / "summary"
+    api_pipeline.deploy_all_levels(
+        intervention, iter(all_timeseries), summary_folder, tmp_path / "regions"
+    )
+
+    expected_files = sorted(path.name for path in expected_folder.iterdir())
+    assert sorted(path.name for path in summary_folder.iterdir()) == expected_files
+    assert len(expected_files) == 8
+    for name in expected_files:
+        assert (summary_folder / name).read_bytes() == (expected_folder / name).read_bytes()
+    assert len(list((tmp_path / "regions").iterdir())) == 8
+
+
+def test_failed_deploy_keeps_previous_bulk_files(tmp_path):
+    intervention = Intervention.STRONG_INTERVENTION
+    summary_folder = tmp_path / "summary"
+    api_pipeline.deploy_all_levels(
+        intervention,
+        iter([_region_timeseries("06075", "California", "San Francisco County", 2)]),
+        summary_folder,
+        tmp_path / "regions",
+    )
+    previous_files = {path.name: path.read_bytes() for path in summary_folder.iterdir()}
+
+    def failing_timeseries():
+        yield _region_timeseries("36061", "New York", "New York County", 4)
+        raise ValueError("Failed to build region")
+
+    with pytest.raises(ValueError):
+        api_pipeline.deploy_all_levels(
+            intervention, failing_timeseries(), summary_folder, tmp_path / "regions"
+        )
+
+    assert {path.name: path.read_bytes() for path in summary_folder.iterdir()} == previous_files
+
+
+def test_build_timeseries_for_fips_interventions(nyc_model_output_path, nyc_fips):
+    us_latest = LatestValuesDataset.load_csv(
+        StringIO(
+            "fips,state,county,aggregate_level,country,population,cases,deaths\n"
+            "36061,NY,New York County,county,USA,1628706,30000,2000\n"
+        )
+    )
+    us_timeseries = TimeseriesDataset.load_csv(
+        StringIO(
+            "fips,date,state,county,aggregate_level,country,cases,deaths\n"
+            "36061,2020-04-01,NY,New York County,county,USA,100,3\n"
+            "36061,2020-04-02,NY,New York County,county,USA,120,\n"
+        )
+    )
+    interventions = list(Intervention)
+
+    with mock.patch.object(
+        get_can_projection, "get_interventions", return_value={"NY": "shelter_in_place"}
+    ), mock.patch.object(
+        generate_api,
+        "generate_actuals_timeseries",
+        side_effect=generate_api.generate_actuals_timeseries,
+    ) as generate_actuals:
+        results = api_pipeline.build_timeseries_for_fips_interventions(
+            interventions, us_latest, us_timeseries, nyc_model_output_path.parent, nyc_fips
+        )
+        assert generate_actuals.call_count == 1
+
+        # Same results as building each intervention separately.
+        for intervention in interventions:
+            timeseries = api_pipeline.build_timeseries_for_fips(
+                intervention, us_latest, us_timeseries, nyc_model_output_path.parent, nyc_fips
+            )
+            if timeseries:
+                assert results[intervention].json() == timeseries.json()
+            else:
+                assert intervention not in results
+
+    # Only the strong intervention model output exists, it is also the one selected for NY.
+    assert sorted(results, key=lambda i: i.value) == [
+        Intervention.STRONG_INTERVENTION,
+        Intervention.OBSERVED_INTERVENTION,
+        Intervention.SELECTED_INTERVENTION,
+    ]
+    assert len(results[Intervention.OBSERVED_INTERVENTION].actualsTimeseries) == 2
+    assert not results[Intervention.OBSERVED_INTERVENTION].timeseries
+    assert results[Intervention.SELECTED_INTERVENTION].timeseries
@@ -1,6 +1,20 @@
+import datetime
+import json
+import pathlib
+
 import pydantic
+import pytest
 import numpy as np
+from api.can_api_definition import Actuals
+from api.can_api_definition import ActualsTimeseriesRow
+from api.can_api_definition import AggregateRegionSummaryWithTimeseries
+from api.can_api_definition import PredictionTimeseriesRow
+from api.can_api_definition import Projections
+from api.can_api_definition import RegionSummaryWithTimeseries
+from api.can_api_definition import ResourceUsageProjection
+from api.can_api_definition import ResourceUtilization
 from libs import base_model
+from libs.enums import Intervention
 
 
 def test_custom_model_nans_serialize_properly():
@@ -14,3 +28,92 @@ def test_custom_model_nans_serialize_properly():
     data = OuterClass(val=np.nan, inner=InnerClass(val=np.nan))
     expected = '{"val": null, "inner": {"val": null}}'
     assert data.json() == expected
+
+
+GOLDEN_PATH = pathlib.Path(__file__).parent.parent / "data" / "api" / "region_summary.json"
+
+
+def _build_region_summaries() -> AggregateRegionSummaryWithTimeseries:
+    actuals = Actuals(
+        population=218195,
+        intervention=Intervention.OBSERVED_INTERVENTION.name,
+        cumulativeConfirmedCases=4821,
+        cumulativePositiveTests=None,
+        cumulativeNegativeTests=70123,
+        cumulativeDeaths=41,
+        hospitalBeds=ResourceUtilization(
+            capacity=101,
+            totalCapacity=300,
+            currentUsageCovid=7,
+            currentUsageTotal=None,
+            typicalUsageRate=np.nan,
+        ),
+        ICUBeds=None,
+        contactTracers=12,
+    )
+    start = datetime.date(2020, 3, 30)
+    prediction_rows = [
+        PredictionTimeseriesRow(
+            date=start + datetime.timedelta(days=i),
+            hospitalBedsRequired=10 * i,
+            hospitalBedCapacity=300,
+            ICUBedsInUse=i,
+            ICUBedCapacity=40,
+            ventilatorsInUse=0,
+            ventilatorCapacity=15,
+            RtIndicator=[1.2, 0.9999999999999999, np.nan][i],
+            RtIndicatorCI90=[0.1, 1e-07, np.inf][i],
+            cumulativeDeaths=i,
+            cumulativeInfected=None,
+            currentInfected=1234567890123,
+            currentSusceptible=None,
+            currentExposed=5,
+        )
+        for i in range(3)
+    ]
+    actuals_rows = [
+        ActualsTimeseriesRow(date=start + datetime.timedelta(days=i), **actuals.dict())
+        for i in range(2)
+    ]
+    region = RegionSummaryWithTimeseries(
+        fips="35013",
+        lat=32.3,
+        long=-106.8,
+        stateName="New Mexico",
+        countyName='Doña Ana County "DA"',
+        lastUpdatedDate=datetime.datetime(2020, 8, 10, 15, 30),
+        projections=Projections(
+            totalHospitalBeds=ResourceUsageProjection(
+                peakShortfall=0, peakDate=start, shortageStartDate=None
+            ),
+            ICUBeds=None,
+            Rt=1.05,
+            RtCI90=0.15,
+        ),
+        actuals=actuals,
+        population=218195,
+        timeseries=prediction_rows,
+        actualsTimeseries=actuals_rows,
+    )
+    return AggregateRegionSummaryWithTimeseries(__root__=[region, region.copy()])
+
+
+@pytest.mark.parametrize("backend", [None] + list(base_model.JSON_BACKENDS))
+def test_json_backends_match_golden_file(backend):
+    summaries = _build_region_summaries()
+    try:
+        base_model.set_json_backend(backend)
+        output = summaries.json()
+    finally:
+        base_model.set_json_backend(base_model.DEFAULT_JSON_BACKEND)
+
+    # To update the golden file after an intentional change of the API output, write the
+    # output of the pydantic implementation (backend None) to GOLDEN_PATH.
+    assert output.encode() == GOLDEN_PATH.read_bytes()
+
+
+def test_json_with_arguments_uses_pydantic():
+    summaries = _build_region_summaries()
+    region = summaries.__root__[0]
+    assert json.loads(region.json(include={"fips"})) == {"fips": "35013"}
+    assert region.json(indent=2) == pydantic.BaseModel.json(region, indent=2)
@@ -0,0 +1,131 @@
+import datetime
+import pathlib
+from io import StringIO
+from unittest import mock
+
+import git
+import pandas as pd
+
+from libs import git_lfs_object_helpers
+from libs.datasets import dataset_pointer
+from libs.datasets import dataset_utils
+from libs.datasets.dataset_pointer import DatasetPointer
+from libs.datasets.dataset_utils import DatasetType
+from libs.datasets.latest_values_dataset import LatestValuesDataset
+from libs.datasets.timeseries import TimeseriesDataset
+from libs.github_utils import GitSummary
+
+
+def _make_pointer(dataset_type: DatasetType, path: pathlib.Path) -> DatasetPointer:
+    git_info = GitSummary(sha="abc", branch="master", is_dirty=False)
+    return DatasetPointer(
+        dataset_type=dataset_type,
+        path=path,
+        data_git_info=git_info,
+        model_git_info=git_info,
+        updated_at=datetime.datetime(2020, 8, 10),
+    )
+
+
+def _timeseries_dataset():
+    return TimeseriesDataset.load_csv(
+        StringIO(
+            "fips,date,aggregate_level,country,state,county,cases,deaths\n"
+            "06075,2020-03-02,county,USA,CA,San Francisco County,3,\n"
+            "06075,2020-03-01,county,USA,CA,San Francisco County,1.5,\n"
+            "06,2020-03-01,state,USA,CA,,10,1\n"
+        )
+    )
+
+
+def test_save_and_load_timeseries_cache(tmp_path):
+    csv_path = tmp_path / "timeseries.csv"
+    pointer = _make_pointer(DatasetType.TIMESERIES, csv_path)
+    pointer.save_dataset(_timeseries_dataset())
+
+    cache_path = dataset_pointer.form_cache_path(csv_path, dataset_pointer.content_hash(csv_path))
+    assert cache_path.exists()
+    assert pd.read_parquet(cache_path)["fips"].dtype == "category"
+
+    from_cache = pointer.load_dataset()
+    from_csv = TimeseriesDataset.load_csv(csv_path)
+    pd.testing.assert_frame_equal(from_cache.data, from_csv.data)
+    assert from_cache.data["fips"].dtype == object
+    assert pd.api.types.is_datetime64_any_dtype(from_cache.data["date"])
+
+
+def test_load_rewrites_stale_cache(tmp_path):
+    csv_path = tmp_path / "latest.csv"
+    pointer = _make_pointer(DatasetType.LATEST, csv_path)
+    pointer.save_dataset(LatestValuesDataset(_timeseries_dataset().latest_values()))
+    first_cache = list(tmp_path.glob("latest.*.parquet"))
+    assert len(first_cache) == 1
+
+    # Changing the CSV makes the cached copy stale. Loading falls back to the CSV and replaces
+    # the cached copy.
+    csv_path.write_text("fips,state,county,aggregate_level,country,cases\n06,CA,,state,USA,12\n")
+    loaded = pointer.load_dataset()
+    assert loaded.data["cases"].tolist() == [12]
+    cache_paths = list(tmp_path.glob("latest.*.parquet"))
+    assert len(cache_paths) == 1
+    assert cache_paths != first_cache
+    pd.testing.assert_frame_equal(
+        LatestValuesDataset.load_parquet(cache_paths[0]).data, loaded.data
+    )
+
+
+def test_failed_cache_write_leaves_no_partial_copy(tmp_path):
+    csv_path = tmp_path / "timeseries.csv"
+    pointer = _make_pointer(DatasetType.TIMESERIES, csv_path)
+
+    def write_partial_copy(self, path):
+        pathlib.Path(path).write_bytes(b"PAR1")
+        raise OSError("No space left on device")
+
+    with mock.patch.object(TimeseriesDataset, "to_parquet", write_partial_copy):
+        pointer.save_dataset(_timeseries_dataset())
+
+    assert list(tmp_path.iterdir()) == [csv_path]
+    pd.testing.assert_frame_equal(
+        pointer.load_dataset().data, TimeseriesDataset.load_csv(csv_path).data
+    )
+
+
+def test_write_cache_ignores_copies_removed_concurrently(tmp_path):
+    csv_path = tmp_path / "timeseries.csv"
+    pointer = _make_pointer(DatasetType.TIMESERIES, csv_path)
+    pointer.save_dataset(_timeseries_dataset())
+    removed_path = tmp_path / "timeseries.0000000000000000.parquet"
+
+    # Another process removes the stale copy between listing and removing it.
+    real_glob = pathlib.Path.glob
+    with mock.patch.object(
+        pathlib.Path, "glob", lambda self, pattern: [*real_glob(self, pattern), removed_path]
+    ):
+        cache_path = pointer._write_cache(csv_path, _timeseries_dataset())
+
+    assert cache_path.exists()
+
+
+def test_load_dataset_from_history_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(git_lfs_object_helpers, "CACHE_DIRECTORY", tmp_path / "history_cache")
+    repo = git.Repo.init(tmp_path / "repo")
+    monkeypatch.setattr(dataset_utils, "REPO_ROOT", tmp_path / "repo")
+    csv_path = tmp_path / "repo" / "timeseries.csv"
+    pointer = _make_pointer(DatasetType.TIMESERIES, csv_path)
+    pointer.save_dataset(_timeseries_dataset())
+    repo.index.add([str(csv_path)])
+    commit = repo.index.commit("Update timeseries")
+
+    # Without LFS pointers `git lfs smudge` outputs its input unchanged.
+    with mock.patch("subprocess.check_output", side_effect=lambda args, input: input) as smudge:
+        from_git = pointer.load_dataset(commit=commit.hexsha)
+        from_cache = pointer.load_dataset(commit=commit.hexsha)
+    assert smudge.call_count == 1
+
+    blob = commit.tree / csv_path.name
+    assert list(git_lfs_object_helpers.CACHE_DIRECTORY.iterdir()) == [
+        git_lfs_object_helpers.CACHE_DIRECTORY / f"timeseries.{blob.hexsha}.parquet"
+    ]
+    pd.testing.assert_frame_equal(from_git.data, TimeseriesDataset.load_csv(csv_path).data)
+    pd.testing.assert_frame_equal(from_cache.data, from_git.data)
@@ -0,0 +1,87 @@
+import datetime
+import pathlib
+from unittest import mock
+
+import git
+import pytest
+
+from libs import git_lfs_object_helpers
+
+
+def _commit_file(repo: git.Repo, path: pathlib.Path, text: str, date: str) -> git.Commit:
+    path.write_text(text)
+    repo.index.add([str(path)])
+    # Dates in git's internal format, seconds since the epoch and timezone offset.
+    git_date = f"{int(datetime.datetime.fromisoformat(date).timestamp())} +0000"
+    return repo.index.commit(f"Update {path.name}", author_date=git_date, commit_date=git_date)
+
+
+@pytest.fixture
+def history_repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(git_lfs_object_helpers, "CACHE_DIRECTORY", tmp_path / "history_cache")
+    git_lfs_object_helpers._load_commit_index.cache_clear()
+    repo = git.Repo.init(tmp_path / "repo")
+    path = tmp_path / "repo" / "data.csv"
+    commits = [
+        _commit_file(repo, path, "a\n1\n", "2020-08-01T12:00:00+00:00"),
+        _commit_file(repo, path, "a\n2\n", "2020-08-03T12:00:00+00:00"),
+        # Committed with an earlier date than its parent.
+        _commit_file(repo, path, "a\n3\n", "2020-08-02T12:00:00+00:00"),
+        _commit_file(repo, path, "a\n4\n", "2020-08-05T12:00:00+00:00"),
+    ]
+    yield repo, path, commits
+    git_lfs_object_helpers._load_commit_index.cache_clear()
+
+
+def _find_commit_by_walking_history(repo, path, before):
+    for commit in repo.iter_commits(paths=path):
+        if commit.committed_datetime < before:
+            return commit
+
+
+def test_find_commit_matches_history_walk(history_repo):
+    repo, path, commits = history_repo
+    assert git_lfs_object_helpers.find_commit(repo, path) == commits[3]
+    assert git_lfs_object_helpers.find_commit(repo, path, previous_commit=True) == commits[2]
+
+    for before in [
+        "2020-07-01T00:00:00+00:00",
+        "2020-08-01T12:00:00+00:00",
+        "2020-08-02T00:00:00+00:00",
+        "2020-08-02T13:00:00+00:00",
+        "2020-08-04T00:00:00+00:00",
+        "2020-09-01T00:00:00+00:00",
+    ]:
+        expected = _find_commit_by_walking_history(
+            repo, path, datetime.datetime.fromisoformat(before)
+        )
+        assert git_lfs_object_helpers.find_commit(repo, path, before=before) == expected
+
+
+def test_commit_index_stored_by_head(history_repo):
+    repo, path, commits = history_repo
+    git_lfs_object_helpers.get_commit_index(repo, path)
+    index_files = list(git_lfs_object_helpers.CACHE_DIRECTORY.glob("commits.*.json"))
+    assert len(index_files) == 1
+    assert commits[3].hexsha in index_files[0].name
+
+    # A new index is built, replacing the stored one, after HEAD moves.
+    new_commit = _commit_file(repo, path, "a\n5\n", "2020-08-06T12:00:00+00:00")
+    assert git_lfs_object_helpers.find_commit(repo, path) == new_commit
+    index_files = list(git_lfs_object_helpers.CACHE_DIRECTORY.glob("commits.*.json"))
+    assert len(index_files) == 1
+    assert new_commit.hexsha in index_files[0].name
+
+    # The stored index is read back without walking the history again.
+    git_lfs_object_helpers._load_commit_index.cache_clear()
+    with mock.patch.object(git_lfs_object_helpers.CommitIndex, "build") as build:
+        assert git_lfs_object_helpers.find_commit(repo, path, previous_commit=True) == commits[3]
+    build.assert_not_called()
+
+
+def test_get_data_for_path(history_repo):
+    repo, path, commits = history_repo
+    # Without LFS pointers `git lfs smudge` outputs its input unchanged.
+    with mock.patch("subprocess.check_output", side_effect=lambda args, input: input):
+        data = git_lfs_object_helpers.get_data_for_path(path, repo=repo, commit=commits[1].hexsha)
+    assert data == b"a\n2\n"
@@ -0,0 +1,57 @@
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from libs import output_sink
+
+
+def test_directory_sink_writes_nested_files(tmp_path):
+    with output_sink.DirectorySink(tmp_path / "out", max_workers=2, max_pending=2) as sink:
+        for i in range(10):
+            sink.write(f"level{i % 3}/region{i}.json", f'{{"i": {i}}}')
+        sink.write("raw.bin", b"\x00\x01")
+
+    assert (tmp_path / "out" / "level1" / "region4.json").read_text() == '{"i": 4}'
+    assert len(list((tmp_path / "out").glob("level*/*.json"))) == 10
+    assert (tmp_path / "out" / "raw.bin").read_bytes() == b"\x00\x01"
+
+
+def test_directory_sink_raises_write_errors_on_close(tmp_path):
+    (tmp_path / "out").mkdir()
+    # A file where the sink expects a directory.
+    (tmp_path / "out" / "level").write_text("")
+
+    sink = output_sink.DirectorySink(tmp_path / "out")
+    sink.write("level/region.json", "{}")
+    with pytest.raises(OSError):
+        sink.close()
+
+
+def test_tar_archive_sink_index(tmp_path):
+    path = tmp_path / "regions.tar"
+    files = {"a.json": "{}", "b/c.json": '{"x": ' + "1" * 1000 + "}", "d.json": ""}
+    with output_sink.ArchiveSink(path) as sink:
+        for name, text in files.items():
+            sink.write(name, text)
+
+    with tarfile.open(path) as tar:
+        index = json.load(tar.extractfile(output_sink.TAR_INDEX_NAME))["members"]
+        assert set(tar.getnames()) == set(files) | {output_sink.TAR_INDEX_NAME}
+
+    assert set(index) == set(files)
+    data = path.read_bytes()
+    for name, text in files.items():
+        member = index[name]
+        assert data[member["offset"] : member["offset"] + member["size"]] == text.encode()
+
+
+def test_zip_archive_sink(tmp_path):
+    path = tmp_path / "regions.zip"
+    with output_sink.ArchiveSink(path, compress=True) as sink:
+        sink.write("b/c.json", '{"x": 1}')
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ["b/c.json"]
+        assert archive.read("b/c.json") == b'{"x": 1}'
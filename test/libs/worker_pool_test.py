@@ -0,0 +1,59 @@
+import inspect
+import multiprocessing.pool
+import os
+
+import pytest
+
+from libs import worker_pool
+from libs.worker_pool import WorkerPool
+
+_initialized_value = None
+
+
+def _init_worker(value):
+    global _initialized_value
+    _initialized_value = value
+
+
+def _task(x):
+    return x * _initialized_value, os.getpid()
+
+
+def test_workers_reused_under_memory_limit():
+    with WorkerPool(2, initializer=_init_worker, initargs=(3,), memory_limit=2 ** 50) as pool:
+        results = pool.map(_task, range(20), chunksize=1)
+
+    assert [value for value, _ in results] == [x * 3 for x in range(20)]
+    assert len({pid for _, pid in results}) <= 2
+
+
+def test_workers_replaced_over_memory_limit():
+    with WorkerPool(2, initializer=_init_worker, initargs=(3,), memory_limit=0) as pool:
+        results = pool.map(_task, range(6), chunksize=1)
+
+    # Replacement workers run the initializer too.
+    assert [value for value, _ in results] == [x * 3 for x in range(6)]
+    assert len({pid for _, pid in results}) == 6
+
+
+def test_task_errors_are_raised():
+    with WorkerPool(2) as pool:
+        with pytest.raises(ValueError):
+            pool.map(int, ["1", "x"])
+
+
+def test_get_worker_memory_bytes():
+    assert worker_pool.get_worker_memory_bytes() > 0
+
+
+def test_pool_worker_signature():
+    # WorkerPool.Process starts workers with the arguments of multiprocessing.pool.worker.
+    parameters = inspect.signature(multiprocessing.pool.worker).parameters
+    assert list(parameters) == [
+        "inqueue",
+        "outqueue",
+        "initializer",
+        "initargs",
+        "maxtasks",
+        "wrap_exception",
+    ]
@@ -0,0 +1,88 @@
+import pickle
+from datetime import datetime
+
+import pytest
+
+from pyseir.inference import model_fitter
+from pyseir.inference.model_fitter import ModelFitter, ObjectiveCache
+
+
+def test_objective_cache_rounds_keys_and_counts():
+    cache = ObjectiveCache(maxsize=2, significant_digits=6)
+    key = cache.make_key([3.4, 0.30000000001])
+
+    assert cache.get(key) is None
+    cache.put(key, {"score": 1.0})
+    assert cache.get(cache.make_key([3.4, 0.3])) == {"score": 1.0}
+    assert cache.get(cache.make_key([3.4, 0.31])) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_objective_cache_evicts_least_recently_used():
+    cache = ObjectiveCache(maxsize=2)
+    cache.put((1.0,), "a")
+    cache.put((2.0,), "b")
+    cache.get((1.0,))
+    cache.put((3.0,), "c")
+
+    assert len(cache) == 2
+    assert cache.get((2.0,)) is None
+    assert cache.get((1.0,)) == "a"
+
+    # Entries are dropped when fitters are sent back from worker processes.
+    restored = pickle.loads(pickle.dumps(cache))
+    assert len(restored) == 0
+    assert restored.hits == cache.hits
+
+
+def _build_fitter_for_warm_start(prior_result, monkeypatch):
+    fitter = ModelFitter.__new__(ModelFitter)
+    fitter.fips = "06"
+    fitter.ref_date = datetime(year=2020, month=1, day=1)
+    fitter.fit_params = dict(ModelFitter.DEFAULT_FIT_PARAMS)
+    fitter.fit_params["fix_hosp_fraction"] = True
+
+    def load_prior(fips):
+        if prior_result is None:
+            raise FileNotFoundError(fips)
+        return prior_result
+
+    monkeypatch.setattr(model_fitter, "load_inference_result", load_prior)
+    return fitter
+
+
+def test_warm_start_seeds_values_steps_and_limits(monkeypatch):
+    t_today = (datetime.today() - datetime(year=2020, month=1, day=1)).days
+    prior_result = dict(
+        R0=3.0,
+        R0_error=0.01,
+        eps=0.5,
+        eps_error=float("nan"),
+        hosp_fraction=0.5,
+        hosp_fraction_error=0.1,
+        t0=90,
+        t0_error=1.0,
+        t_today=t_today - 1,
+    )
+    fitter = _build_fitter_for_warm_start(prior_result, monkeypatch)
+
+    assert fitter.apply_warm_start()
+    assert fitter.fit_params["R0"] == 3.0
+    assert fitter.fit_params["error_R0"] == 0.01
+    assert fitter.fit_params["limit_R0"] == pytest.approx([2.9, 3.1])
+    # Non-finite errors, fixed parameters and values outside the limits are not used.
+    assert fitter.fit_params["eps"] == ModelFitter.DEFAULT_FIT_PARAMS["eps"]
+    assert fitter.fit_params["hosp_fraction"] == ModelFitter.DEFAULT_FIT_PARAMS["hosp_fraction"]
+    assert fitter.fit_params["t0"] == ModelFitter.DEFAULT_FIT_PARAMS["t0"]
+
+
+@pytest.mark.parametrize("prior_age_days", [None, ModelFitter.WARM_START_MAX_AGE_DAYS + 1])
+def test_warm_start_falls_back_on_missing_or_stale_results(monkeypatch, prior_age_days):
+    prior_result = None
+    if prior_age_days is not None:
+        t_today = (datetime.today() - datetime(year=2020, month=1, day=1)).days
+        prior_result = dict(R0=3.0, R0_error=0.01, t_today=t_today - prior_age_days)
+    fitter = _build_fitter_for_warm_start(prior_result, monkeypatch)
+
+    assert not fitter.apply_warm_start()
+    assert fitter.fit_params == dict(ModelFitter.DEFAULT_FIT_PARAMS, fix_hosp_fraction=True)
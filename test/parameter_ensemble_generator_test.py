@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from covidactnow.datapublic.common_fields import CommonFields
+
+from pyseir.parameters import parameter_ensemble_generator
+from pyseir.parameters.parameter_ensemble_generator import ParameterEnsembleGenerator
+
+
+@pytest.fixture
+def generator_latest(monkeypatch):
+    latest = {
+        CommonFields.POPULATION: 100000,
+        CommonFields.MAX_BED_COUNT: 300,
+        CommonFields.ICU_BEDS: 40,
+        CommonFields.ICU_TYPICAL_OCCUPANCY_RATE: None,
+        CommonFields.ALL_BED_TYPICAL_OCCUPANCY_RATE: 0.5,
+    }
+    monkeypatch.setattr(
+        parameter_ensemble_generator.combined_datasets,
+        "get_us_latest_for_fips",
+        lambda fips: latest,
+    )
+    parameter_ensemble_generator._get_expected_seir_parameters.cache_clear()
+    yield latest
+    parameter_ensemble_generator._get_expected_seir_parameters.cache_clear()
+
+
+def test_average_seir_parameters_match_sampled_means(generator_latest):
+    np.random.seed(42)
+    t_list = np.linspace(0, 100, 101)
+    generator = ParameterEnsembleGenerator("06", N_samples=20000, t_list=t_list)
+
+    average = generator.get_average_seir_parameters()
+    samples = pd.DataFrame(generator.sample_seir_parameters()).drop(
+        ["t_list", "suppression_policy"], axis=1
+    )
+
+    assert average["t_list"] is t_list
+    assert set(samples.columns) == set(average) - {"t_list", "suppression_policy"}
+    for key, values in samples.items():
+        # 1 / Normal has no finite mean, so compare against the median of batch means.
+        if key == "sigma":
+            sampled = np.median(values.values.reshape(100, -1).mean(axis=1))
+        else:
+            sampled = values.mean()
+        assert average[key] == pytest.approx(sampled, rel=0.02, abs=1e-4), key
+
+
+def test_average_seir_parameters_are_cached_per_fips(generator_latest):
+    generator = ParameterEnsembleGenerator("06", N_samples=10, t_list=None)
+    first = generator.get_average_seir_parameters()
+    first["N"] = 0
+
+    assert generator.get_average_seir_parameters()["N"] == 100000
+    assert parameter_ensemble_generator._get_expected_seir_parameters.cache_info().hits == 1
+
+
+def test_sample_seir_parameter_arrays_are_columnar_and_seedable(generator_latest):
+    t_list = np.linspace(0, 100, 101)
+    generator = ParameterEnsembleGenerator("06", N_samples=50, t_list=t_list)
+
+    samples = generator.sample_seir_parameter_arrays(
+        override_params=dict(R0=np.arange(50), kappa=0.5), random_state=1
+    )
+    repeated = generator.sample_seir_parameter_arrays(random_state=np.random.default_rng(1))
+
+    assert len(samples) == 50
+    assert samples.t_list is t_list
+    np.testing.assert_array_equal(samples["sigma"], repeated["sigma"])
+    np.testing.assert_array_equal(samples["R0"], np.arange(50))
+    assert (samples["kappa"] == 0.5).all()
+    assert (samples["hospitalization_rate_icu"] >= 0).all()
+
+    parameter_sets = generator.sample_seir_parameters(random_state=1)
+    assert len(parameter_sets) == 50
+    assert parameter_sets[3]["sigma"] == repeated["sigma"][3]
+    assert parameter_sets[3]["t_list"] is t_list
+    assert parameter_sets[3]["suppression_policy"] is None
+    assert isinstance(parameter_sets[3]["R_initial"], int)
@@ -0,0 +1,53 @@
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+from libs.datasets import combined_datasets
+from libs.datasets.latest_values_dataset import LatestValuesDataset
+from pyseir import utils
+from pyseir.utils import get_run_artifact_path, RunArtifact
+
+
+@pytest.fixture
+def latest_dataset(monkeypatch):
+    latest = LatestValuesDataset(
+        pd.read_csv(
+            StringIO(
+                "fips,state,county,aggregate_level,country,cases\n"
+                "06,CA,,state,USA,100\n"
+                "06075,CA,San Francisco County,county,USA,10\n"
+                "06999,CA,,county,USA,1\n"
+            ),
+            dtype={"fips": str},
+        )
+    )
+    loads = []
+
+    def load_us_latest_dataset():
+        loads.append(1)
+        return latest
+
+    monkeypatch.setattr(combined_datasets, "load_us_latest_dataset", load_us_latest_dataset)
+    utils.get_county_names.cache_clear()
+    yield loads
+    utils.get_county_names.cache_clear()
+
+
+def test_get_run_artifact_path_county_names(latest_dataset, tmp_path):
+    path = get_run_artifact_path("06075", RunArtifact.MLE_FIT_MODEL, output_dir=str(tmp_path))
+    assert path == str(
+        tmp_path
+        / "pyseir"
+        / "California"
+        / "data"
+        / "mle_fit_model__California__San Francisco County__06075.pkl"
+    )
+    path = get_run_artifact_path("06999", RunArtifact.MLE_FIT_MODEL, output_dir=str(tmp_path))
+    assert path.endswith("mle_fit_model__California__None__06999.pkl")
+    path = get_run_artifact_path("06", RunArtifact.MLE_FIT_MODEL, output_dir=str(tmp_path))
+    assert path.endswith("mle_fit_model__California_state_only.pkl")
+
+    # The latest dataset is only read once to resolve every county.
+    assert len(latest_dataset) == 1
+    assert utils.get_county_names() == {"06075": "San Francisco County", "06999": None}
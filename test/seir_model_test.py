@@ -0,0 +1,78 @@
+import copy
+
+import numpy as np
+
+from pyseir.models import suppression_policies as sp
+from pyseir.models.seir_model import SEIRModel, StackedSEIRModel, IntegrationMode
+
+
+def _make_models(t_list, n_models=12):
+    rng = np.random.default_rng(1)
+    policies = [
+        sp.get_epsilon_interpolator(0.5, 40, 0.7, 30, t_break_final=120, eps_final=0.8),
+        sp.get_epsilon_interpolator(0.3, 20),
+    ]
+    return [
+        SEIRModel(
+            N=1e6,
+            t_list=t_list,
+            suppression_policy=policies[i % len(policies)],
+            R0=rng.uniform(2, 4),
+            I_initial=rng.uniform(1, 100),
+            beds_general=rng.uniform(100, 3000),
+            beds_ICU=rng.uniform(10, 500),
+        )
+        for i in range(n_models)
+    ]
+
+
+def test_stacked_model_matches_independent_runs():
+    t_list = np.linspace(0, 180, 181)
+    models = _make_models(t_list)
+    stacked_models = copy.deepcopy(models)
+
+    for model in models:
+        model.run()
+    StackedSEIRModel(stacked_models).run()
+
+    for model, stacked in zip(models, stacked_models):
+        assert model.results.keys() == stacked.results.keys()
+        for compartment in ["S", "E", "A", "I", "R", "HGen", "HICU", "HVent", "D"]:
+            scale = np.abs(model.results[compartment]).max() + 1
+            np.testing.assert_allclose(
+                stacked.results[compartment], model.results[compartment], atol=0.01 * scale
+            )
+
+
+def test_rk4_integration_matches_odeint():
+    t_list = np.linspace(0, 365, 366)
+    models = _make_models(t_list, n_models=4)
+    rk4_models = copy.deepcopy(models)
+
+    for model, rk4_model in zip(models, rk4_models):
+        model.run()
+        rk4_model.run(integration_mode=IntegrationMode.RK4)
+
+        assert model.results.keys() == rk4_model.results.keys()
+        for compartment in ["S", "E", "A", "I", "R", "HGen", "HICU", "HVent", "D"]:
+            scale = np.abs(model.results[compartment]).max() + 1
+            np.testing.assert_allclose(
+                rk4_model.results[compartment], model.results[compartment], atol=0.005 * scale
+            )
+
+
+def test_stacked_rk4_integration_matches_independent_runs():
+    t_list = np.linspace(0, 180, 181)
+    models = _make_models(t_list)
+    stacked_models = copy.deepcopy(models)
+
+    for model in models:
+        model.run(integration_mode=IntegrationMode.RK4, substeps=2)
+    StackedSEIRModel(stacked_models).run(integration_mode=IntegrationMode.RK4, substeps=2)
+
+    for model, stacked in zip(models, stacked_models):
+        assert model.results.keys() == stacked.results.keys()
+        for compartment in ["S", "E", "A", "I", "R", "HGen", "HICU", "HVent", "D"]:
+            np.testing.assert_allclose(
+                stacked.results[compartment], model.results[compartment], rtol=1e-12
+            )
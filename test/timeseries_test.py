@@ -48,3 +48,70 @@ def test_get_subset_and_get_data():
         "mystate",
     }
     assert set(ts.get_data(None, states=["ZZ"], before="2020-03-23")["metric"]) == {"march22-nyc"}
+
+
+def test_get_subset_by_fips_uses_index():
+    input_df = pd.read_csv(
+        StringIO(
+            "city,county,state,fips,country,aggregate_level,date,metric\n"
+            ",North County,ZZ,97001,USA,county,2020-03-24,north-march24\n"
+            ",South County,ZZ,97002,USA,county,2020-03-23,south-march23\n"
+            ",North County,ZZ,97001,USA,county,2020-03-22,north-march22\n"
+            ",North County,ZZ,97001,USA,county,2020-03-23,north-march23\n"
+            ",,ZZ,97,USA,state,2020-03-23,mystate\n"
+        ),
+        dtype={"fips": str},
+    )
+    ts = TimeseriesDataset(input_df)
+
+    assert set(ts.fips_index) == {"97001", "97002", "97"}
+    # Rows keep their original order and index labels, as with a full table scan.
+    north = ts.get_subset(None, fips="97001").data
+    assert list(north["metric"]) == ["north-march24", "north-march22", "north-march23"]
+    assert list(north.index) == [0, 2, 3]
+    assert ts.get_subset(None, fips="96").data.empty
+
+    assert list(ts.get_data(None, fips="97001", after="2020-03-22")["metric"]) == [
+        "north-march24",
+        "north-march23",
+    ]
+    assert list(ts.get_data(AggregationLevel.STATE, fips="97001")["metric"]) == []
+    assert list(ts.get_data(None, fips="97", columns_slice=["metric"]).columns) == ["metric"]
+    assert ts.get_records_for_fips("97002")[0]["metric"] == "south-march23"
+
+
+def test_yield_records_replaces_na_with_none():
+    input_df = pd.read_csv(
+        StringIO(
+            "county,state,fips,country,aggregate_level,date,cases,deaths\n"
+            "North County,ZZ,97001,USA,county,2020-03-22,1,\n"
+            ",ZZ,97001,USA,county,2020-03-23,,2\n"
+        ),
+        dtype={"fips": str},
+        parse_dates=["date"],
+    )
+    records = list(TimeseriesDataset(input_df).yield_records())
+
+    assert records == [
+        {
+            "county": "North County",
+            "state": "ZZ",
+            "fips": "97001",
+            "country": "USA",
+            "aggregate_level": "county",
+            "date": pd.Timestamp("2020-03-22"),
+            "cases": 1.0,
+            "deaths": None,
+        },
+        {
+            "county": None,
+            "state": "ZZ",
+            "fips": "97001",
+            "country": "USA",
+            "aggregate_level": "county",
+            "date": pd.Timestamp("2020-03-23"),
+            "cases": None,
+            "deaths": 2.0,
+        },
+    ]
+    assert type(records[0]["cases"]) is float
@@ -0,0 +1,97 @@
+import shutil
+
+import pandas as pd
+
+from libs.datasets.sources.can_pyseir_location_output import CANPyseirLocationOutput
+from libs.enums import Intervention
+from pyseir.deployment import webui_data_adaptor_v1
+from pyseir.deployment.webui_data_adaptor_v1 import WebUIDataAdaptorV1
+
+
+def _map_fips(self, fips, sink):
+    sink.write(f"{fips}.json", "{}")
+    sink.flush()
+    return []
+
+
+def test_generate_states_maps_all_regions_in_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(WebUIDataAdaptorV1, "map_fips", _map_fips)
+    monkeypatch.setattr(WebUIDataAdaptorV1, "_load_shared_inputs", lambda self, all_fips: None)
+    adaptor = WebUIDataAdaptorV1.__new__(WebUIDataAdaptorV1)
+    adaptor.output_dir = str(tmp_path)
+
+    adaptor.generate_states({"ID": ["16001", "16003"], "MT": ["30001"]}, processes=2)
+    assert sorted(p.stem for p in (tmp_path / "web_ui").iterdir()) == [
+        "16",
+        "16001",
+        "16003",
+        "30",
+        "30001",
+    ]
+
+
+def test_generate_states_states_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(WebUIDataAdaptorV1, "map_fips", _map_fips)
+    adaptor = WebUIDataAdaptorV1.__new__(WebUIDataAdaptorV1)
+    adaptor.output_dir = str(tmp_path)
+
+    adaptor.generate_states({"ID": ["16001"]}, states_only=True)
+    assert [p.name for p in (tmp_path / "web_ui").iterdir()] == ["16.json"]
+
+
+def test_bulk_outputs_loaded_by_fips(tmp_path, nyc_model_output_path):
+    nyc_output = webui_data_adaptor_v1.read_output_json(nyc_model_output_path)
+    other_output = nyc_output.assign(fips="36047")
+    other_output["dead"] += 1
+    adaptor = WebUIDataAdaptorV1.__new__(WebUIDataAdaptorV1)
+    adaptor.output_dir = str(tmp_path)
+    web_ui_folder = tmp_path / "web_ui"
+    web_ui_folder.mkdir()
+
+    adaptor.write_bulk_outputs([[nyc_output], [], [other_output]])
+    assert [p.name for p in web_ui_folder.iterdir()] == ["projections.county.1.parquet"]
+
+    intervention = Intervention.STRONG_INTERVENTION
+    loaded = CANPyseirLocationOutput.load_from_model_output_if_exists(
+        "36061", intervention, web_ui_folder
+    )
+    expected = CANPyseirLocationOutput.load_from_path(nyc_model_output_path)
+    pd.testing.assert_frame_equal(loaded.data, expected.data)
+    loaded = CANPyseirLocationOutput.load_from_model_output_if_exists(
+        "36047", intervention, web_ui_folder
+    )
+    assert (loaded.data["dead"] == expected.data["dead"] + 1).all()
+
+    # Regions missing from the bulk outputs are loaded from their own output.
+    shutil.copy(nyc_model_output_path, web_ui_folder / "36005.1.json")
+    loaded = CANPyseirLocationOutput.load_from_model_output_if_exists(
+        "36005", intervention, web_ui_folder
+    )
+    pd.testing.assert_frame_equal(loaded.data, expected.data)
+    assert not CANPyseirLocationOutput.load_from_model_output_if_exists(
+        "36061", Intervention.WEAK_INTERVENTION, web_ui_folder
+    )
+
+
+def test_state_bulk_outputs_of_separate_calls(tmp_path, monkeypatch, nyc_model_output_path):
+    nyc_output = webui_data_adaptor_v1.read_output_json(nyc_model_output_path)
+
+    def map_fips(self, fips, sink):
+        return [nyc_output.assign(fips=fips)]
+
+    monkeypatch.setattr(WebUIDataAdaptorV1, "map_fips", map_fips)
+    adaptor = WebUIDataAdaptorV1.__new__(WebUIDataAdaptorV1)
+    adaptor.output_dir = str(tmp_path)
+    (tmp_path / "web_ui").mkdir()
+
+    # As in the states only pipeline, each state is mapped by its own call.
+    outputs_by_fips = []
+    for state in ["ID", "MT"]:
+        outputs_by_fips.extend(
+            adaptor.generate_states({state: []}, states_only=True, write_bulk_outputs=False)
+        )
+    assert not list((tmp_path / "web_ui").iterdir())
+    adaptor.write_bulk_outputs(outputs_by_fips)
+
+    bulk_output = pd.read_parquet(tmp_path / "web_ui" / "projections.state.1.parquet")
+    assert sorted(bulk_output["fips"].unique()) == ["16", "30"]